@@ -8,23 +8,32 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import json
 import os
-import requests
-import psutil
-import config
-from datetime import datetime, timedelta
+import time
+from datetime import date, datetime, timedelta
 import getpass
 import threading
-import pystray
 import logging
-from PIL import Image, ImageDraw
 
-from tracker.log_writer import write_log
-from daily_report import send_daily_report
+from tracker.timecodec import now_ms, to_ms, to_datetime
+from tracker.instrumentation import metrics, STAGE_RENDER
+from tracker.power import on_battery, aligned_delay_ms
+from tracker.ipc import IPCServer
+from tracker.daemon_client import get_daemon_client
+from tracker.dispatcher import get_dispatcher
+from ui.view_model import ViewModel, workday_view
+
+# psutil, pystray, PIL, requests and the email report stack are imported in the
+# methods that use them, to keep start-up fast.
 
 class AIWorkTracker:
     APP_VERSION = "v1.5"  # A version number to confirm updates
+    UPDATE_INTERVAL_MS = 1000          # Visible window on mains power
+    BATTERY_INTERVAL_MS = 60 * 1000    # Visible window on battery: minute-level refresh
+    HIDDEN_INTERVAL_MS = 60 * 1000     # Withdrawn to the tray: only resource sampling runs
+    RESOURCE_SAMPLE_SECONDS = 10       # Seconds between CPU/RSS samples
 
-    def __init__(self):
+    def __init__(self, app_name="AIWorkTracker"):
+        self.app_name = app_name
         self.root = tk.Tk()
         self.root.title(f"🤖 AI Work Tracker {self.APP_VERSION}")
 
@@ -42,14 +51,15 @@ class AIWorkTracker:
         self.root.attributes("-topmost", True)
         
         self.has_shown_minimize_message = False
-        
-        # Path for the signal file used by the unlock trigger
-        self.signal_file_path = os.path.join("logs", "show_window.signal")
+        self.ipc_server = None
 
-        # In-memory stats for idle/lock time to avoid constant file reads
-        self.today_idle_seconds = 0
-        self.today_lock_seconds = 0
-        self.processed_log_entries = 0
+        # Today's totals come from the tracker daemon, which owns the samplers and the activity log
+        self.stats = get_daemon_client()
+        # Slow I/O runs on a bounded worker pool; work from other threads is queued for the Tk loop
+        self.dispatcher = get_dispatcher()
+        self._update_job = None
+        self._last_resource_sample = None
+        self.hidden = False
 
         # Set dark theme
         self.root.configure(bg="#23272e")
@@ -61,9 +71,13 @@ class AIWorkTracker:
         # Save login time
         self.save_login_time()
         
-        self.load_and_process_activity_log(from_start=True)
+        self.stats.poll()
         self.setup_ui()
+        self.dispatcher.attach_tk(self.root)
+        self.stats.subscribe(self.on_stats_changed)
+        self.on_stats_changed(self.stats.snapshot())
         self.setup_tray_icon()
+        self.start_ipc_server()
         self.start_periodic_updates()
         
     def get_todays_login_time(self):
@@ -96,6 +110,7 @@ class AIWorkTracker:
     def try_auto_capture(self):
         """Try to auto-capture login time using system methods"""
         logging.info("🔍 Trying to auto-capture login time...")
+        import psutil
         
         # Method 1: Try to get from system boot time if from today
         try:
@@ -249,28 +264,14 @@ class AIWorkTracker:
         os.makedirs("logs", exist_ok=True)
         with open("logs/auto_captured_login.json", "w") as f:
             json.dump(login_data, f, indent=2)
+        self.stats.set_login_time(self.login_time, login_data["method"])
         
         logging.info(f"✅ Login time saved: {self.login_time}")
     
     def get_weather(self):
-        """Get weather for the configured city."""
-        if not config.OPENWEATHER_API_KEY or "YOUR_API_KEY" in config.OPENWEATHER_API_KEY:
-            logging.warning("⚠️ Weather API key not set in config.py. Skipping weather fetch.")
-            return "--°C"
-        
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={config.WEATHER_CITY}&appid={config.OPENWEATHER_API_KEY}&units=metric"
-        
-        try:
-            resp = requests.get(url, timeout=5)
-            resp.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
-            data = resp.json()
-            temp = data.get('main', {}).get('temp')
-            if temp is not None:
-                return f"{temp}°C"
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"⚠️ Error fetching weather: {e}")
-        
-        return "--°C"
+        """Get weather for the configured city from the shared, non-blocking weather service."""
+        from tracker.weather import get_weather_service
+        return get_weather_service().get_text()
     
     def setup_ui(self):
         """Setup the user interface"""
@@ -312,6 +313,13 @@ class AIWorkTracker:
                                              font=("Arial", 11, "italic"),
                                              fg="#ff6b6b", bg="#23272e")
         self.activity_status_label.pack(pady=(5, 0))
+
+        # Widgets are only touched when their displayed value changes
+        self.view = ViewModel()
+        self.view.bind("progress", self.progress_var.set)
+        self.view.bind("remaining", lambda remaining: self.countdown_label.config(
+            text=f"⏳ Time left: {remaining}" if remaining else "✅ 9 Hours Completed!"))
+        self.view.bind("activity", lambda text: self.activity_status_label.config(text=text))
         
         # Buttons
         button_frame = tk.Frame(main_frame, bg="#23272e")
@@ -345,18 +353,16 @@ class AIWorkTracker:
         self.update_user_info_label()
     
     def reset_for_tomorrow(self):
-        """Deletes today's login and report flag files to allow a fresh start."""
+        """Deletes today's login file and report run to allow a fresh start."""
         login_file = "logs/auto_captured_login.json"
         if os.path.exists(login_file):
             os.remove(login_file)
             logging.info("🗑️ Removed today's login file.")
 
-        # Also remove the report sent flag for today
-        today_str = datetime.now().strftime("%Y-%m-%d")
-        flag_file = os.path.join("logs", f"report_sent_{today_str}.flag")
-        if os.path.exists(flag_file):
-            os.remove(flag_file)
-            logging.info("🗑️ Removed today's report-sent flag.")
+        # Also forget today's report run, so the report is sent again
+        from tracker.scheduler import DAILY_REPORT_JOB, get_job_ledger
+        if get_job_ledger().release(DAILY_REPORT_JOB, date.today().isoformat()):
+            logging.info("🗑️ Cleared today's daily report from the job ledger.")
         
         messagebox.showinfo("Reset Complete", "Tracker has been reset. It will perform a fresh auto-capture on the next start.")
 
@@ -370,21 +376,29 @@ class AIWorkTracker:
         else:
             # Workday is complete.
             if messagebox.askyesno("Confirm End Day", "You've completed your 9 hours. Great job!\n\nDo you want to close the tracker for the day?"):
-                now = datetime.now()
-                write_log(
-                    "logs/structured_log.json",
-                    "normal_logout",
-                    "Workday Complete",
-                    self.login_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    now.strftime("%Y-%m-%d %H:%M:%S")
-                )
-                self.update_logout_info(now, "Workday Complete")
-                
-                # Send the daily report email immediately upon ending the day
-                logging.info("📧 Triggering daily email report...")
-                threading.Thread(target=send_daily_report, daemon=True).start()
+                self.finish_day("normal_logout", "Workday Complete")
                 self.root.destroy()
 
+    def finish_day(self, event_type, reason):
+        """
+        Records the logout and sends the daily report on the I/O pool.
+        The pool's workers are joined at exit, so closing the window does not cut the email short.
+        """
+        now = now_ms()
+        login_ms = to_ms(self.login_time)
+
+        def record_and_report():
+            try:
+                self.stats.log_event(event_type, reason, login_ms, now)
+            except (OSError, ValueError, RuntimeError) as e:
+                logging.error(f"❌ Could not record '{event_type}': {e}")
+            self.update_logout_info(to_datetime(now), reason)
+            logging.info("📧 Triggering daily email report...")
+            from daily_report import send_daily_report
+            send_daily_report()
+
+        self.dispatcher.run_io(record_and_report, name="end-day")
+
     def show_early_logout_dialog(self):
         """Shows a dialog to get the reason for an early logout."""
         dialog = tk.Toplevel(self.root)
@@ -405,25 +419,11 @@ class AIWorkTracker:
 
         def confirm_logout():
             reason = reason_var.get()
-            now = datetime.now()
-
-            # 1. Log the event to the structured log file
-            write_log(
-                "logs/structured_log.json",
-                "early_logout",
-                reason,  # The reason becomes the title of the log entry
-                self.login_time.strftime("%Y-%m-%d %H:%M:%S"),
-                now.strftime("%Y-%m-%d %H:%M:%S")
-            )
 
-            # 2. Update the main login file with final details
-            self.update_logout_info(now, reason)
+            # 1. Log the event (the reason becomes its title), update the login file and send the report
+            self.finish_day("early_logout", reason)
 
-            # Send the daily report email
-            logging.info("📧 Triggering daily email report for early logout...")
-            threading.Thread(target=send_daily_report, daemon=True).start()
-
-            # 3. Show confirmation and close the app
+            # 2. Show confirmation and close the app
             messagebox.showinfo("Logout Successful", f"You have been logged out for the day.\nReason: {reason}")
             self.root.destroy()
 
@@ -451,12 +451,20 @@ class AIWorkTracker:
             json.dump(login_data, f, indent=2)
         logging.info(f"✅ Final logout info saved at {logout_time} for reason: {reason}")
 
+    def open_history(self):
+        """Opens the activity history browser (on the Tk thread)."""
+        from ui.history_browser import HistoryBrowser
+        HistoryBrowser(self.root, dispatcher=self.dispatcher)
+
     def change_time_thread_safe(self, icon=None, item=None):
         """Wrapper to call change_time from the pystray thread safely."""
-        self.root.after(0, self.change_time)
+        self.dispatcher.call_soon(self.change_time)
 
     def setup_tray_icon(self):
         """Sets up and runs the system tray icon in a separate thread."""
+        import pystray
+        from PIL import Image, ImageDraw
+
         # Create a simple icon image
         width = 64
         height = 64
@@ -466,9 +474,17 @@ class AIWorkTracker:
         dc = ImageDraw.Draw(image)
         dc.rectangle([(width // 4, height // 4), (width * 3 // 4, height * 3 // 4)], fill=color1)
         
+        # The performance submenu is rebuilt from the rolling metrics each time it is refreshed
+        perf_menu = pystray.Menu(lambda: (
+            *(pystray.MenuItem(line, None, enabled=False) for line in metrics.summary_lines()),
+            pystray.Menu.SEPARATOR,
+            pystray.MenuItem('Save Stats to File', self.dump_performance_stats),
+        ))
         menu = (
             pystray.MenuItem('Show Tracker', self.show_window, default=True),
             pystray.MenuItem('Change Start Time', self.change_time_thread_safe),
+            pystray.MenuItem('History', lambda icon, item: self.dispatcher.call_soon(self.open_history)),
+            pystray.MenuItem('Performance', perf_menu),
             pystray.MenuItem('Quit', self.quit_app)
         )
         
@@ -486,7 +502,9 @@ class AIWorkTracker:
             self.root.deiconify()
             self.root.lift()
             self.root.focus_force()
-        self.root.after(0, _show_and_focus)
+            # Rendering was suspended while hidden; catch up straight away
+            self.refresh_now()
+        self.dispatcher.call_soon(_show_and_focus)
 
     def hide_window(self):
         """Hides the main window and shows a one-time notification."""
@@ -500,102 +518,145 @@ class AIWorkTracker:
                 )
             self.has_shown_minimize_message = True
 
+    def dump_performance_stats(self, icon=None, item=None):
+        """Writes the rolling performance summary to logs/perf_stats.json."""
+        try:
+            path = metrics.dump()
+            logging.info(f"📈 Performance stats written to {path}")
+        except OSError as e:
+            logging.warning(f"⚠️ Could not write performance stats: {e}")
+
+    def start_ipc_server(self):
+        """Listens for commands (show, status, end-day, reload) from later launches."""
+        self.ipc_server = IPCServer(self.app_name, {
+            "show": self._ipc_show,
+            "status": self._ipc_status,
+            "end-day": self._ipc_end_day,
+            "reload": self._ipc_reload,
+        })
+        try:
+            self.ipc_server.start()
+        except OSError as e:
+            logging.warning(f"⚠️ Could not start IPC server: {e}")
+            self.ipc_server = None
+
+    # IPC handlers run on the server thread; UI work is scheduled onto the Tk thread.
+    def _ipc_show(self, args):
+        self.show_window()
+        return "shown"
+
+    def _ipc_status(self, args):
+        remaining = (self.logout_time - datetime.now()).total_seconds()
+        return {
+            "login_time": self.login_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "logout_time": self.logout_time.strftime("%Y-%m-%d %H:%M:%S"),
+            "remaining_seconds": max(0, int(remaining)),
+            "idle_seconds": self.stats.idle_seconds,
+            "lock_seconds": self.stats.lock_seconds,
+            "active_seconds": self.stats.active_seconds,
+            "top_apps": self.stats.top_apps(),
+            "hidden": self.hidden,
+        }
+
+    def _ipc_end_day(self, args):
+        def _end_day():
+            self.show_window()
+            self.handle_end_day()
+        self.dispatcher.call_soon(_end_day)
+        return "end-day dialog opened"
+
+    def _ipc_reload(self, args):
+        self.dispatcher.call_soon(self.reload)
+        return "reloading"
+
+    def reload(self):
+        """Re-reads the login file and recomputes today's totals from the activity log."""
+        self.stats.reload()
+        self.login_time = self.get_todays_login_time()
+        self.logout_time = self.login_time + timedelta(hours=9)
+        self.update_user_info_label()
+        self.refresh_now()
+
     def quit_app(self, icon=None, item=None):
         """Stops the tray icon and closes the application. Made thread-safe for pystray."""
+        self.dump_performance_stats()
+        if self.ipc_server:
+            self.ipc_server.stop()
         self.tray_icon.stop()
         # Schedule the root window destruction on the main thread
-        self.root.after(0, self.root.destroy)
+        self.dispatcher.call_soon(self.root.destroy)
 
-    def load_and_process_activity_log(self, from_start=False):
+    def start_periodic_updates(self):
         """
-        Reads the structured log file and updates activity stats.
-        If from_start is True, it processes the whole file from the beginning.
-        Otherwise, it only processes new entries since the last check.
-        This is far more efficient than re-reading the entire file every time.
+        Runs one UI tick and arms the next one.
+        Rendering and log reads are suspended while the window is hidden, and
+        ticks are aligned to wall-clock boundaries so all periodic work shares
+        a single wakeup. On battery the visible refresh drops to once a minute.
         """
-        log_file = "logs/structured_log.json"
-        today_str = datetime.now().strftime('%Y-%m-%d')
-
-        if not os.path.exists(log_file):
-            return
-
-        try:
-            with open(log_file, 'r') as f:
-                logs = json.load(f)
-            
-            start_index = 0 if from_start else self.processed_log_entries
-
-            new_entries = logs[start_index:]
-            if not new_entries:
-                return  # Nothing new to process
-
-            for entry in new_entries:
-                if entry.get('start_time', '').startswith(today_str):
-                    if entry.get('event') == 'idle':
-                        self.today_idle_seconds += entry.get('duration_seconds', 0)
-                    elif entry.get('event') == 'lock':
-                        self.today_lock_seconds += entry.get('duration_seconds', 0)
-            
-            self.processed_log_entries = len(logs)
-            logging.info(f"Processed {len(new_entries)} new log entries. Totals: Idle={self.today_idle_seconds}s, Lock={self.today_lock_seconds}s")
-
-        except (json.JSONDecodeError, IOError, IndexError) as e:
-            logging.warning(f"Could not process activity log: {e}")
-
-    def start_periodic_updates(self):
-        """Starts the timers for updating the UI and checking for new logs."""
-        self.update_display()
-        self.load_and_process_activity_log(from_start=False)
-        self.root.after(1000, self.start_periodic_updates) # UI updates every second
+        self._update_job = None
+        metrics.tick("ui")
+        metrics.wakeup("ui")
+        # Safety net in case a wake-up event was missed
+        self.dispatcher.drain()
+
+        hidden = self.hidden = self.is_hidden()
+        if not hidden:
+            # Notifies on_stats_changed only if the log or login file actually changed
+            self.stats.poll()
+            with metrics.stage(STAGE_RENDER):
+                self.update_display()
+
+        now = time.monotonic()
+        if self._last_resource_sample is None or now - self._last_resource_sample >= self.RESOURCE_SAMPLE_SECONDS:
+            self._last_resource_sample = now
+            metrics.sample_resources()
+            if getattr(self, 'tray_icon', None) is not None:
+                self.tray_icon.update_menu()
+
+        if hidden:
+            period = self.HIDDEN_INTERVAL_MS
+        elif on_battery():
+            period = self.BATTERY_INTERVAL_MS
+        else:
+            period = self.UPDATE_INTERVAL_MS
+        delay = aligned_delay_ms(period)
+        metrics.scheduled("ui", delay)
+        self._update_job = self.root.after(delay, self.start_periodic_updates)
+
+    def refresh_now(self):
+        """Cancels the pending tick and runs one immediately (e.g. when the window is shown)."""
+        if self._update_job is not None:
+            self.root.after_cancel(self._update_job)
+        self.start_periodic_updates()
 
+    def is_hidden(self):
+        return self.root.state() in ("withdrawn", "iconic")
 
     def update_display(self):
         """Update the display with current time and progress"""
-        # Periodically check for signals (like the unlock trigger)
-        self.check_for_signals()
+        self.view.update(**workday_view(self.login_time, self.logout_time))
 
-        now = datetime.now()
-        remaining = self.logout_time - now
-        total_duration = self.logout_time - self.login_time
-        elapsed = now - self.login_time
-        
-        # Calculate progress percentage
-        if total_duration.total_seconds() > 0:
-            progress_percent = min(100, max(0, (elapsed.total_seconds() / total_duration.total_seconds()) * 100))
-            self.progress_var.set(progress_percent)
-        
-        # Update countdown
-        if remaining.total_seconds() > 0:
-            countdown_str = str(remaining).split('.')[0]
-            self.countdown_label.config(text=f"⏳ Time left: {countdown_str}")
-        else:
-            self.countdown_label.config(text="✅ 9 Hours Completed!")
-        
-        # Update idle/lock status
-        idle_seconds = self.today_idle_seconds
-        lock_seconds = self.today_lock_seconds
+    def on_stats_changed(self, stats):
+        """Called by the stats service when today's totals change."""
+        idle_seconds = stats["idle_seconds"]
+        lock_seconds = stats["lock_seconds"]
         activity_text = []
         if idle_seconds > 60:
             activity_text.append(f"Idle: {idle_seconds // 60} min")
         if lock_seconds > 60:
             activity_text.append(f"Locked: {lock_seconds // 60} min")
         
-        self.activity_status_label.config(text=" | ".join(activity_text))
-    
-    def check_for_signals(self):
-        """Checks for external signal files to perform actions, like showing the window."""
-        if os.path.exists(self.signal_file_path):
-            try:
-                # A signal file was found, so show the window and remove the file
-                logging.info("💡 Detected unlock signal. Showing window.")
-                self.show_window()
-                os.remove(self.signal_file_path)
-            except Exception as e:
-                logging.warning(f"⚠️ Error processing signal file: {e}")
+        self.view.update(activity=" | ".join(activity_text))
 
     def run(self):
         """Run the tracker"""
-        self.root.mainloop()
+        try:
+            self.root.mainloop()
+        finally:
+            if self.ipc_server:
+                self.ipc_server.stop()
+            # Let background jobs (e.g. the end-of-day report) finish before the process exits
+            self.dispatcher.shutdown()
 
 if __name__ == "__main__":
     # This script is not meant to be run directly.
@@ -0,0 +1,563 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the AI Work Tracker.
+
+Usage:
+    python benchmark.py startup [--runs N]
+    python benchmark.py render [--runs N]
+    python benchmark.py history [--runs N]
+    python benchmark.py report [--runs N]
+    python benchmark.py export [--runs N]
+    python benchmark.py collector [--runs N]
+    python benchmark.py team [--runs N]
+    python benchmark.py sketches [--runs N]
+
+Each benchmark prints its measurements and compares them with a budget.
+The exit code is 1 if any budget is exceeded.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_NAME = "AIWorkTracker"
+
+# --- Startup ---
+# Wall-clock budgets (ms) for each entry path, measured as a fresh interpreter
+STARTUP_BUDGETS_MS = {
+    "unlock-launcher": 100,  # unlock_launcher.py (what the unlock task runs) with an instance running
+    "unlock-trigger": 300,   # main.py --show-on-unlock with an instance running
+    "cold-start": 700,       # interpreter + imports needed by main.py to open the tracker
+    "report-runner": 500,    # interpreter + imports needed by run_report.py
+}
+STARTUP_COMMANDS = {
+    "unlock-launcher": [sys.executable, "-S", "unlock_launcher.py"],
+    "unlock-trigger": [sys.executable, "main.py", "--show-on-unlock"],
+    "cold-start": [sys.executable, "-c", "import main, auto_capture_login_tracker"],
+    "report-runner": [sys.executable, "-c", "import run_report"],
+}
+IMPORT_PROFILE_TOP = 8
+
+def _time_command(command, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True)
+        timings.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"{' '.join(command[1:])} failed:\n{result.stderr.strip()[-2000:]}")
+    return timings
+
+def profile_imports(command, top=IMPORT_PROFILE_TOP):
+    """Runs a command with -X importtime and returns the slowest modules as (cumulative_us, module)."""
+    command = [command[0], "-X", "importtime"] + command[1:]
+    result = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, module = line[len("import time:"):].split("|")
+        # Report top-level imports and their direct children (deeper ones are indented further)
+        depth = (len(module) - len(module.lstrip()) - 1) // 2
+        if depth > 1 or module.strip() in ("site", "encodings"):
+            continue
+        rows.append((int(cumulative_us), module.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def imported_modules(command):
+    """Returns the modules a command imports beyond what a bare interpreter with the same flags loads."""
+    def modules(cmd):
+        result = subprocess.run([cmd[0], "-X", "importtime"] + cmd[1:], cwd=PROJECT_DIR, capture_output=True, text=True)
+        return {line.rsplit("|", 1)[1].strip() for line in result.stderr.splitlines()
+                if line.startswith("import time:") and "cumulative" not in line}
+    flags = [arg for arg in command[1:] if arg.startswith("-")]
+    return sorted(modules(command) - modules([command[0]] + flags + ["-c", "pass"]))
+
+def bench_startup(runs=5):
+    """Measures each entry path in a fresh interpreter and profiles its imports."""
+    from tracker.singleton import SingleInstance
+    from tracker.ipc import IPCServer
+
+    # The unlock path needs a running instance. Use the real one if it is up,
+    # otherwise hold the lock and answer 'show' ourselves.
+    instance = SingleInstance(APP_NAME)
+    stand_in = None
+    if not instance.is_running():
+        stand_in = IPCServer(APP_NAME, {"show": lambda args: "shown"})
+        stand_in.start()
+
+    over_budget = False
+    try:
+        for name, command in STARTUP_COMMANDS.items():
+            timings = _time_command(command, runs)
+            median = statistics.median(timings)
+            budget = STARTUP_BUDGETS_MS[name]
+            status = "OK" if median <= budget else "OVER BUDGET"
+            over_budget = over_budget or median > budget
+            print(f"{name:15s} median {median:7.1f} ms  min {min(timings):7.1f} ms  budget {budget} ms  [{status}]")
+            if name == "unlock-launcher":
+                print(f"    imports: {', '.join(imported_modules(command)) or 'none'}")
+            elif name != "unlock-trigger":
+                for cumulative_us, module in profile_imports(command):
+                    print(f"    {cumulative_us / 1000:7.1f} ms  {module}")
+    finally:
+        if stand_in:
+            stand_in.stop()
+        del instance
+    return not over_budget
+
+# --- Rendering ---
+RENDER_TICKS = 9 * 3600          # One 9-hour workday at one tick per second
+RENDER_TK_TICKS = 600            # Ticks against real Tk widgets, when a display is available
+RENDER_BUDGET_US = 50            # p95 cost of one countdown tick (formatting + diff + pushes)
+
+def _render_ticks(push, ticks, start):
+    """Runs `ticks` one-second countdown ticks through a ViewModel and returns the per-tick costs (us)."""
+    from datetime import datetime, timedelta
+    from ui.view_model import ViewModel, workday_view
+
+    login_time = datetime.fromtimestamp(start)
+    logout_time = login_time + timedelta(hours=9)
+    view = ViewModel()
+    view.bind("progress", lambda value: push("progress", value))
+    view.bind("remaining", lambda value: push("remaining", value))
+    costs = []
+    for tick in range(ticks):
+        begin = time.perf_counter()
+        view.update(**workday_view(login_time, logout_time, start + tick))
+        costs.append((time.perf_counter() - begin) * 1e6)
+    return costs, view
+
+def _tk_pusher():
+    """Returns a push(name, value) that updates real Tk widgets, or None without a display."""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None, None
+    root.withdraw()
+    progress = tk.DoubleVar(root)
+    label = tk.Label(root)
+
+    def push(name, value):
+        if name == "progress":
+            progress.set(value)
+        else:
+            label.config(text=f"Time left: {value}")
+    return push, root
+
+def bench_render(runs=5):
+    """Measures the per-tick cost of the change-aware countdown/progress rendering."""
+    start = time.time() // 1 - 3600
+    over_budget = False
+    for run in range(runs):
+        pushes = {"progress": 0, "remaining": 0}
+        def push(name, value):
+            pushes[name] += 1
+        costs, view = _render_ticks(push, RENDER_TICKS, start)
+        costs.sort()
+        p95 = costs[int(len(costs) * 0.95)]
+        over_budget = over_budget or p95 > RENDER_BUDGET_US
+        if run == 0:
+            print(f"{RENDER_TICKS} ticks: progress pushed {pushes['progress']}x, countdown {pushes['remaining']}x, "
+                  f"{view.skips} unchanged values skipped")
+        print(f"run {run + 1}: mean {statistics.mean(costs):6.2f} us  p95 {p95:6.2f} us  "
+              f"max {costs[-1]:7.2f} us  budget {RENDER_BUDGET_US} us  [{'OK' if p95 <= RENDER_BUDGET_US else 'OVER BUDGET'}]")
+
+    push, root = _tk_pusher()
+    if push is None:
+        print("Tk widgets: skipped (no display)")
+    else:
+        try:
+            costs, _ = _render_ticks(push, RENDER_TK_TICKS, start)
+            costs.sort()
+            print(f"Tk widgets ({RENDER_TK_TICKS} ticks): mean {statistics.mean(costs):6.2f} us  "
+                  f"p95 {costs[int(len(costs) * 0.95)]:6.2f} us")
+        finally:
+            root.destroy()
+    return not over_budget
+
+# --- History browsing ---
+HISTORY_DAYS = 365
+HISTORY_EVENTS_PER_DAY = 200
+HISTORY_STEP_BUDGET_MS = 5       # p95 cost of one scroll step (rows for one screen)
+HISTORY_MEMORY_BUDGET_KB = 2048  # Peak memory held while scrolling the whole year
+
+def _write_synthetic_year(path, days=HISTORY_DAYS, per_day=HISTORY_EVENTS_PER_DAY):
+    """Writes a year of activity events (epoch-ms format) to a JSON log and returns how many."""
+    import json
+    import random
+    rng = random.Random(42)
+    apps = [("Visual Studio Code", "Code.exe"), ("Chrome", "chrome.exe"), ("Slack", "slack.exe"),
+            ("Outlook", "OUTLOOK.EXE"), ("Terminal", "WindowsTerminal.exe")]
+    start = int((time.time() - days * 86400) // 86400 * 86400 * 1000)
+    events = []
+    for day in range(days):
+        t = start + day * 86400000 + 9 * 3600000
+        for _ in range(per_day):
+            duration = rng.randint(5, 600)
+            title, process = rng.choice(apps)
+            kind = rng.choices(["active_app", "idle", "lock"], [90, 7, 3])[0]
+            events.append({"event": kind, "title": f"{title} - file{rng.randint(1, 50)}", "process_name": process,
+                           "start_ms": t, "end_ms": t + duration * 1000, "duration_seconds": duration})
+            t += duration * 1000
+    with open(path, "w") as f:
+        json.dump(events, f)
+    return len(events), start
+
+def bench_history(runs=3):
+    """Indexes a synthetic year of events and scrolls through it screen by screen."""
+    import random
+    import tempfile
+    import tracemalloc
+    from tracker.event_store import EventStore
+    from ui.history_browser import EventPager, VISIBLE_ROWS
+
+    over_budget = False
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "structured_log.json")
+        count, start_ms = _write_synthetic_year(log_file)
+        store = EventStore(log_file=log_file, db_file=os.path.join(tmp, "events.db"))
+        began = time.perf_counter()
+        store.sync()
+        print(f"indexed {count:,} events in {(time.perf_counter() - began) * 1000:.0f} ms "
+              f"(no-op re-sync {_time_ms(store.sync):.2f} ms)")
+
+        end_ms = start_ms + (HISTORY_DAYS + 1) * 86400000
+        queries = {
+            "newest first": {},
+            "by duration": {"sort": "duration"},
+            "idle only": {"event": "idle"},
+            "search 'slack'": {"search": "slack"},
+        }
+        for run in range(runs):
+            for name, query in queries.items():
+                pager = EventPager(store, start_ms, end_ms, **query)
+                steps = []
+                for offset in range(0, pager.total, VISIBLE_ROWS):
+                    began = time.perf_counter()
+                    pager.rows(offset, VISIBLE_ROWS)
+                    steps.append((time.perf_counter() - began) * 1000)
+                # Memory is traced in a second pass; tracing would distort the timings
+                tracemalloc.start()
+                traced = EventPager(store, start_ms, end_ms, **query)
+                for offset in range(0, traced.total, VISIBLE_ROWS):
+                    traced.rows(offset, VISIBLE_ROWS)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                steps.sort()
+                p95 = steps[int(len(steps) * 0.95)] if steps else 0
+                peak_kb = peak / 1024
+                ok = p95 <= HISTORY_STEP_BUDGET_MS and peak_kb <= HISTORY_MEMORY_BUDGET_KB
+                over_budget = over_budget or not ok
+                print(f"run {run + 1} {name:15s} {pager.total:7,} rows  {len(steps):6,} steps  "
+                      f"p95 {p95:5.2f} ms  max {steps[-1] if steps else 0:6.2f} ms  "
+                      f"peak {peak_kb:6.0f} KB  fetches {pager.fetches:5,}  [{'OK' if ok else 'OVER BUDGET'}]")
+            # Dragging the scrollbar: jumps to arbitrary positions use OFFSET
+            pager = EventPager(store, start_ms, end_ms)
+            rng = random.Random(run)
+            jumps = []
+            for _ in range(200):
+                began = time.perf_counter()
+                pager.rows(rng.randrange(pager.total), VISIBLE_ROWS)
+                jumps.append((time.perf_counter() - began) * 1000)
+            jumps.sort()
+            print(f"run {run + 1} {'random jumps':15s} p50 {jumps[100]:5.2f} ms  p95 {jumps[190]:5.2f} ms  max {jumps[-1]:6.2f} ms")
+        store.close()
+    print(f"budgets: {HISTORY_STEP_BUDGET_MS} ms per step, {HISTORY_MEMORY_BUDGET_KB} KB peak")
+    return not over_budget
+
+# --- Report email ---
+REPORT_CHART_SIZE = (2400, 1400)   # A chart saved at print resolution
+REPORT_LINES = (40, 4000)          # A typical weekly report, and a very long one
+REPORT_BUILD_BUDGET_MS = 25        # Building a report email whose chart is already cached
+
+def _synthetic_chart(path, size=REPORT_CHART_SIZE):
+    """Draws a bar chart with some anti-aliased detail, so PNG compression is realistic."""
+    import random
+    from PIL import Image, ImageDraw
+    rng = random.Random(1)
+    image = Image.new("RGB", size, "#23272e")
+    draw = ImageDraw.Draw(image)
+    bars = 60
+    width = size[0] // bars
+    for i in range(bars):
+        height = rng.randrange(size[1] // 10, size[1] - 40)
+        draw.rectangle([i * width + 4, size[1] - height, (i + 1) * width - 4, size[1]],
+                       fill=(79, 195, 247 - i * 2), outline="white")
+        draw.text((i * width + 6, size[1] - height - 14), f"{height // 7} min", fill="white")
+    image.save(path)
+
+def _report_html(text):
+    return f"<html><body><h2>WEEKLY PRODUCTIVITY REPORT</h2><pre>{text}</pre></body></html>"
+
+def bench_report(runs=5):
+    """Builds weekly report emails with a large chart: size versus an inline data: URI, and build cost."""
+    import base64
+    import tempfile
+    from tracker import report_mail
+
+    over_budget = False
+    with tempfile.TemporaryDirectory() as tmp:
+        chart = os.path.join(tmp, "weekly_productivity_chart.png")
+        _synthetic_chart(chart)
+        cache_dir = os.path.join(tmp, "chart_cache")
+        report_mail.CHART_CACHE_DIR = cache_dir
+        with open(chart, "rb") as f:
+            chart_bytes = f.read()
+
+        for lines in REPORT_LINES:
+            text = "\n".join(f"- Application window {i}: {i % 300} min" for i in range(lines))
+            html = _report_html(text)
+            inline = len(text) + len(html) + len(base64.b64encode(chart_bytes))
+            build = lambda: report_mail.build_report_message(
+                "Weekly Productivity Report", text, html, charts=[(chart, "Weekly chart")],
+                sender="tracker@example.com", recipient="me@example.com").as_bytes()
+
+            for name in os.listdir(cache_dir) if os.path.isdir(cache_dir) else []:
+                os.remove(os.path.join(cache_dir, name))
+            began = time.perf_counter()
+            message = build()
+            cold = (time.perf_counter() - began) * 1000
+            warm = sorted(_time_ms(build) for _ in range(runs))
+            median = warm[len(warm) // 2]
+            ok = median <= REPORT_BUILD_BUDGET_MS and len(message) <= report_mail.MAX_MESSAGE_BYTES
+            over_budget = over_budget or not ok
+            kind = "text summary" if b"multipart/related" not in message else "HTML + CID chart"
+            print(f"{lines:5,} lines  {kind:16s}  {len(message) / 1024:7.1f} KB (data: URI inline {inline / 1024:7.1f} KB)  "
+                  f"build cold {cold:6.1f} ms  cached median {median:5.1f} ms  [{'OK' if ok else 'OVER BUDGET'}]")
+    print(f"budgets: {REPORT_BUILD_BUDGET_MS} ms per cached build, {report_mail.MAX_MESSAGE_BYTES // 1024} KB per message")
+    return not over_budget
+
+# --- Export ---
+EXPORT_MIN_ROWS_PER_SECOND = 50000   # Event rows written per second, any format
+EXPORT_MEMORY_BUDGET_KB = 1024       # Peak memory held while exporting the whole year
+
+def bench_export(runs=3):
+    """Exports a synthetic year of events (and its daily totals) in each format, measuring rows/s and memory."""
+    import tempfile
+    import tracemalloc
+    from tracker.event_store import EventStore
+    from tracker.export import FORMATS, export_file
+
+    over_budget = False
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = os.path.join(tmp, "structured_log.json")
+        count, start_ms = _write_synthetic_year(log_file)
+        store = EventStore(log_file=log_file, db_file=os.path.join(tmp, "events.db"))
+        store.sync()
+        end_ms = start_ms + (HISTORY_DAYS + 1) * 86400000
+        print(f"{count:,} events over {HISTORY_DAYS} days")
+        for days in (False, True):
+            for fmt in FORMATS:
+                path = os.path.join(tmp, f"export.{fmt}")
+                timings = []
+                for _ in range(runs):
+                    began = time.perf_counter()
+                    rows = export_file(path, start_ms, end_ms, fmt=fmt, days=days, store=store)
+                    timings.append(time.perf_counter() - began)
+                tracemalloc.start()
+                export_file(path, start_ms, end_ms, fmt=fmt, days=days, store=store)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                best = min(timings)
+                # Daily totals read every event too, so throughput is counted in events read
+                rate = count / best
+                ok = peak / 1024 <= EXPORT_MEMORY_BUDGET_KB and (days or rate >= EXPORT_MIN_ROWS_PER_SECOND)
+                over_budget = over_budget or not ok
+                label = f"{'days' if days else 'events'} {fmt}"
+                print(f"{label:12s} {rows:7,} rows  {best * 1000:7.0f} ms  {rate:9,.0f} events/s  "
+                      f"{os.path.getsize(path) / 1048576:6.1f} MB  peak {peak / 1024:5.0f} KB  "
+                      f"[{'OK' if ok else 'OVER BUDGET'}]")
+        store.close()
+    print(f"budgets: {EXPORT_MIN_ROWS_PER_SECOND:,} event rows/s, {EXPORT_MEMORY_BUDGET_KB} KB peak")
+    return not over_budget
+
+# --- Team collector ---
+COLLECTOR_AGENTS = 2000
+COLLECTOR_WINDOWS = 4                # Minutes of simulated workday each agent uploads (one batch per minute)
+COLLECTOR_SPEED = 10                 # 2,000 agents at 10x real time offer about 270 batches/s
+COLLECTOR_P99_BUDGET_MS = 500        # Upload round trip, p99
+COLLECTOR_ERROR_BUDGET = 0.001       # Failed uploads / all uploads
+
+def bench_collector(runs=1):
+    """Thousands of simulated agents upload to a stand-in collector: throughput, latency and errors."""
+    from collector.loadtest import format_results, run_load_test
+
+    over_budget = False
+    for run in range(runs):
+        results = run_load_test(agents=COLLECTOR_AGENTS, hours=COLLECTOR_WINDOWS / 60, speed=COLLECTOR_SPEED)
+        # A fresh collector must store every event exactly once
+        ok = (results["p99_ms"] <= COLLECTOR_P99_BUDGET_MS and results["error_rate"] <= COLLECTOR_ERROR_BUDGET
+              and results["events_accepted"] == results["events"])
+        over_budget = over_budget or not ok
+        print(f"run {run + 1} [{'OK' if ok else 'OVER BUDGET'}]")
+        print(format_results(results))
+    print(f"budgets: p99 {COLLECTOR_P99_BUDGET_MS} ms, errors {COLLECTOR_ERROR_BUDGET:.1%}, every event stored once")
+    return not over_budget
+
+# --- Team queries ---
+TEAM_USERS = 300
+TEAM_DAYS = 120
+TEAM_EVENTS_PER_DAY = 30
+TEAM_COLD_BUDGET_MS = 100          # A dashboard query the cache has not seen
+TEAM_CACHED_BUDGET_MS = 1          # The same query again
+
+def _fill_team(store, users=TEAM_USERS, days=TEAM_DAYS, per_day=TEAM_EVENTS_PER_DAY):
+    """Ingests a synthetic team history, one batch per user and day. Returns the first day's start (ms)."""
+    import random
+    rng = random.Random(7)
+    processes = ["Code.exe", "chrome.exe", "slack.exe", "OUTLOOK.EXE", "EXCEL.EXE", "ms-teams.exe", "Figma.exe",
+                 "WindowsTerminal.exe", "notepad.exe", "POWERPNT.EXE"]
+    first_ms = int((time.time() - days * 86400) // 86400 * 86400 * 1000)
+    for number in range(users):
+        user = f"user{number:04d}"
+        for day in range(days):
+            t = first_ms + day * 86400000 + 9 * 3600000
+            events = []
+            for i in range(per_day):
+                duration = rng.randint(30, 1800)
+                kind = rng.choices(["active_app", "idle", "lock"], [85, 10, 5])[0]
+                events.append({"id": f"{user}:{day}:{i}", "event": kind, "title": f"doc{rng.randrange(500)}",
+                               "process_name": rng.choice(processes), "start_ms": t, "end_ms": t + duration * 1000,
+                               "duration_seconds": duration})
+                t += duration * 1000
+            store.ingest(user, f"{user}:{day}", events)
+    return first_ms
+
+def bench_team(runs=3):
+    """Team dashboard queries over hundreds of users and months of rollups, cold and cached."""
+    import tempfile
+    from datetime import datetime, timedelta, timezone
+    from collector.query import TeamQuery
+    from collector.rollups import TeamRollups
+    from collector.storage import ShardStore
+
+    over_budget = False
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ShardStore(tmp)
+        began = time.perf_counter()
+        first_ms = _fill_team(store)
+        print(f"ingested {TEAM_USERS * TEAM_DAYS * TEAM_EVENTS_PER_DAY:,} events for {TEAM_USERS} users "
+              f"x {TEAM_DAYS} days in {time.perf_counter() - began:.1f} s")
+        rollups = TeamRollups(store)
+        print(f"built rollups in {_time_ms(rollups.rebuild):.0f} ms")
+        query = TeamQuery(rollups)
+        first = datetime.fromtimestamp(first_ms / 1000, timezone.utc).date()
+        day = lambda offset: (first + timedelta(days=offset)).isoformat()
+        some_users = [f"user{number:04d}" for number in range(0, TEAM_USERS, 10)]
+        dashboards = {
+            "summary, all days": lambda: query.summary(day(0), day(TEAM_DAYS - 1)),
+            "summary, 30 users": lambda: query.summary(day(0), day(TEAM_DAYS - 1), some_users),
+            "user days, 1 month": lambda: query.user_days(day(TEAM_DAYS - 30), day(TEAM_DAYS - 1)),
+            "top apps, all days": lambda: query.top_apps(day(0), day(TEAM_DAYS - 1)),
+            "top apps, 30 users": lambda: query.top_apps(day(0), day(TEAM_DAYS - 1), some_users),
+            "distinct, all days": lambda: query.distinct(day(0), day(TEAM_DAYS - 1)),
+            "distinct, 30 users": lambda: query.distinct(day(0), day(TEAM_DAYS - 1), some_users),
+            "durations, all days": lambda: query.durations(day(0), day(TEAM_DAYS - 1)),
+            "durations, 30 users": lambda: query.durations(day(0), day(TEAM_DAYS - 1), some_users),
+        }
+        for run in range(runs):
+            # New data for the last day invalidates every cached answer that covers it
+            store.ingest("user0000", f"extra:{run}", [{"id": f"extra:{run}", "event": "active_app",
+                         "title": "late", "process_name": "Code.exe", "start_ms": first_ms + (TEAM_DAYS - 1) * 86400000
+                         + 20 * 3600000 + run * 60000, "end_ms": first_ms + (TEAM_DAYS - 1) * 86400000
+                         + 20 * 3600000 + run * 60000 + 60000, "duration_seconds": 60}])
+            rollups.flush()
+            for name, fn in dashboards.items():
+                cold = _time_ms(fn)
+                cached = min(_time_ms(fn) for _ in range(20))
+                ok = cold <= TEAM_COLD_BUDGET_MS and cached <= TEAM_CACHED_BUDGET_MS
+                over_budget = over_budget or not ok
+                print(f"run {run + 1} {name:20s} cold {cold:7.2f} ms  cached {cached:6.3f} ms  "
+                      f"[{'OK' if ok else 'OVER BUDGET'}]")
+        store.close()
+    print(f"budgets: {TEAM_COLD_BUDGET_MS} ms cold, {TEAM_CACHED_BUDGET_MS} ms cached")
+    return not over_budget
+
+# --- Sketch error bounds ---
+SKETCH_CARDINALITIES = (100, 1000, 10000, 100000)
+SKETCH_PARTS = 200               # Sketches each set of values is split across, then merged
+SKETCH_HLL_SIGMAS = 3            # Every HyperLogLog estimate must be within this many standard errors
+SKETCH_QUANTILES = (0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99, 0.999)
+
+def bench_sketches(runs=3):
+    """Checks the documented error bounds of the merged HyperLogLog and quantile sketches against exact answers."""
+    import math
+    import random
+    from collector.sketches import HyperLogLog, QuantileSketch
+
+    over_budget = False
+    for run in range(runs):
+        rng = random.Random(run)
+        for n in SKETCH_CARDINALITIES:
+            # Titles repeat across parts, like a title seen on several days
+            parts = [HyperLogLog() for _ in range(SKETCH_PARTS)]
+            for i in range(n):
+                for _ in range(rng.randint(1, 3)):
+                    rng.choice(parts).add(f"report_{run}_{i} - Visual Studio Code")
+            began = time.perf_counter()
+            merged = HyperLogLog()
+            for part in parts:
+                merged.merge(part)
+            estimate = merged.count()
+            merge_ms = (time.perf_counter() - began) * 1000
+            error = (estimate - n) / n
+            ok = abs(error) <= SKETCH_HLL_SIGMAS * merged.relative_error
+            over_budget = over_budget or not ok
+            print(f"run {run + 1} distinct {n:7,}  estimate {estimate:7,}  error {error:+6.2%}  "
+                  f"merge {SKETCH_PARTS} in {merge_ms:5.1f} ms  [{'OK' if ok else 'OVER BUDGET'}]")
+
+        # Session lengths: heavy-tailed, from seconds to hours, with some zero-length sessions
+        values = [0 if rng.random() < 0.01 else int(rng.lognormvariate(math.log(60), 1.5)) for _ in range(200000)]
+        parts = [QuantileSketch() for _ in range(SKETCH_PARTS)]
+        for value in values:
+            rng.choice(parts).add(value)
+        merged = QuantileSketch()
+        for part in parts:
+            merged.merge(part)
+        values.sort()
+        worst = 0.0
+        for q in SKETCH_QUANTILES:
+            exact = values[math.floor(q * (len(values) - 1))]
+            estimate = merged.quantile(q)
+            worst = max(worst, abs(estimate - exact) / exact if exact else abs(estimate))
+        ok = worst <= merged.relative_accuracy + 1e-9
+        over_budget = over_budget or not ok
+        print(f"run {run + 1} quantiles of {len(values):,} values  worst relative error {worst:.3%}  "
+              f"{len(merged.bins)} buckets  [{'OK' if ok else 'OVER BUDGET'}]")
+    print(f"bounds: distinct counts within {SKETCH_HLL_SIGMAS} standard errors "
+          f"({SKETCH_HLL_SIGMAS * HyperLogLog().relative_error:.1%}), "
+          f"quantiles within {QuantileSketch().relative_accuracy:.0%} relative error")
+    return not over_budget
+
+def _time_ms(fn):
+    began = time.perf_counter()
+    fn()
+    return (time.perf_counter() - began) * 1000
+
+BENCHMARKS = {
+    "startup": bench_startup,
+    "render": bench_render,
+    "history": bench_history,
+    "report": bench_report,
+    "export": bench_export,
+    "collector": bench_collector,
+    "team": bench_team,
+    "sketches": bench_sketches,
+}
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(__doc__)
+        sys.exit(2)
+    # Each benchmark has its own default number of runs
+    options = {"runs": int(sys.argv[sys.argv.index("--runs") + 1])} if "--runs" in sys.argv else {}
+    ok = BENCHMARKS[sys.argv[1]](**options)
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
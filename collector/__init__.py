@@ -0,0 +1 @@
+# This file makes the 'collector' directory a Python package.
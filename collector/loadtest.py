@@ -0,0 +1,280 @@
+# collector/loadtest.py
+"""
+Load test for the team collector: many simulated agents replay a synthetic
+workday against it at accelerated speed.
+
+Each agent uploads like tracker/uploader.py does: every BATCH_SECONDS of
+simulated time, one gzip batch holding the events that started in that
+window, with stable event and batch ids. An agent's workday is generated
+from a seed, so a run can be repeated exactly. Requests are scheduled on the
+accelerated clock and sent by a pool of worker threads with kept-alive
+connections; a request that leaves later than scheduled counts as lag, which
+shows when the collector (or this client) cannot keep up.
+
+    python -m collector.loadtest [--agents 2000] [--hours 8] [--speed 120]
+                                 [--concurrency 64] [--url http://host:8787]
+
+Without --url a stand-in collector is started in a subprocess on a free port
+with a temporary data directory. benchmark.py's "collector" entry runs this
+with fixed settings and budgets.
+"""
+import gzip
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tracker.uploader import MAX_BATCH_DELAY_SECONDS, stable_event_id
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_AGENTS = 2000
+DEFAULT_HOURS = 8
+DEFAULT_SPEED = 120                      # Simulated seconds per real second
+DEFAULT_CONCURRENCY = 64
+BATCH_SECONDS = MAX_BATCH_DELAY_SECONDS  # An agent sends what it logged in the last minute
+MEAN_EVENT_SECONDS = 40                  # Window switches are frequent; idle and lock spans are rarer
+WORKDAY_START_HOUR = 9
+REQUEST_TIMEOUT = 30
+APPS = [("Visual Studio Code", "Code.exe"), ("Chrome", "chrome.exe"), ("Slack", "slack.exe"),
+        ("Outlook", "OUTLOOK.EXE"), ("Terminal", "WindowsTerminal.exe"), ("Excel", "EXCEL.EXE"),
+        ("Teams", "ms-teams.exe"), ("Figma", "Figma.exe")]
+TZ_OFFSETS = (-480, -300, 0, 60, 120, 330, 540)
+
+class SimulatedAgent:
+    """One workstation: a user, an agent id and a deterministic workday of events."""
+    def __init__(self, number, day_start_ms, seed=0):
+        self.user = f"user{number:05d}"
+        self.agent = f"{self.user}-pc"
+        self.seed = seed * 1_000_003 + number
+        self.day_start_ms = day_start_ms
+        self.tz_offset_minutes = TZ_OFFSETS[number % len(TZ_OFFSETS)]
+        rng = random.Random(self.seed)
+        # Each user works on their own documents, so titles have high cardinality across the team
+        self.documents = [f"{rng.choice(['report', 'main', 'notes', 'design', 'budget'])}_{rng.randrange(10000)}"
+                          for _ in range(rng.randint(5, 40))]
+
+    def events(self, window):
+        """The events that started in the window-th BATCH_SECONDS of the workday."""
+        rng = random.Random(self.seed * 100_003 + window)
+        window_start = self.day_start_ms + window * BATCH_SECONDS * 1000
+        count = _poisson(rng, BATCH_SECONDS / MEAN_EVENT_SECONDS)
+        events = []
+        for start_ms in sorted(window_start + rng.randrange(BATCH_SECONDS * 1000) for _ in range(count)):
+            kind = rng.choices(("active_app", "idle", "lock"), (90, 7, 3))[0]
+            duration = max(1, int(rng.lognormvariate(math.log(MEAN_EVENT_SECONDS), 1.0)))
+            app, process = rng.choice(APPS)
+            event = {"event": kind, "title": f"{rng.choice(self.documents)} - {app}" if kind == "active_app"
+                     else kind.capitalize(), "process_name": process if kind == "active_app" else "",
+                     "start_ms": start_ms, "end_ms": start_ms + duration * 1000, "duration_seconds": duration}
+            event["id"] = stable_event_id(event, self.agent)
+            events.append(event)
+        return events
+
+    def batch_body(self, window):
+        """The gzip-compressed upload for a window, and how many events it holds."""
+        events = self.events(window)
+        batch = {"user": self.user, "agent": self.agent, "batch_id": f"{self.agent}:w{window}",
+                 "tz_offset_minutes": self.tz_offset_minutes, "events": events}
+        return gzip.compress(json.dumps(batch, separators=(",", ":")).encode("utf-8"), compresslevel=6), len(events)
+
+def _poisson(rng, mean):
+    # Knuth's method; fine for the small means used here
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+class LoadTest:
+    def __init__(self, url, agents=DEFAULT_AGENTS, hours=DEFAULT_HOURS, speed=DEFAULT_SPEED,
+                 concurrency=DEFAULT_CONCURRENCY, token=None, seed=0):
+        parts = urlsplit(url)
+        self.netloc = parts.netloc
+        self.path = parts.path.rstrip("/") + "/v1/events"
+        self.speed = speed
+        self.concurrency = concurrency
+        self.token = token
+        day_start_ms = int(time.time() // 86400 * 86400 + WORKDAY_START_HOUR * 3600) * 1000
+        self.agents = [SimulatedAgent(number, day_start_ms, seed) for number in range(agents)]
+        windows = int(hours * 3600 // BATCH_SECONDS)
+        # Agents' upload times are spread over the window, like agents that started at different moments
+        rng = random.Random(seed)
+        phases = [rng.random() * BATCH_SECONDS for _ in self.agents]
+        self.schedule = sorted(((window + 1) * BATCH_SECONDS + phases[i], i, window)
+                               for window in range(windows) for i in range(agents))
+        self._next = 0
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.lags = []
+        self.errors = {}
+        self.events_sent = self.events_accepted = self.bytes_sent = 0
+
+    def _take(self):
+        with self._lock:
+            if self._next >= len(self.schedule):
+                return None
+            task = self.schedule[self._next]
+            self._next += 1
+            return task
+
+    def _error(self, kind):
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def _worker(self, began):
+        conn = None
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        while True:
+            task = self._take()
+            if task is None:
+                break
+            at, agent_index, window = task
+            body, count = self.agents[agent_index].batch_body(window)
+            due = began + at / self.speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            sent_at = time.perf_counter()
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(self.netloc, timeout=REQUEST_TIMEOUT)
+                conn.request("POST", self.path, body, headers)
+                response = conn.getresponse()
+                reply = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self._error(type(e).__name__)
+                if conn is not None:
+                    conn.close()
+                conn = None
+                continue
+            latency = (time.perf_counter() - sent_at) * 1000
+            if response.status != 200:
+                self._error(f"HTTP {response.status}")
+                continue
+            accepted = json.loads(reply).get("accepted", 0)
+            with self._lock:
+                self.latencies.append(latency)
+                self.lags.append(max(0.0, sent_at - due) * 1000)
+                self.events_sent += count
+                self.events_accepted += accepted
+                self.bytes_sent += len(body)
+        if conn is not None:
+            conn.close()
+
+    def run(self):
+        """Replays the whole schedule and returns the results."""
+        began = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(began,), daemon=True)
+                   for _ in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - began
+        latencies, lags = sorted(self.latencies), sorted(self.lags)
+        requests = len(self.schedule)
+        failed = sum(self.errors.values())
+        return {
+            "agents": len(self.agents),
+            "requests": requests,
+            "seconds": elapsed,
+            "offered_rps": requests / (self.schedule[-1][0] / self.speed) if requests else 0,
+            "rps": (requests - failed) / elapsed,
+            "events": self.events_sent,
+            "events_accepted": self.events_accepted,
+            "events_per_second": self.events_sent / elapsed,
+            "mb_sent": self.bytes_sent / 1048576,
+            "p50_ms": percentile(latencies, 0.50),
+            "p99_ms": percentile(latencies, 0.99),
+            "max_ms": latencies[-1] if latencies else 0.0,
+            "p99_lag_ms": percentile(lags, 0.99),
+            "errors": dict(self.errors),
+            "error_rate": failed / requests if requests else 0.0,
+        }
+
+def format_results(results):
+    errors = ", ".join(f"{kind}: {n}" for kind, n in results["errors"].items()) or "none"
+    return "\n".join([
+        f"{results['agents']:,} agents, {results['requests']:,} batches in {results['seconds']:.1f} s "
+        f"(offered {results['offered_rps']:,.0f} req/s, achieved {results['rps']:,.0f} req/s)",
+        f"events: {results['events']:,} sent, {results['events_accepted']:,} stored, "
+        f"{results['events_per_second']:,.0f}/s, {results['mb_sent']:.1f} MB compressed",
+        f"latency: p50 {results['p50_ms']:.1f} ms  p99 {results['p99_ms']:.1f} ms  max {results['max_ms']:.1f} ms  "
+        f"(p99 send lag {results['p99_lag_ms']:.0f} ms)",
+        f"errors: {results['error_rate']:.3%} ({errors})",
+    ])
+
+class StandInCollector:
+    """A collector subprocess on a free local port with a throwaway data directory."""
+    def __init__(self):
+        probe = socket.socket()
+        probe.bind(("127.0.0.1", 0))
+        self.port = probe.getsockname()[1]
+        probe.close()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.data_dir = tempfile.mkdtemp(prefix="collector-load-")
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "collector.server", "--host", "127.0.0.1", "--port", str(self.port),
+             "--data", self.data_dir], cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 15
+        while True:
+            try:
+                urllib.request.urlopen(self.url + "/v1/health", timeout=1).read()
+                return self
+            except OSError:
+                if time.time() > deadline or self.process.poll() is not None:
+                    self.__exit__()
+                    raise RuntimeError("Stand-in collector did not start")
+                time.sleep(0.1)
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+def run_load_test(url=None, **settings):
+    """Runs a load test against url, or against a stand-in collector if url is None."""
+    if url:
+        return LoadTest(url, **settings).run()
+    with StandInCollector() as collector:
+        return LoadTest(collector.url, **settings).run()
+
+def _option(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+def main():
+    results = run_load_test(
+        url=_option("--url"),
+        agents=int(_option("--agents", DEFAULT_AGENTS)),
+        hours=float(_option("--hours", DEFAULT_HOURS)),
+        speed=float(_option("--speed", DEFAULT_SPEED)),
+        concurrency=int(_option("--concurrency", DEFAULT_CONCURRENCY)),
+        token=_option("--token"),
+    )
+    print(format_results(results))
+    sys.exit(1 if results["error_rate"] else 0)
+
+if __name__ == "__main__":
+    main()
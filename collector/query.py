@@ -0,0 +1,236 @@
+# collector/query.py
+"""
+Team queries over the collected data: hours per user per day, idle/lock
+ratios, top apps, distinct apps and titles, and session and focus-block
+length percentiles, for any day range and any set of users.
+
+Queries read only the precomputed rollups (collector/rollups.py), never raw
+events, so a dashboard over hundreds of users and months of data is answered
+by one indexed query. Distinct counts and percentiles merge per-day sketches
+(collector/sketches.py documents their error bounds).
+
+Answers are cached (LRU, CACHE_SIZE entries). When the rollups for a user's
+days are refreshed, every cached answer that covers that user and one of
+those days is dropped, and an answer being computed for them is not cached,
+so answers never lag the rollups. Refreshes for other users or days leave
+the cache alone.
+
+Days are "YYYY-MM-DD" strings in each user's local time; ranges include
+both ends. `users` is a list of user names, or None for everyone.
+
+    python -m collector.query FROM TO [--users a,b] [--data DIR]   # print a team summary
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from collector.sketches import HyperLogLog, QuantileSketch
+from tracker.instrumentation import metrics
+
+CACHE_SIZE = 512
+TOP_APPS_LIMIT = 10
+QUANTILES = (0.5, 0.9, 0.99)
+
+def validate_day(day):
+    """Returns day if it is a YYYY-MM-DD date, else raises ValueError."""
+    datetime.strptime(day, "%Y-%m-%d")
+    return day
+
+def _ratios(active, idle, lock):
+    tracked = active + idle + lock
+    return {
+        "active_hours": round(active / 3600, 2),
+        "idle_ratio": round(idle / tracked, 4) if tracked else 0.0,
+        "lock_ratio": round(lock / tracked, 4) if tracked else 0.0,
+    }
+
+def _user_filter(users, column="user"):
+    if users is None:
+        return "", []
+    if not users:
+        return " AND 0", []
+    return f" AND {column} IN ({','.join('?' * len(users))})", list(users)
+
+class TeamQuery:
+    def __init__(self, rollups, cache_size=CACHE_SIZE):
+        self.rollups = rollups
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # key -> (users frozenset or None, start_day, end_day, result)
+        self._computing = {}  # token -> [users frozenset or None, start_day, end_day, invalidated]
+        self._next_token = 0
+        self._lock = threading.Lock()
+        rollups.add_listener(self.invalidate)
+
+    def invalidate(self, user, days):
+        """Drops cached answers that include this user and any of these days."""
+        def covers(users, start, end):
+            return (users is None or user in users) and any(start <= day <= end for day in days)
+
+        with self._lock:
+            stale = [key for key, (users, start, end, _) in self._cache.items() if covers(users, start, end)]
+            for key in stale:
+                del self._cache[key]
+            for computing in self._computing.values():
+                if covers(*computing[:3]):
+                    computing[3] = True
+        if stale:
+            metrics.increment("query_cache_invalidated", len(stale))
+
+    def _cached(self, name, start_day, end_day, users, compute, *args):
+        users = None if users is None else tuple(sorted(set(users)))
+        key = (name, start_day, end_day, users) + args
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+                metrics.increment("query_cache_hits")
+                return entry[3]
+        validate_day(start_day)
+        validate_day(end_day)
+        user_set = None if users is None else frozenset(users)
+        with self._lock:
+            token = self._next_token
+            self._next_token += 1
+            computing = self._computing[token] = [user_set, start_day, end_day, False]
+        started = time.perf_counter()
+        try:
+            result = compute(start_day, end_day, users, *args)
+        except Exception:
+            with self._lock:
+                del self._computing[token]
+            raise
+        metrics.record_stage(f"query-{name}", (time.perf_counter() - started) * 1000)
+        with self._lock:
+            del self._computing[token]
+            if computing[3]:
+                return result  # Its rollups changed while computing; this answer may already be stale
+            self._cache[key] = (user_set, start_day, end_day, result)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return result
+
+    # --- Queries ---
+    def user_days(self, start_day, end_day, users=None):
+        """One row per user and day with activity: hours and idle/lock ratios."""
+        return self._cached("user-days", start_day, end_day, users, self._user_days)
+
+    def summary(self, start_day, end_day, users=None):
+        """Per-user totals over the range (most active first) and the team's totals."""
+        return self._cached("summary", start_day, end_day, users, self._summary)
+
+    def top_apps(self, start_day, end_day, users=None, limit=TOP_APPS_LIMIT):
+        """The apps (process names) with the most active time over the range, and on how many user-days they were used."""
+        return self._cached("top-apps", start_day, end_day, users, self._top_apps, limit)
+
+    def distinct(self, start_day, end_day, users=None):
+        """Estimated numbers of distinct apps and window titles used over the range."""
+        return self._cached("distinct", start_day, end_day, users, self._distinct)
+
+    def durations(self, start_day, end_day, users=None, quantiles=QUANTILES):
+        """Estimated percentiles (seconds) of session and focus-block lengths over the range."""
+        return self._cached("durations", start_day, end_day, users, self._durations, tuple(quantiles))
+
+    def _sketch_rows(self, columns, start_day, end_day, users):
+        """Per-day sketch blobs: the team's when users is None, else each user's."""
+        if users is None:
+            return self.rollups.connection().execute(
+                f"SELECT {columns} FROM day_sketches WHERE day BETWEEN ? AND ?", (start_day, end_day))
+        where, params = _user_filter(users)
+        return self.rollups.connection().execute(
+            f"SELECT {columns} FROM user_day_sketches WHERE day BETWEEN ? AND ?{where}", [start_day, end_day] + params)
+
+    def _distinct(self, start_day, end_day, users):
+        apps, titles = HyperLogLog(), HyperLogLog()
+        for apps_blob, titles_blob in self._sketch_rows("apps, titles", start_day, end_day, users):
+            apps.merge(HyperLogLog.from_bytes(apps_blob))
+            titles.merge(HyperLogLog.from_bytes(titles_blob))
+        return {"apps": apps.count(), "titles": titles.count(),
+                "relative_standard_error": round(apps.relative_error, 4)}
+
+    def _durations(self, start_day, end_day, users, quantiles):
+        sessions, focus = QuantileSketch(), QuantileSketch()
+        for sessions_blob, focus_blob in self._sketch_rows("sessions, focus", start_day, end_day, users):
+            sessions.merge(QuantileSketch.from_bytes(sessions_blob))
+            focus.merge(QuantileSketch.from_bytes(focus_blob))
+
+        def percentiles(sketch):
+            result = {"count": sketch.count}
+            for q in quantiles:
+                value = sketch.quantile(q)
+                result[f"p{q * 100:g}"] = None if value is None else round(value, 1)
+            return result
+        return {"sessions": percentiles(sessions), "focus_blocks": percentiles(focus),
+                "relative_accuracy": sessions.relative_accuracy}
+
+    def _user_days(self, start_day, end_day, users):
+        where, params = _user_filter(users)
+        rows = self.rollups.connection().execute(
+            "SELECT user, day, events, active_seconds, idle_seconds, lock_seconds, first_start_ms, last_end_ms "
+            f"FROM user_days WHERE day BETWEEN ? AND ?{where} ORDER BY user, day", [start_day, end_day] + params)
+        return [{"user": user, "day": day, "events": events, **_ratios(active, idle, lock),
+                 "first_start_ms": first, "last_end_ms": last}
+                for user, day, events, active, idle, lock, first, last in rows]
+
+    def _summary(self, start_day, end_day, users):
+        where, params = _user_filter(users)
+        rows = self.rollups.connection().execute(
+            "SELECT user, COUNT(*), SUM(events), SUM(active_seconds), SUM(idle_seconds), SUM(lock_seconds) "
+            f"FROM user_days WHERE day BETWEEN ? AND ?{where} GROUP BY user ORDER BY SUM(active_seconds) DESC",
+            [start_day, end_day] + params).fetchall()
+        per_user = [{"user": user, "days": days, "events": events, **_ratios(active, idle, lock),
+                     "hours_per_day": round(active / 3600 / days, 2)}
+                    for user, days, events, active, idle, lock in rows]
+        active, idle, lock = (sum(row[i] for row in rows) for i in (3, 4, 5))
+        user_days = sum(row[1] for row in rows)
+        team = {"users": len(rows), "user_days": user_days, "events": sum(row[2] for row in rows),
+                **_ratios(active, idle, lock),
+                "hours_per_user_day": round(active / 3600 / user_days, 2) if user_days else 0.0}
+        return {"start_day": start_day, "end_day": end_day, "team": team, "users": per_user}
+
+    def _top_apps(self, start_day, end_day, users, limit):
+        conn = self.rollups.connection()
+        if users is None:
+            # Team-wide totals are precomputed per day
+            rows = conn.execute(
+                "SELECT app, SUM(seconds), SUM(users) FROM day_apps WHERE day BETWEEN ? AND ? "
+                "GROUP BY app ORDER BY SUM(seconds) DESC LIMIT ?", (start_day, end_day, limit))
+        else:
+            where, params = _user_filter(users)
+            rows = conn.execute(
+                f"SELECT app, SUM(seconds), COUNT(*) FROM user_day_apps WHERE day BETWEEN ? AND ?{where} "
+                "GROUP BY app ORDER BY SUM(seconds) DESC LIMIT ?", [start_day, end_day] + params + [limit])
+        return [{"app": app, "active_hours": round(seconds / 3600, 2), "user_days": user_days}
+                for app, seconds, user_days in rows]
+
+def _option(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+def main():
+    from collector.rollups import TeamRollups
+    from collector.storage import ShardStore, DEFAULT_DATA_DIR
+
+    if len(sys.argv) < 3 or sys.argv[1].startswith("--"):
+        print(__doc__)
+        sys.exit(2)
+    users = _option("--users")
+    store = ShardStore(_option("--data", DEFAULT_DATA_DIR))
+    rollups = TeamRollups(store)
+    if rollups.needs_rebuild():
+        rollups.rebuild()
+    query = TeamQuery(rollups)
+    try:
+        result = query.summary(sys.argv[1], sys.argv[2], users.split(",") if users else None)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    finally:
+        store.close()
+    print(json.dumps(result, indent=2))
+
+if __name__ == "__main__":
+    main()
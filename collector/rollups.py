@@ -0,0 +1,320 @@
+# collector/rollups.py
+"""
+Precomputed per-user, per-day rollups of the collected events.
+
+Raw events stay in the per-user shards (collector/storage.py). For team
+queries, the totals are kept in one database, <data dir>/team.db:
+- user_days: events, active/idle/lock seconds and first/last activity per
+  user and day, indexed both by (user, day) and by (day, user);
+- user_day_apps: active seconds per user, day and app (process name);
+- day_apps: the same summed over the whole team, with how many users used
+  each app that day, so team-wide top apps do not scan every user. It is
+  updated by each user's difference, not recomputed;
+- user_day_sketches / day_sketches: mergeable sketches (collector/sketches.py)
+  per user and day and for the whole team per day. HyperLogLogs count
+  distinct apps and titles, and quantile sketches hold the lengths of
+  sessions (one active-window span) and of focus blocks (active time not
+  broken by idle, lock or a gap over FOCUS_GAP_SECONDS).
+
+When a batch adds events, the store tells the rollups which user and days
+changed. Those (user, day) pairs are marked dirty. A background thread
+recomputes them from the shard at most every REFRESH_SECONDS, so a user
+uploading every minute costs one recompute per day, not one per batch.
+After each refresh, listeners (e.g. the query cache) are told what changed.
+
+    python -m collector.rollups --rebuild [--data DIR]   # recompute everything from the shards
+"""
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from collector.sketches import HyperLogLog, QuantileSketch
+from collector.storage import ShardStore, DEFAULT_DATA_DIR
+from tracker.instrumentation import metrics
+
+TEAM_DB_NAME = "team.db"
+ROLLUP_VERSION = "2"  # Bumped when rollups gain data that must be rebuilt from the shards
+REFRESH_SECONDS = 1.0
+FOCUS_GAP_SECONDS = 120
+SKETCHES = ("apps", "titles", "sessions", "focus")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_days (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    events INTEGER NOT NULL,
+    active_seconds INTEGER NOT NULL,
+    idle_seconds INTEGER NOT NULL,
+    lock_seconds INTEGER NOT NULL,
+    first_start_ms INTEGER,
+    last_end_ms INTEGER,
+    PRIMARY KEY (user, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS user_days_day ON user_days (day, user);
+CREATE TABLE IF NOT EXISTS user_day_apps (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    app TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    PRIMARY KEY (user, day, app)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS user_day_apps_day ON user_day_apps (day, app);
+CREATE TABLE IF NOT EXISTS day_apps (
+    day TEXT NOT NULL,
+    app TEXT NOT NULL,
+    seconds INTEGER NOT NULL,
+    users INTEGER NOT NULL,
+    PRIMARY KEY (day, app)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS user_day_sketches (
+    user TEXT NOT NULL,
+    day TEXT NOT NULL,
+    apps BLOB NOT NULL,
+    titles BLOB NOT NULL,
+    sessions BLOB NOT NULL,
+    focus BLOB NOT NULL,
+    PRIMARY KEY (user, day)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS user_day_sketches_day ON user_day_sketches (day, user);
+CREATE TABLE IF NOT EXISTS day_sketches (
+    day TEXT PRIMARY KEY,
+    apps BLOB NOT NULL,
+    titles BLOB NOT NULL,
+    sessions BLOB NOT NULL,
+    focus BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def new_sketches():
+    return {"apps": HyperLogLog(), "titles": HyperLogLog(), "sessions": QuantileSketch(), "focus": QuantileSketch()}
+
+def load_sketches(row):
+    """Sketches from a (apps, titles, sessions, focus) row of blobs."""
+    return {"apps": HyperLogLog.from_bytes(row[0]), "titles": HyperLogLog.from_bytes(row[1]),
+            "sessions": QuantileSketch.from_bytes(row[2]), "focus": QuantileSketch.from_bytes(row[3])}
+
+def summarize_day(shard_conn, day):
+    """Totals, per-app seconds and sketches for one day of a shard, as (totals, {app: seconds}, sketches)."""
+    totals = {"events": 0, "active_seconds": 0, "idle_seconds": 0, "lock_seconds": 0,
+              "first_start_ms": None, "last_end_ms": None}
+    apps = {}
+    sketches = new_sketches()
+    focus = 0
+    focus_end_ms = None
+    rows = shard_conn.execute(
+        "SELECT event, title, process_name, start_ms, end_ms, duration_seconds FROM events "
+        "WHERE day = ? ORDER BY start_ms", (day,))
+    for event, title, process_name, start_ms, end_ms, seconds in rows:
+        totals["events"] += 1
+        if totals["first_start_ms"] is None:
+            totals["first_start_ms"] = start_ms
+        if totals["last_end_ms"] is None or end_ms > totals["last_end_ms"]:
+            totals["last_end_ms"] = end_ms
+        if event == "active_app":
+            totals["active_seconds"] += seconds
+            app = process_name or "Unknown Process"
+            apps[app] = apps.get(app, 0) + seconds
+            sketches["apps"].add(app)
+            sketches["titles"].add(title)
+            sketches["sessions"].add(seconds)
+            if focus_end_ms is not None and start_ms - focus_end_ms > FOCUS_GAP_SECONDS * 1000:
+                sketches["focus"].add(focus)
+                focus = 0
+            focus += seconds
+            focus_end_ms = max(end_ms, focus_end_ms or end_ms)
+            continue
+        if event == "idle":
+            totals["idle_seconds"] += seconds
+        elif event == "lock":
+            totals["lock_seconds"] += seconds
+        else:
+            continue
+        # Idle and lock end a focus block
+        if focus:
+            sketches["focus"].add(focus)
+        focus, focus_end_ms = 0, None
+    if focus:
+        sketches["focus"].add(focus)
+    return totals, apps, sketches
+
+class TeamRollups:
+    def __init__(self, store, refresh_seconds=REFRESH_SECONDS):
+        self.store = store
+        self.db_file = os.path.join(store.data_dir, TEAM_DB_NAME)
+        self.refresh_seconds = refresh_seconds
+        self._local = threading.local()
+        self._dirty = {}  # user -> set of days
+        self._dirty_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._listeners = []
+        self.thread = None
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+        store.add_listener(self.mark_dirty)
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_file, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add_listener(self, callback):
+        """callback(user, days) is called after the rollups for those days were refreshed."""
+        self._listeners.append(callback)
+
+    def mark_dirty(self, user, days):
+        with self._dirty_lock:
+            self._dirty.setdefault(user, set()).update(days)
+        self._wake.set()
+
+    def flush(self):
+        """Refreshes every dirty (user, day) now. Returns how many were refreshed."""
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, {}
+        refreshed = 0
+        for user, days in dirty.items():
+            self.refresh(user, sorted(days))
+            refreshed += len(days)
+        return refreshed
+
+    def refresh(self, user, days, team_sketches=True):
+        """Recomputes a user's rollups for the given days from their shard."""
+        started = time.perf_counter()
+        with self.store.locked(user) as shard:
+            summaries = {day: summarize_day(shard.conn, day) for day in days}
+        with self._write_lock:
+            conn = self.connection()
+            with conn:
+                for day, (totals, apps, sketches) in summaries.items():
+                    self._write_day(conn, user, day, totals, apps)
+                    self._write_sketches(conn, user, day, sketches, team_sketches)
+        metrics.record_stage("rollup-refresh", (time.perf_counter() - started) * 1000)
+        for callback in self._listeners:
+            callback(user, days)
+
+    def _write_day(self, conn, user, day, totals, apps):
+        conn.execute("INSERT OR REPLACE INTO user_days VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                     (user, day, totals["events"], totals["active_seconds"], totals["idle_seconds"],
+                      totals["lock_seconds"], totals["first_start_ms"], totals["last_end_ms"]))
+        # The team's totals change by this user's difference, so other users' rows are not re-read
+        old = conn.execute("SELECT app, seconds FROM user_day_apps WHERE user = ? AND day = ?", (user, day)).fetchall()
+        conn.executemany("UPDATE day_apps SET seconds = seconds - ?, users = users - 1 WHERE day = ? AND app = ?",
+                         [(seconds, day, app) for app, seconds in old])
+        conn.executemany("INSERT INTO day_apps VALUES (?, ?, ?, 1) ON CONFLICT (day, app) "
+                         "DO UPDATE SET seconds = seconds + excluded.seconds, users = users + 1",
+                         [(day, app, seconds) for app, seconds in apps.items()])
+        conn.execute("DELETE FROM day_apps WHERE day = ? AND users <= 0", (day,))
+        conn.execute("DELETE FROM user_day_apps WHERE user = ? AND day = ?", (user, day))
+        conn.executemany("INSERT INTO user_day_apps VALUES (?, ?, ?, ?)",
+                         [(user, day, app, seconds) for app, seconds in apps.items()])
+
+    def _write_sketches(self, conn, user, day, sketches, team_sketches):
+        blobs = [sketches[name].to_bytes() for name in SKETCHES]
+        if team_sketches:
+            # HyperLogLogs only grow as a day gains events, so the team's absorb the new ones;
+            # quantile counts are swapped: the user's old counts out, the new ones in
+            old = conn.execute("SELECT sessions, focus FROM user_day_sketches WHERE user = ? AND day = ?",
+                               (user, day)).fetchone()
+            row = conn.execute("SELECT apps, titles, sessions, focus FROM day_sketches WHERE day = ?",
+                               (day,)).fetchone()
+            team = load_sketches(row) if row else new_sketches()
+            for name in SKETCHES:
+                team[name].merge(sketches[name])
+            if old:
+                team["sessions"].subtract(QuantileSketch.from_bytes(old[0]))
+                team["focus"].subtract(QuantileSketch.from_bytes(old[1]))
+            conn.execute("INSERT OR REPLACE INTO day_sketches VALUES (?, ?, ?, ?, ?)",
+                         [day] + [team[name].to_bytes() for name in SKETCHES])
+        conn.execute("INSERT OR REPLACE INTO user_day_sketches VALUES (?, ?, ?, ?, ?, ?)", [user, day] + blobs)
+
+    def _rebuild_team_sketches(self):
+        """Recomputes the team's per-day sketches by merging every user's, one day at a time."""
+        with self._write_lock:
+            conn = self.connection()
+            with conn:
+                conn.execute("DELETE FROM day_sketches")
+                days = [row[0] for row in conn.execute("SELECT DISTINCT day FROM user_day_sketches")]
+                for day in days:
+                    team = new_sketches()
+                    for row in conn.execute("SELECT apps, titles, sessions, focus FROM user_day_sketches "
+                                            "WHERE day = ?", (day,)):
+                        for name, sketch in load_sketches(row).items():
+                            team[name].merge(sketch)
+                    conn.execute("INSERT INTO day_sketches VALUES (?, ?, ?, ?, ?)",
+                                 [day] + [team[name].to_bytes() for name in SKETCHES])
+
+    def rebuild(self):
+        """Recomputes all rollups from the shards, e.g. for shards collected before rollups existed."""
+        users = self.store.users()
+        with self._write_lock, self.connection() as conn:
+            for table in ("user_days", "user_day_apps", "day_apps", "user_day_sketches", "day_sketches"):
+                conn.execute(f"DELETE FROM {table}")
+        for user in users:
+            with self.store.locked(user) as shard:
+                days = [row[0] for row in shard.conn.execute("SELECT DISTINCT day FROM events")]
+            if days:
+                # The team's sketches are merged once per day at the end, not once per user and day
+                self.refresh(user, days, team_sketches=False)
+        self._rebuild_team_sketches()
+        with self._write_lock, self.connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('rebuilt_at', ?)", (str(time.time()),))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (ROLLUP_VERSION,))
+        return len(users)
+
+    def needs_rebuild(self):
+        """True if shards exist but the rollups were never built from them, or by an older version."""
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return (row is None or row[0] != ROLLUP_VERSION) and any(
+            name.endswith(".db") for name in os.listdir(self.store.users_dir))
+
+    # --- Background thread ---
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="rollups", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout=10)
+        self.flush()
+
+    def _run(self):
+        if self.needs_rebuild():
+            logging.info(f"🧮 Rebuilt rollups for {self.rebuild()} users.")
+        while not self._stop.is_set():
+            self._wake.wait()
+            self._wake.clear()
+            # Let a burst of batches accumulate so each dirty day is recomputed once
+            if self._stop.wait(self.refresh_seconds):
+                break
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"❌ Rollup refresh failed: {e}", exc_info=True)
+
+def _option(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+def main():
+    store = ShardStore(_option("--data", DEFAULT_DATA_DIR))
+    rollups = TeamRollups(store)
+    if "--rebuild" in sys.argv:
+        started = time.perf_counter()
+        print(f"🧮 Rebuilt rollups for {rollups.rebuild()} users in {time.perf_counter() - started:.1f} s")
+    else:
+        print(__doc__)
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# collector/server.py
+"""
+Team collector: receives event batches from many tracker agents over HTTP.
+
+    POST /v1/events     a batch (JSON, optionally gzip/deflate-compressed)
+    GET  /v1/health     liveness and number of open shards
+    GET  /v1/metrics    ingest counters and timings
+    GET  /v1/team/summary?from=YYYY-MM-DD&to=YYYY-MM-DD[&users=a,b]
+                        hours and idle/lock ratios per user and for the team
+    GET  /v1/team/days?from=...&to=...[&users=a,b]
+                        the same per user and day
+    GET  /v1/team/apps?from=...&to=...[&users=a,b][&limit=10]
+                        top apps by active time
+    GET  /v1/team/distinct?from=...&to=...[&users=a,b]
+                        estimated distinct apps and window titles
+    GET  /v1/team/durations?from=...&to=...[&users=a,b]
+                        estimated session and focus-block length percentiles
+
+A batch looks like:
+    {"user": "alice", "agent": "alice-laptop", "batch_id": "alice-laptop:1842",
+     "tz_offset_minutes": 120, "events": [{"id": "...", "event": "active_app", ...}]}
+and is answered with {"ok": true, "accepted": n, "duplicates": m, "replayed": false}.
+
+Uploads are idempotent: events are deduplicated by id and a batch id that
+was already stored gets its original answer back, so agents can retry any
+request whose answer they did not receive. Events go to per-user shards
+(collector/storage.py). Team queries are answered from precomputed rollups
+through a result cache (collector/rollups.py, collector/query.py).
+
+Connections are kept alive (HTTP/1.1) and served by a thread each, so an
+agent's queued batches go out over one connection. Request bodies are capped
+before and after decompression.
+
+Run with:
+    python -m collector.server [--host 127.0.0.1] [--port 8787] [--data DIR]
+Set COLLECTOR_TOKEN in config.py to require "Authorization: Bearer <token>"
+for uploads and team queries.
+"""
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from collector.query import TeamQuery, TOP_APPS_LIMIT
+from collector.rollups import TeamRollups
+from collector.storage import ShardStore, DEFAULT_DATA_DIR
+from tracker.instrumentation import metrics
+
+COLLECTOR_HOST = getattr(config, "COLLECTOR_HOST", "127.0.0.1")
+COLLECTOR_PORT = getattr(config, "COLLECTOR_PORT", 8787)
+COLLECTOR_TOKEN = getattr(config, "COLLECTOR_TOKEN", None)
+MAX_BODY_BYTES = 4 * 1024 * 1024       # Compressed request body
+MAX_DECODED_BYTES = 32 * 1024 * 1024   # After decompression, to refuse zip bombs
+MAX_BATCH_EVENTS = 10000
+LISTEN_BACKLOG = 1024                  # Pending connections; thousands of agents may connect at once
+IDLE_TIMEOUT_SECONDS = 30              # Close kept-alive connections idle for longer
+TEAM_QUERIES = ("/v1/team/summary", "/v1/team/days", "/v1/team/apps", "/v1/team/distinct", "/v1/team/durations")
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def decode_body(body, encoding):
+    """Decompresses a request body (gzip, deflate or none), refusing more than MAX_DECODED_BYTES."""
+    encoding = (encoding or "identity").lower()
+    if encoding == "identity":
+        return body
+    if encoding not in ("gzip", "deflate"):
+        raise RequestError(415, f"Unsupported Content-Encoding '{encoding}'")
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | (16 if encoding == "gzip" else 0))
+    try:
+        data = decompressor.decompress(body, MAX_DECODED_BYTES)
+    except zlib.error as e:
+        raise RequestError(400, f"Bad {encoding} body: {e}")
+    if decompressor.unconsumed_tail:
+        raise RequestError(413, f"Decompressed body is over {MAX_DECODED_BYTES} bytes")
+    return data
+
+def parse_batch(data):
+    """Validates a decoded batch and returns it."""
+    try:
+        batch = json.loads(data)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise RequestError(400, f"Body is not JSON: {e}")
+    if not isinstance(batch, dict):
+        raise RequestError(400, "Batch must be a JSON object")
+    for key in ("user", "batch_id"):
+        if not isinstance(batch.get(key), str) or not batch[key]:
+            raise RequestError(400, f"Batch needs a '{key}' string")
+    events = batch.get("events")
+    if not isinstance(events, list):
+        raise RequestError(400, "Batch needs an 'events' list")
+    if len(events) > MAX_BATCH_EVENTS:
+        raise RequestError(413, f"Batch has over {MAX_BATCH_EVENTS} events")
+    for event in events:
+        if not isinstance(event, dict) or not isinstance(event.get("start_ms"), int):
+            raise RequestError(400, "Every event needs an integer 'start_ms'")
+    return batch
+
+class CollectorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    timeout = IDLE_TIMEOUT_SECONDS
+    server_version = "AIWorkTrackerCollector/1"
+
+    def log_message(self, format, *args):
+        pass  # Per-request logging would dominate at thousands of agents; counters go to /v1/metrics
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        token = self.server.token
+        if not token:
+            return True
+        supplied = self.headers.get("Authorization", "")
+        return hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode())
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/v1/health":
+            self._reply(200, {"ok": True, "open_shards": len(self.server.store._shards)})
+        elif url.path == "/v1/metrics":
+            self._reply(200, metrics.summary())
+        elif url.path in TEAM_QUERIES:
+            self._team_query(url)
+        else:
+            self._reply(404, {"ok": False, "error": "Not found"})
+
+    def _team_query(self, url):
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            if not self._authorized():
+                raise RequestError(401, "Missing or wrong token")
+            if "from" not in params or "to" not in params:
+                raise RequestError(400, "'from' and 'to' days (YYYY-MM-DD) are required")
+            users = [user for user in params["users"].split(",") if user] if "users" in params else None
+            query = self.server.query
+            if url.path == "/v1/team/summary":
+                result = query.summary(params["from"], params["to"], users)
+            elif url.path == "/v1/team/days":
+                result = query.user_days(params["from"], params["to"], users)
+            elif url.path == "/v1/team/distinct":
+                result = query.distinct(params["from"], params["to"], users)
+            elif url.path == "/v1/team/durations":
+                result = query.durations(params["from"], params["to"], users)
+            else:
+                result = query.top_apps(params["from"], params["to"], users, int(params.get("limit", TOP_APPS_LIMIT)))
+        except RequestError as e:
+            self._reply(e.status, {"ok": False, "error": str(e)})
+            return
+        except ValueError as e:
+            self._reply(400, {"ok": False, "error": f"Bad query: {e}"})
+            return
+        self._reply(200, {"ok": True, "result": result})
+
+    def do_POST(self):
+        if self.path != "/v1/events":
+            self._reply(404, {"ok": False, "error": "Not found"})
+            return
+        try:
+            if not self._authorized():
+                raise RequestError(401, "Missing or wrong token")
+            length = self.headers.get("Content-Length")
+            if length is None:
+                raise RequestError(411, "Content-Length is required")
+            length = int(length)
+            if length > MAX_BODY_BYTES:
+                raise RequestError(413, f"Body is over {MAX_BODY_BYTES} bytes")
+            body = self.rfile.read(length)
+            batch = parse_batch(decode_body(body, self.headers.get("Content-Encoding")))
+            result = self.server.store.ingest(
+                batch["user"], batch["batch_id"], batch["events"],
+                agent=batch.get("agent"), tz_offset_minutes=int(batch.get("tz_offset_minutes", 0)))
+        except RequestError as e:
+            metrics.increment("collector_rejected")
+            if e.status in (401, 411, 413):
+                self.close_connection = True  # An unread body would be parsed as the next request
+            self._reply(e.status, {"ok": False, "error": str(e)})
+            return
+        except (ValueError, TypeError, KeyError) as e:
+            metrics.increment("collector_rejected")
+            self._reply(400, {"ok": False, "error": f"Bad event: {e}"})
+            return
+        except Exception as e:
+            logging.error(f"❌ Ingest failed: {e}", exc_info=True)
+            self._reply(500, {"ok": False, "error": "Internal error"})
+            return
+        metrics.increment("collector_batches")
+        self._reply(200, {"ok": True, **result})
+
+class CollectorServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, address=(COLLECTOR_HOST, COLLECTOR_PORT), store=None, token=COLLECTOR_TOKEN):
+        self.store = store or ShardStore()
+        self.token = token
+        self.rollups = TeamRollups(self.store)
+        self.query = TeamQuery(self.rollups)
+        super().__init__(address, CollectorHandler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serves in a background thread (e.g. for tests and benchmarks)."""
+        self.rollups.start()
+        threading.Thread(target=self.serve_forever, name="collector", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.rollups.stop()
+        self.store.close()
+
+def _option(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - [COLLECTOR] - %(levelname)s - %(message)s")
+    host = _option("--host", COLLECTOR_HOST)
+    port = int(_option("--port", COLLECTOR_PORT))
+    server = CollectorServer((host, port), store=ShardStore(_option("--data", DEFAULT_DATA_DIR)))
+    logging.info(f"📥 Collector listening on {server.url} (data in {server.store.data_dir})")
+    server.rollups.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.rollups.stop()
+        server.store.close()
+
+if __name__ == "__main__":
+    main()
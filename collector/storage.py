@@ -0,0 +1,223 @@
+# collector/storage.py
+"""
+Per-user sharded event storage for the team collector.
+
+Each user's events live in their own SQLite file (a shard) under
+<data dir>/users/, so writers for different users never contend and one
+user's history can be read, moved or deleted on its own. Within a shard:
+- events are keyed by their event id, so an event uploaded twice is stored
+  once (INSERT OR IGNORE),
+- batches are keyed by their batch id and remember the result they got, so a
+  retried upload is answered with the original result without re-inserting.
+
+Only the most recently used shards are kept open (MAX_OPEN_SHARDS); a shard
+is reopened on its next use. Shards are used through `ShardStore.locked()`,
+which pins the shard while it is held, so a shard in use is never evicted
+and each user has exactly one open Shard.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from tracker.instrumentation import metrics
+
+DEFAULT_DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "collector_data")
+MAX_OPEN_SHARDS = 256
+EVENT_FIELDS = ("event", "title", "process_name", "start_ms", "end_ms", "duration_seconds")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    day TEXT NOT NULL,          -- The user's local calendar day of start_ms
+    event TEXT NOT NULL,
+    title TEXT NOT NULL,
+    process_name TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    agent TEXT,
+    extra TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS events_day ON events (day, start_ms);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_ms);
+CREATE TABLE IF NOT EXISTS batches (
+    batch_id TEXT PRIMARY KEY,
+    agent TEXT,
+    received_at REAL NOT NULL,
+    events INTEGER NOT NULL,
+    accepted INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def shard_name(user):
+    """A file name for a user's shard: readable, and unique even when names differ only in punctuation."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", user)[:48].strip("._") or "user"
+    return f"{slug}-{hashlib.sha1(user.encode('utf-8')).hexdigest()[:10]}.db"
+
+def event_id(event):
+    """The event's id, or a content hash for events uploaded without one (so retries still deduplicate)."""
+    if event.get("id"):
+        return str(event["id"])
+    key = "|".join(str(event.get(field, "")) for field in ("event", "start_ms", "end_ms", "title", "process_name"))
+    return "h:" + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def local_day(start_ms, tz_offset_minutes):
+    return (datetime.fromtimestamp(start_ms / 1000, timezone.utc)
+            + timedelta(minutes=tz_offset_minutes)).strftime("%Y-%m-%d")
+
+class Shard:
+    """One user's database. All access goes through `lock`; a closed Shard cannot be reopened."""
+    def __init__(self, path, user):
+        self.path = path
+        self.user = user
+        self.lock = threading.Lock()
+        self.pins = 0  # Callers holding it via ShardStore.locked(); guarded by the store's lock
+        self.closed = False
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self.closed:
+            raise RuntimeError(f"Shard for {self.user} is closed")
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe; only the last commits can be lost on power loss
+            with self._conn:
+                self._conn.executescript(SCHEMA)
+                self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('user', ?)", (self.user,))
+        return self._conn
+
+    def close(self):
+        self.closed = True
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+class ShardStore:
+    def __init__(self, data_dir=DEFAULT_DATA_DIR, max_open=MAX_OPEN_SHARDS):
+        self.data_dir = data_dir
+        self.users_dir = os.path.join(data_dir, "users")
+        os.makedirs(self.users_dir, exist_ok=True)
+        self.max_open = max_open
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @contextmanager
+    def locked(self, user):
+        """Holds the user's Shard (creating it on first use) and its lock; it is not evicted meanwhile."""
+        with self._lock:
+            shard = self._shards.get(user)
+            if shard is None:
+                shard = self._shards[user] = Shard(os.path.join(self.users_dir, shard_name(user)), user)
+            else:
+                self._shards.move_to_end(user)
+            shard.pins += 1
+            evicted = self._evict()
+        for old in evicted:
+            with old.lock:
+                old.close()
+        try:
+            with shard.lock:
+                yield shard
+        finally:
+            with self._lock:
+                shard.pins -= 1
+
+    def _evict(self):
+        """Removes the least recently used unpinned shards beyond max_open. Call with _lock held."""
+        evicted = []
+        excess = len(self._shards) - self.max_open
+        if excess > 0:
+            for shard in self._shards.values():
+                if not shard.pins:
+                    evicted.append(shard)
+                    if len(evicted) == excess:
+                        break
+            for shard in evicted:
+                del self._shards[shard.user]
+        return evicted
+
+    def add_listener(self, callback):
+        """callback(user, days) is called after a batch added events for those days."""
+        self._listeners.append(callback)
+
+    def ingest(self, user, batch_id, events, agent=None, tz_offset_minutes=0):
+        """
+        Stores a batch of events for a user. Returns {"accepted", "duplicates", "replayed"}:
+        accepted events were new, duplicates were already stored, and replayed is True
+        if this batch id was seen before (the original counts are returned).
+        """
+        started = time.perf_counter()
+        rows = []
+        for event in events:
+            start_ms = int(event["start_ms"])
+            extra = {k: v for k, v in event.items() if k not in EVENT_FIELDS and k != "id"}
+            rows.append((
+                event_id(event),
+                local_day(start_ms, tz_offset_minutes),
+                str(event.get("event", "unknown")),
+                str(event.get("title") or ""),
+                str(event.get("process_name") or ""),
+                start_ms,
+                int(event.get("end_ms", start_ms)),
+                int(event.get("duration_seconds", 0)),
+                agent,
+                json.dumps(extra) if extra else None,
+            ))
+
+        with self.locked(user) as shard:
+            conn = shard.conn
+            with conn:
+                previous = conn.execute("SELECT events, accepted FROM batches WHERE batch_id = ?",
+                                        (batch_id,)).fetchone()
+                if previous is not None:
+                    metrics.increment("collector_batches_replayed")
+                    return {"accepted": previous[1], "duplicates": previous[0] - previous[1], "replayed": True}
+                before = conn.total_changes
+                conn.executemany("INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                accepted = conn.total_changes - before
+                conn.execute("INSERT INTO batches VALUES (?, ?, ?, ?, ?)",
+                             (batch_id, agent, time.time(), len(rows), accepted))
+
+        metrics.increment("collector_events_accepted", accepted)
+        metrics.increment("collector_events_duplicate", len(rows) - accepted)
+        metrics.record_stage("collector-ingest", (time.perf_counter() - started) * 1000)
+        if accepted:
+            days = sorted({row[1] for row in rows})
+            for callback in self._listeners:
+                callback(user, days)
+        return {"accepted": accepted, "duplicates": len(rows) - accepted, "replayed": False}
+
+    def users(self):
+        """All users with a shard, read from the shards' meta tables."""
+        users = []
+        for name in sorted(os.listdir(self.users_dir)):
+            if not name.endswith(".db"):
+                continue
+            conn = sqlite3.connect(os.path.join(self.users_dir, name))
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'user'").fetchone()
+            except sqlite3.Error:
+                row = None
+            finally:
+                conn.close()
+            if row:
+                users.append(row[0])
+        return users
+
+    def close(self):
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), OrderedDict()
+        for shard in shards:
+            with shard.lock:
+                shard.close()
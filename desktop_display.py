@@ -1,30 +1,17 @@
 import tkinter as tk
-import json
-from datetime import datetime, timedelta
-import os
 
-import requests
-import config
-
-LOGIN_LOG_FILE = os.path.join("logs", "auto_captured_login.json")
-WORK_DURATION_HOURS = 9
+from tracker.weather import get_weather_service
+from tracker.daemon_client import get_daemon_client
+from tracker.power import aligned_delay_ms
+from ui.view_model import ViewModel, workday_view
 
 def get_last_login():
-    """Gets the login time from the single source of truth."""
-    today_str = datetime.now().strftime("%Y-%m-%d")
-    if os.path.exists(LOGIN_LOG_FILE):
-        try:
-            with open(LOGIN_LOG_FILE, "r") as f:
-                data = json.load(f)
-                if data.get("date") == today_str:
-                    login_str = data.get("login_time")
-                    if login_str:
-                        login_time = datetime.strptime(login_str, "%Y-%m-%d %H:%M:%S")
-                        expected_logout = login_time + timedelta(hours=WORK_DURATION_HOURS)
-                        return login_time, expected_logout, data.get("method", "unknown")
-        except Exception as e:
-            print(f"Error reading login file: {e}")
-    return None, None, None
+    """Gets the login time from the tracker daemon."""
+    stats = get_daemon_client()
+    stats.wait_until_ready()
+    if stats.login_time is None:
+        return None, None, None
+    return stats.login_time, stats.logout_time, stats.login_method or "unknown"
 
 def show_login_popup():
     root = tk.Tk()
@@ -51,45 +38,20 @@ def show_login_popup():
     left_frame.place(relx=0.5, rely=0.5, anchor="center")
     left_frame.pack_propagate(False)
 
-    def get_weather():
-        """Get weather for the configured city, using config.py."""
-        if not config.OPENWEATHER_API_KEY or "YOUR_API_KEY" in config.OPENWEATHER_API_KEY:
-            print("⚠️ Weather API key not set in config.py. Skipping weather fetch.")
-            return None
-        
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={config.WEATHER_CITY}&appid={config.OPENWEATHER_API_KEY}&units=metric"
-        
-        try:
-            resp = requests.get(url, timeout=5)
-            resp.raise_for_status()  # Raises an HTTPError for bad responses
-            data = resp.json()
-            return data.get('main', {}).get('temp')
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️ Error fetching weather: {e}")
-        return None
-
     # Idle/Lock alert label
     alert_label = tk.Label(left_frame, text="", font=("Arial", 11, "bold"), fg="#ff6b6b", bg="#23272e")
-    LOG_FILE = os.path.join("logs", "structured_log.json")
     alert_label.pack(pady=(0,5))
 
-    def get_today_idle_lock():
-        today_str = datetime.now().strftime('%Y-%m-%d')
-        idle_time = 0
-        lock_time = 0
-        if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, 'r') as f:
-                try:
-                    logs = json.load(f)
-                    for entry in logs:
-                        if entry.get('start_time', '').startswith(today_str):
-                            if entry.get('event') == 'idle':
-                                idle_time += entry.get('duration_seconds', 0)
-                            elif entry.get('event') == 'lock':
-                                lock_time += entry.get('duration_seconds', 0)
-                except Exception:
-                    pass
-        return idle_time, lock_time
+    def on_stats_changed(stats):
+        # Idle/Lock alerts, refreshed only when today's totals change
+        idle_mins = stats["idle_seconds"] // 60
+        lock_mins = stats["lock_seconds"] // 60
+        if idle_mins >= 30:
+            alert_label.config(text=f"⚠️ Idle time today: {idle_mins} min. Try to stay active!")
+        elif lock_mins >= 30:
+            alert_label.config(text=f"🔒 Lock time today: {lock_mins} min. Remember to stay engaged!")
+        else:
+            alert_label.config(text="")
     # Show only weather info in right frame
     # Break reminder label removed
     login_time, logout_time, status = get_last_login()
@@ -117,13 +79,18 @@ def show_login_popup():
     ]
     greeting = random.choice(motivational_quotes)
 
-    # Get weather temperature for Hyderabad
-    temp = get_weather()
-    weather_str = f" ({temp}°C)" if temp is not None else ""
+    # Weather temperature comes from the shared cache and fills in once a background fetch completes
+    weather = get_weather_service()
+
+    def greeting_text():
+        temp = weather.get_temp()
+        weather_str = f" ({temp}°C)" if temp is not None else ""
+        return f"👤 Hello, Shiva Gundra{weather_str}"
 
     # Stack all elements vertically, centered, with minimal padding
     tk.Label(left_frame, text=greeting, font=("Arial", 13, "italic"), fg="#4fc3f7", bg="#23272e").pack(pady=(8,2))
-    tk.Label(left_frame, text=f"👤 Hello, Shiva Gundra{weather_str}", font=("Arial", 18, "bold"), fg="#fff", bg="#23272e").pack(pady=(0,6))
+    hello_label = tk.Label(left_frame, text=greeting_text(), font=("Arial", 18, "bold"), fg="#fff", bg="#23272e")
+    hello_label.pack(pady=(0,6))
     # Highlighted login/logout times (dark theme, centered, compact)
     login_frame = tk.Frame(left_frame, bg="#2c313c", bd=2, relief="ridge")
     login_frame.pack(pady=4)
@@ -145,35 +112,26 @@ def show_login_popup():
     countdown_label = tk.Label(left_frame, text="", font=("Arial", 22, "bold"), fg="#81c784", bg="#23272e")
     countdown_label.pack(pady=(0,12))
 
+    # Widgets are only touched when their displayed value changes
+    view = ViewModel()
+    view.bind("greeting", lambda text: hello_label.config(text=text))
+    view.bind("progress", progress_var.set)
+    view.bind("remaining", lambda remaining: countdown_label.config(
+        text=f"Time left until logout: {remaining}" if remaining else "✅ 9 Hours Completed"))
+
     def update_countdown():
-        # Weather info (update once at startup)
-        # Weather now shown next to name, no label to update
-        # Idle/Lock alerts
-        idle_time, lock_time = get_today_idle_lock()
-        idle_mins = idle_time // 60
-        lock_mins = lock_time // 60
-        if idle_mins >= 30:
-            alert_label.config(text=f"⚠️ Idle time today: {idle_mins} min. Try to stay active!")
-        elif lock_mins >= 30:
-            alert_label.config(text=f"🔒 Lock time today: {lock_mins} min. Remember to stay engaged!")
-        else:
-            alert_label.config(text="")
+        # Delivers the daemon's latest push, if any, to on_stats_changed
+        stats.poll()
+        # Weather is shown next to the name and picked up from the cache once it arrives
+        view.update(greeting=greeting_text())
         if login_time and logout_time:
-            now = datetime.now()
-            remaining = logout_time - now
-            total = (logout_time - login_time).total_seconds()
-            elapsed = (now - login_time).total_seconds()
-            percent = max(0, min(100, (elapsed / total) * 100)) if total > 0 else 0
-            progress_var.set(percent)
-            if remaining.total_seconds() > 0:
-                countdown = str(remaining).split('.')[0]
-                countdown_label.config(text=f"Time left until logout: {countdown}")
-            else:
-                countdown_label.config(text="✅ 9 Hours Completed")
-
-            # Break reminder removed
-        root.after(1000, update_countdown)
+            view.update(**workday_view(login_time, logout_time))
+        # Armed on the next second boundary so the countdown does not drift
+        root.after(aligned_delay_ms(1000), update_countdown)
 
+    stats = get_daemon_client()
+    stats.subscribe(on_stats_changed)
+    on_stats_changed(stats.snapshot())
     update_countdown()
 
     def minimize_window():
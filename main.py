@@ -1,8 +1,9 @@
 import sys
+import json
 import logging
 from pathlib import Path
-from auto_capture_login_tracker import AIWorkTracker
 from tracker.singleton import SingleInstance
+from tracker.ipc import send_command
 
 # --- Constants ---
 APP_NAME = "AIWorkTracker"
@@ -25,16 +26,35 @@ def setup_logging():
     )
     logging.info("Logging configured.")
 
-def handle_single_instance(is_unlock_trigger=False):
+def get_cli_command():
+    """Returns the value of '--command <name>' (show, status, end-day, reload), if given."""
+    if "--command" in sys.argv:
+        index = sys.argv.index("--command")
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
+
+def handle_single_instance(is_unlock_trigger=False, command=None):
     """Checks if another instance is running and exits if so."""
     instance = SingleInstance(APP_NAME)
     if instance.is_running():
         if is_unlock_trigger:
-            # This is a launch from the unlock task. Signal the main app to show its window.
-            logging.info("Unlock trigger: Instance already running. Signaling it to show window.")
-            signal_file = LOGS_DIR / "show_window.signal"
-            signal_file.write_text("show")
+            # This is a launch from the unlock task. Ask the running app to show its window.
+            logging.info("Unlock trigger: Instance already running. Asking it to show window.")
+            try:
+                send_command(APP_NAME, "show")
+            except (OSError, ValueError) as e:
+                logging.warning(f"Unlock trigger: Could not reach running instance: {e}")
             sys.exit(0) # Exit silently
+        elif command:
+            # Forward the command to the running instance and print its reply
+            try:
+                reply = send_command(APP_NAME, command)
+            except (OSError, ValueError) as e:
+                logging.error(f"Could not send '{command}' to the running instance: {e}")
+                sys.exit(1)
+            print(json.dumps(reply, indent=2))
+            sys.exit(0 if reply.get("ok") else 1)
         else:
             # This is a manual launch. Inform the user that it's already running.
             logging.warning(f"Manual launch: An instance of {APP_NAME} is already running. Exiting.")
@@ -47,6 +67,9 @@ def handle_single_instance(is_unlock_trigger=False):
             except Exception as e:
                 logging.error(f"Could not show 'Already Running' dialog: {e}")
             sys.exit(1)
+    elif command:
+        logging.error(f"Cannot send '{command}': {APP_NAME} is not running.")
+        sys.exit(1)
     return instance # Return the instance to keep the lock file
 
 def main():
@@ -54,15 +77,19 @@ def main():
     Main entry point for the AI Work Tracker application.
     """
     is_unlock_trigger = "--show-on-unlock" in sys.argv
+    command = get_cli_command()
     setup_logging()
     
     # Keep the instance object in scope to maintain the lock
-    _instance = handle_single_instance(is_unlock_trigger=is_unlock_trigger)
+    _instance = handle_single_instance(is_unlock_trigger=is_unlock_trigger, command=command)
 
     logging.info(f"🚀 Starting {APP_NAME}...")
 
     try:
-        tracker = AIWorkTracker()
+        # Imported only once we know we are the running instance; the unlock and
+        # --command paths above exit without paying for tkinter, pystray, PIL, etc.
+        from auto_capture_login_tracker import AIWorkTracker
+        tracker = AIWorkTracker(app_name=APP_NAME)
         tracker.run()
     except Exception as e:
         # Use logging to capture the full traceback for better debugging
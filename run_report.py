@@ -23,9 +23,10 @@ def setup_reporting_logging():
 def main():
     """Entry point for the scheduled task to send the daily report."""
     setup_reporting_logging()
+    group_by = "process" if "--by-process" in sys.argv else "title"
     logging.info("🚀 Scheduled task triggered: Attempting to send daily report.")
     try:
-        send_daily_report()
+        send_daily_report(group_by=group_by)
         logging.info("✅ Daily report process finished successfully.")
     except Exception as e:
         logging.critical("❌ An unexpected error occurred while sending the daily report.", exc_info=True)
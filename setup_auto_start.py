@@ -127,7 +127,8 @@ def setup_unlock_trigger():
     print("\n🔧 Setting up 'Show on Unlock' trigger via Task Scheduler...")
 
     current_dir = Path(__file__).parent.resolve()
-    main_script = current_dir / "main.py"
+    # A stdlib-only launcher that just pokes the running instance; -S skips site imports
+    launcher_script = current_dir / "unlock_launcher.py"
 
     pythonw_exe = Path(sys.executable).with_name("pythonw.exe")
     if not pythonw_exe.exists():
@@ -173,7 +174,7 @@ def setup_unlock_trigger():
   <Actions Context="Author">
     <Exec>
       <Command>"{pythonw_exe}"</Command>
-      <Arguments>"{main_script}" --show-on-unlock</Arguments>
+      <Arguments>-S "{launcher_script}"</Arguments>
     </Exec>
   </Actions>
 </Task>
@@ -274,6 +275,7 @@ def setup_daily_report_task():
         subprocess.run(create_cmd, check=True, capture_output=True, text=True, startupinfo=startupinfo)
         print(f"✅ Success: Task '{APP_NAME_REPORT}' created.")
         print("   The daily report will now be sent automatically at 11 PM each day.")
+        print("   (The tracker daemon also sends it, catching up after sleep; the job ledger prevents duplicates.)")
         return True
     except FileNotFoundError:
         print("❌ Error: 'schtasks.exe' not found. This feature is only available on Windows.")
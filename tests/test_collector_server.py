@@ -0,0 +1,102 @@
+# tests/test_collector_server.py
+"""The collector's upload endpoint on localhost: idempotency, encodings, limits and auth."""
+import gzip
+import http.client
+import json
+import shutil
+import tempfile
+import unittest
+import zlib
+
+from collector.server import MAX_DECODED_BYTES, CollectorServer
+from collector.storage import ShardStore
+
+def _event(number):
+    start_ms = 1_760_000_400_000 + number * 60_000
+    return {"id": f"e{number}", "event": "active_app", "title": "notes - Editor", "process_name": "editor.exe",
+            "start_ms": start_ms, "end_ms": start_ms + 30_000, "duration_seconds": 30}
+
+def _batch(batch_id, numbers, user="alice"):
+    return {"user": user, "agent": f"{user}-pc", "batch_id": batch_id, "events": [_event(n) for n in numbers]}
+
+class CollectorServerTest(unittest.TestCase):
+    token = None
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix="collector-test-")
+        self.server = CollectorServer(("127.0.0.1", 0), store=ShardStore(self.data_dir), token=self.token).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def post(self, body, encoding="gzip", headers=None):
+        """Sends a raw body to /v1/events and returns (status, reply)."""
+        host, port = self.server.server_address[:2]
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        try:
+            conn.request("POST", "/v1/events", body, {"Content-Type": "application/json",
+                                                      "Content-Encoding": encoding, **(headers or {})})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    def upload(self, batch, headers=None):
+        return self.post(gzip.compress(json.dumps(batch).encode("utf-8")), headers=headers)
+
+class UploadTest(CollectorServerTest):
+    def test_new_batch_is_accepted(self):
+        status, reply = self.upload(_batch("alice-pc:q1:1-3", [1, 2, 3]))
+        self.assertEqual(status, 200)
+        self.assertEqual(reply, {"ok": True, "accepted": 3, "duplicates": 0, "replayed": False})
+
+    def test_replayed_batch_gets_original_answer(self):
+        self.upload(_batch("alice-pc:q1:1-3", [1, 2, 3]))
+        status, reply = self.upload(_batch("alice-pc:q1:1-3", [1, 2, 3]))
+        self.assertEqual(status, 200)
+        self.assertEqual(reply, {"ok": True, "accepted": 3, "duplicates": 0, "replayed": True})
+
+    def test_overlapping_batch_counts_duplicates(self):
+        self.upload(_batch("alice-pc:q1:1-3", [1, 2, 3]))
+        status, reply = self.upload(_batch("alice-pc:q1:2-5", [2, 3, 4, 5]))
+        self.assertEqual(status, 200)
+        self.assertEqual(reply, {"ok": True, "accepted": 2, "duplicates": 2, "replayed": False})
+        with self.server.store.locked("alice") as shard:
+            self.assertEqual(shard.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0], 5)
+
+    def test_deflate_and_plain_bodies_are_accepted(self):
+        body = json.dumps(_batch("alice-pc:q1:1-1", [1])).encode("utf-8")
+        self.assertEqual(self.post(zlib.compress(body), encoding="deflate")[0], 200)
+        body = json.dumps(_batch("alice-pc:q1:2-2", [2])).encode("utf-8")
+        self.assertEqual(self.post(body, encoding="identity")[0], 200)
+
+    def test_unsupported_encoding_is_refused(self):
+        status, reply = self.post(b"\x00" * 64, encoding="br")
+        self.assertEqual(status, 415)
+        self.assertFalse(reply["ok"])
+
+    def test_zip_bomb_is_refused(self):
+        bomb = gzip.compress(b"[" + b" " * (MAX_DECODED_BYTES + 1024) + b"]")
+        status, reply = self.post(bomb)
+        self.assertEqual(status, 413)
+        self.assertFalse(reply["ok"])
+
+    def test_bad_batches_are_refused(self):
+        self.assertEqual(self.post(gzip.compress(b"not json"))[0], 400)
+        self.assertEqual(self.upload({"user": "alice", "batch_id": "b", "events": [{"start_ms": "soon"}]})[0], 400)
+
+class TokenTest(CollectorServerTest):
+    token = "test-token"
+
+    def test_missing_or_wrong_token_is_refused(self):
+        self.assertEqual(self.upload(_batch("alice-pc:q1:1-1", [1]))[0], 401)
+        self.assertEqual(self.upload(_batch("alice-pc:q1:1-1", [1]), {"Authorization": "Bearer wrong"})[0], 401)
+
+    def test_right_token_is_accepted(self):
+        status, reply = self.upload(_batch("alice-pc:q1:1-1", [1]), {"Authorization": "Bearer test-token"})
+        self.assertEqual(status, 200)
+        self.assertEqual(reply["accepted"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+# tests/test_outbox.py
+"""tracker/outbox.py against a stand-in SMTP server on localhost."""
+import base64
+import os
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import unittest
+from email.mime.text import MIMEText
+
+from tracker.outbox import (BACKOFF_BASE_SECONDS, STATUS_FAILED, STATUS_QUEUED, STATUS_SENT, Outbox,
+                            OutboxSender, SMTPConnectionPool)
+
+USER, PASSWORD = "tracker@example.com", "right-password"
+
+class StandInSMTP(socketserver.ThreadingTCPServer):
+    """
+    A minimal SMTP server: AUTH PLAIN with USER/PASSWORD, and every recipient
+    accepted unless `refuse` maps it to a reply code.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.refuse = {}
+        self.connections = self.logins = self.failed_logins = 0
+        self.delivered = []
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode("ascii").rstrip("\r\n")
+            if not line:
+                return
+            verb, _, arg = line.partition(" ")
+            verb = verb.upper()
+            if verb in ("EHLO", "HELO"):
+                self.reply("250-stand-in")
+                self.reply("250 AUTH PLAIN")
+            elif verb == "AUTH":
+                _, user, password = base64.b64decode(arg.split(" ", 1)[1]).decode().split("\0")
+                if (user, password) == (USER, PASSWORD):
+                    server.logins += 1
+                    self.reply("235 Authentication successful")
+                else:
+                    server.failed_logins += 1
+                    self.reply("535 Authentication credentials invalid")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = arg.split(":", 1)[1].strip("<> ")
+                code = server.refuse.get(address)
+                if code:
+                    self.reply(f"{code} Recipient refused")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                server.delivered.extend(recipients)
+                self.reply("250 Queued")
+            elif verb in ("NOOP", "RSET"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+def _message(to, subject):
+    message = MIMEText("Report body")
+    message["From"], message["To"], message["Subject"] = USER, to, subject
+    return message
+
+class OutboxSenderTest(unittest.TestCase):
+    def setUp(self):
+        self.smtp = StandInSMTP()
+        self.data_dir = tempfile.mkdtemp(prefix="outbox-test-")
+        self.outbox = Outbox(os.path.join(self.data_dir, "outbox.db"))
+
+    def tearDown(self):
+        self.smtp.shutdown()
+        self.smtp.server_close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def sender(self, password=PASSWORD):
+        pool = SMTPConnectionPool("127.0.0.1", self.smtp.server_address[1], use_ssl=False,
+                                  user=USER, password=password, timeout=5)
+        return OutboxSender(self.outbox, pool)
+
+    def test_one_login_for_several_messages(self):
+        ids = [self.outbox.enqueue(_message("boss@example.com", f"Report {i}")) for i in range(3)]
+        sender = self.sender()
+        self.assertEqual(sender.drain(), (3, 0))
+        self.assertEqual((self.smtp.connections, self.smtp.logins, sender.pool.connects), (1, 1, 1))
+        self.assertEqual(self.smtp.delivered, ["boss@example.com"] * 3)
+        self.assertEqual([self.outbox.status(i)["status"] for i in ids], [STATUS_SENT] * 3)
+
+    def test_temporary_refusal_is_retried_with_backoff(self):
+        self.smtp.refuse["busy@example.com"] = 451
+        busy = self.outbox.enqueue(_message("busy@example.com", "Report"))
+        other = self.outbox.enqueue(_message("boss@example.com", "Report"))
+        before = time.time()
+        self.assertEqual(self.sender().drain(), (1, 1))
+        status = self.outbox.status(busy)
+        self.assertEqual((status["status"], status["attempts"]), (STATUS_QUEUED, 1))
+        self.assertGreaterEqual(status["next_attempt_at"], before + 0.8 * BACKOFF_BASE_SECONDS)
+        self.assertIn("451", status["last_error"])
+        self.assertEqual(self.outbox.status(other)["status"], STATUS_SENT)
+        self.assertEqual(self.smtp.logins, 1)  # The refusal did not drop the session
+
+    def test_permanent_refusal_is_not_retried(self):
+        self.smtp.refuse["nobody@example.com"] = 550
+        message_id = self.outbox.enqueue(_message("nobody@example.com", "Report"))
+        self.assertEqual(self.sender().drain(), (0, 1))
+        status = self.outbox.status(message_id)
+        self.assertEqual((status["status"], status["attempts"]), (STATUS_FAILED, 1))
+        self.assertIsNone(self.outbox.next_due_at())
+
+    def test_refused_login_pauses_without_failing_messages(self):
+        ids = [self.outbox.enqueue(_message("boss@example.com", f"Report {i}")) for i in range(3)]
+        sender = self.sender(password="wrong-password")
+        self.assertEqual(sender.drain(), (0, 1))
+        self.assertTrue(sender.paused)
+        self.assertEqual(sender.drain(), (0, 0))
+        self.assertEqual(self.smtp.failed_logins, 1)
+        statuses = [self.outbox.status(i) for i in ids]
+        self.assertEqual([(s["status"], s["attempts"]) for s in statuses], [(STATUS_QUEUED, 0)] * 3)
+        self.assertIn("535", statuses[0]["last_error"])
+        # With the right password, everything still queued goes out once it is due
+        fixed = self.sender()
+        for message_id in ids:
+            self.outbox.retry(message_id)
+        self.assertEqual(fixed.drain(), (3, 0))
+
+if __name__ == "__main__":
+    unittest.main()
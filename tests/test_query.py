@@ -0,0 +1,66 @@
+# tests/test_query.py
+"""The team query cache in collector/query.py and its invalidation."""
+import shutil
+import tempfile
+import unittest
+
+from collector.query import TeamQuery
+from collector.rollups import TeamRollups
+from collector.storage import ShardStore
+
+DAY = "2025-10-09"
+DAY_START_MS = 1_760_000_400_000  # 09:00 UTC on DAY
+
+class TeamQueryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix="query-test-")
+        self.store = ShardStore(self.data_dir)
+        self.rollups = TeamRollups(self.store)
+        self.query = TeamQuery(self.rollups)
+        self.computed = 0
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def compute_during(self, user, days):
+        """A query computation during which the rollups for user and days are refreshed."""
+        def compute(start_day, end_day, users):
+            self.computed += 1
+            if user is not None:
+                self.query.invalidate(user, days)
+            return {"computed": self.computed}
+        return compute
+
+    def ask(self, compute, users=("alice",)):
+        return self.query._cached("test", DAY, DAY, list(users), compute)
+
+    def test_answer_is_cached(self):
+        self.ask(self.compute_during(None, []))
+        self.assertEqual(self.ask(self.compute_during(None, [])), {"computed": 1})
+
+    def test_unrelated_refresh_during_computation_still_caches(self):
+        self.ask(self.compute_during("bob", [DAY]))          # Another user
+        self.ask(self.compute_during("alice", ["2025-10-10"]))  # Another day: still the first answer
+        self.assertEqual(self.ask(self.compute_during(None, [])), {"computed": 1})
+
+    def test_overlapping_refresh_during_computation_is_not_cached(self):
+        self.ask(self.compute_during("alice", [DAY]))
+        self.assertEqual(self.ask(self.compute_during(None, [])), {"computed": 2})
+        self.assertEqual(self.ask(self.compute_during(None, [])), {"computed": 2})
+
+    def test_refresh_drops_cached_answers_that_cover_it(self):
+        self.store.ingest("alice", "a1", [{"id": "e1", "event": "active_app", "process_name": "editor.exe",
+                                           "start_ms": DAY_START_MS, "end_ms": DAY_START_MS + 60_000,
+                                           "duration_seconds": 60}])
+        self.rollups.flush()
+        self.assertEqual(self.query.summary(DAY, DAY)["team"]["events"], 1)
+        other_user = self.query.summary(DAY, DAY, ["bob"])
+        self.store.ingest("alice", "a2", [{"id": "e2", "event": "idle", "start_ms": DAY_START_MS + 60_000,
+                                           "end_ms": DAY_START_MS + 120_000, "duration_seconds": 60}])
+        self.rollups.flush()
+        self.assertEqual(self.query.summary(DAY, DAY)["team"]["events"], 2)
+        self.assertIs(self.query.summary(DAY, DAY, ["bob"]), other_user)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+# tests/test_sketches.py
+"""Error bounds and encoding of collector/sketches.py, and how the rollups merge them."""
+import math
+import random
+import shutil
+import tempfile
+import unittest
+
+from collector.rollups import TeamRollups, load_sketches, new_sketches
+from collector.sketches import HyperLogLog, QuantileSketch
+from collector.storage import ShardStore
+
+DAY_START_MS = 1_760_000_400_000  # 2025-10-09 09:00 UTC
+
+def _registers(sketch):
+    """A sketch's non-zero registers, whether it is sparse or dense."""
+    if sketch.registers is None:
+        return dict(sketch.sparse)
+    return {index: rank for index, rank in enumerate(sketch.registers) if rank}
+
+class HyperLogLogTest(unittest.TestCase):
+    def test_merged_estimates_within_three_standard_errors(self):
+        for n in (100, 1_000, 10_000, 100_000):
+            with self.subTest(n=n):
+                # Four overlapping parts, as if four users shared some of the values
+                parts = [HyperLogLog() for _ in range(4)]
+                for i in range(n):
+                    parts[i % 4].add(f"value-{n}-{i}")
+                    if i % 10 == 0:
+                        parts[(i + 1) % 4].add(f"value-{n}-{i}")
+                merged = HyperLogLog()
+                for part in parts:
+                    merged.merge(part)
+                self.assertLessEqual(abs(merged.count() - n), 3 * merged.relative_error * n)
+
+    def test_merge_is_order_independent(self):
+        a, b = HyperLogLog(), HyperLogLog()
+        for i in range(5_000):
+            (a if i % 3 else b).add(f"title {i}")
+        self.assertEqual(_registers(HyperLogLog().merge(a).merge(b)), _registers(HyperLogLog().merge(b).merge(a)))
+
+    def test_merge_rejects_other_precision(self):
+        with self.assertRaises(ValueError):
+            HyperLogLog(12).merge(HyperLogLog(10))
+
+    def test_sparse_round_trip(self):
+        sketch = HyperLogLog()
+        for i in range(50):
+            sketch.add(f"app-{i}")
+        self.assertIsNone(sketch.registers)
+        copy = HyperLogLog.from_bytes(sketch.to_bytes())
+        self.assertIsNone(copy.registers)
+        self.assertEqual(copy.precision, sketch.precision)
+        self.assertEqual(copy.sparse, sketch.sparse)
+        self.assertEqual(copy.count(), sketch.count())
+
+    def test_dense_round_trip(self):
+        sketch = HyperLogLog()
+        for i in range(20_000):
+            sketch.add(f"title-{i}")
+        self.assertIsNotNone(sketch.registers)
+        copy = HyperLogLog.from_bytes(sketch.to_bytes())
+        self.assertEqual(copy.precision, sketch.precision)
+        self.assertEqual(copy.registers, sketch.registers)
+        self.assertEqual(copy.count(), sketch.count())
+
+class QuantileSketchTest(unittest.TestCase):
+    QUANTILES = (0.0, 0.01, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999, 1.0)
+
+    def assert_within_accuracy(self, sketch, values):
+        ordered = sorted(values)
+        for q in self.QUANTILES:
+            exact = ordered[math.floor(q * (len(ordered) - 1))]
+            estimate = sketch.quantile(q)
+            self.assertLessEqual(abs(estimate - exact), sketch.relative_accuracy * exact + 1e-9, f"q={q}")
+
+    def test_merged_quantiles_within_relative_accuracy(self):
+        rng = random.Random(7)
+        for accuracy in (0.01, 0.05):
+            with self.subTest(accuracy=accuracy):
+                values = [max(0, int(rng.lognormvariate(4, 1.5))) for _ in range(50_000)]
+                parts = [QuantileSketch(accuracy) for _ in range(8)]
+                for i, value in enumerate(values):
+                    parts[i % 8].add(value)
+                merged = QuantileSketch(accuracy)
+                for part in parts:
+                    merged.merge(part)
+                self.assertEqual(merged.count, len(values))
+                self.assert_within_accuracy(merged, values)
+
+    def test_subtract_undoes_merge(self):
+        rng = random.Random(11)
+        kept = [rng.uniform(1, 86400) for _ in range(2_000)]
+        removed = [rng.uniform(1, 86400) for _ in range(500)]
+        sketch, other = QuantileSketch(), QuantileSketch()
+        for value in kept:
+            sketch.add(value)
+        for value in removed:
+            other.add(value)
+        sketch.merge(other).subtract(other)
+        self.assertEqual(sketch.count, len(kept))
+        self.assertTrue(all(count > 0 for count in sketch.bins.values()))
+        self.assert_within_accuracy(sketch, kept)
+
+    def test_empty_sketch_has_no_quantiles(self):
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+    def test_round_trip(self):
+        sketch = QuantileSketch()
+        for value in (0, 0, 1, 59, 60, 3600, 86400):
+            sketch.add(value)
+        copy = QuantileSketch.from_bytes(sketch.to_bytes())
+        self.assertEqual(copy.relative_accuracy, sketch.relative_accuracy)
+        self.assertEqual((copy.bins, copy.zeros, copy.count), (sketch.bins, sketch.zeros, sketch.count))
+
+class RollupSketchesTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix="rollups-test-")
+        self.store = ShardStore(self.data_dir)
+        self.rollups = TeamRollups(self.store)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def ingest(self, user, batch_id, first, count, seed):
+        rng = random.Random(seed)
+        events = []
+        for i in range(first, first + count):
+            seconds = rng.randint(1, 900)
+            start_ms = DAY_START_MS + i * 1_000_000
+            events.append({"id": f"{user}-{i}", "event": rng.choice(("active_app", "active_app", "idle")),
+                           "title": f"doc{rng.randrange(50)} - Editor", "process_name": f"app{rng.randrange(8)}.exe",
+                           "start_ms": start_ms, "end_ms": start_ms + seconds * 1000, "duration_seconds": seconds})
+        self.store.ingest(user, batch_id, events)
+        self.rollups.flush()
+
+    def assert_team_is_merge_of_users(self):
+        conn = self.rollups.connection()
+        team = load_sketches(conn.execute("SELECT apps, titles, sessions, focus FROM day_sketches").fetchone())
+        merged = new_sketches()
+        for row in conn.execute("SELECT apps, titles, sessions, focus FROM user_day_sketches"):
+            for name, sketch in load_sketches(row).items():
+                merged[name].merge(sketch)
+        for name in ("apps", "titles"):
+            self.assertEqual(_registers(team[name]), _registers(merged[name]), name)
+        for name in ("sessions", "focus"):
+            self.assertEqual((team[name].bins, team[name].zeros, team[name].count),
+                             (merged[name].bins, merged[name].zeros, merged[name].count), name)
+
+    def test_refreshing_a_user_day_keeps_team_sketches_merged(self):
+        self.ingest("alice", "a1", 0, 20, seed=1)
+        self.ingest("bob", "b1", 0, 30, seed=2)
+        self.assert_team_is_merge_of_users()
+        # Alice's day gains events: her old counts leave the team's sketches and her new ones enter
+        self.ingest("alice", "a2", 20, 25, seed=3)
+        self.assert_team_is_merge_of_users()
+        self.rollups.refresh("bob", ["2025-10-09"])
+        self.assert_team_is_merge_of_users()
+
+    def test_rebuild_matches_incremental_refreshes(self):
+        self.ingest("alice", "a1", 0, 20, seed=1)
+        self.ingest("bob", "b1", 0, 30, seed=2)
+        self.ingest("alice", "a2", 20, 25, seed=3)
+        conn = self.rollups.connection()
+        incremental = conn.execute("SELECT * FROM day_sketches").fetchall()
+        self.rollups.rebuild()
+        self.assertEqual(conn.execute("SELECT * FROM day_sketches").fetchall(), incremental)
+
+if __name__ == "__main__":
+    unittest.main()
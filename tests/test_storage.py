@@ -0,0 +1,69 @@
+# tests/test_storage.py
+"""Shard eviction in collector/storage.py under concurrent use."""
+import shutil
+import tempfile
+import threading
+import unittest
+
+from collector.storage import ShardStore
+
+class ShardStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp(prefix="storage-test-")
+        self.store = ShardStore(self.data_dir, max_open=2)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def test_held_shard_is_not_evicted(self):
+        with self.store.locked("alice") as alice:
+            alice.conn.execute("SELECT 1")
+            for user in ("bob", "carol", "dave"):
+                self.store.ingest(user, f"{user}-1", [{"id": "e1", "start_ms": 0}])
+            self.assertFalse(alice.closed)
+            self.assertIs(self.store._shards["alice"], alice)
+        self.assertLessEqual(len(self.store._shards), 3)
+
+    def test_evicted_shard_refuses_to_reopen(self):
+        with self.store.locked("alice") as alice:
+            alice.conn.execute("SELECT 1")
+        for user in ("bob", "carol"):
+            with self.store.locked(user):
+                pass
+        self.assertTrue(alice.closed)
+        with self.assertRaises(RuntimeError):
+            alice.conn
+        with self.store.locked("alice") as reopened:
+            self.assertIsNot(reopened, alice)
+            reopened.conn.execute("SELECT 1")
+
+    def test_concurrent_ingest_beyond_open_limit(self):
+        users = [f"user{i}" for i in range(12)]
+        errors = []
+
+        def upload(worker):
+            try:
+                for batch in range(30):
+                    user = users[(worker + batch) % len(users)]
+                    event = {"id": f"{worker}-{batch}", "start_ms": batch * 1000}
+                    self.store.ingest(user, f"{user}:{worker}-{batch}", [event])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=upload, args=(worker,)) for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(len(self.store._shards), self.store.max_open)
+        self.store.close()
+        stored = 0
+        for user in users:
+            with self.store.locked(user) as shard:
+                stored += shard.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+        self.assertEqual(stored, 8 * 30)
+
+if __name__ == "__main__":
+    unittest.main()
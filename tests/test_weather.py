@@ -0,0 +1,122 @@
+# tests/test_weather.py
+"""tracker/weather.py against a stand-in weather API on localhost."""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from tracker.weather import WeatherService
+
+class StandInWeatherAPI(ThreadingHTTPServer):
+    """Answers every GET with the current `temp`, or with `status` if it is not 200."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.temp = 20.0
+        self.status = 200
+        self.requests = 0
+        self.gate = threading.Event()  # Cleared to hold replies until a test releases them
+        self.gate.set()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/data/2.5/weather"
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.requests += 1
+        self.server.gate.wait(10)
+        body = json.dumps({"main": {"temp": self.server.temp}} if self.server.status == 200 else {}).encode()
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class WeatherServiceTest(unittest.TestCase):
+    def setUp(self):
+        self.api = StandInWeatherAPI()
+        self.cache_dir = tempfile.mkdtemp(prefix="weather-test-")
+        self.cache_file = os.path.join(self.cache_dir, "weather_cache.json")
+
+    def tearDown(self):
+        self.api.gate.set()
+        self.api.shutdown()
+        self.api.server_close()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def service(self):
+        return WeatherService(api_key="test-key", city="Testville", base_url=self.api.url,
+                              cache_file=self.cache_file, timeout=5)
+
+    def make_stale(self, service):
+        """Ages the value in memory and in the shared cache file past the TTL."""
+        service._fetched_at -= service.ttl_seconds + 1
+        service._save_disk_cache()
+
+    def wait_for_refresh(self, service):
+        deadline = time.monotonic() + 5
+        while service._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(service._refreshing)
+
+    def test_fresh_value_is_served_from_memory(self):
+        service = self.service()
+        self.assertEqual(service.refresh(), 20.0)
+        self.assertEqual(service.get_temp(), 20.0)
+        self.assertEqual(service.get_text(), "20.0°C")
+        self.assertEqual(self.api.requests, 1)
+
+    def test_stale_value_is_served_while_refreshing(self):
+        service = self.service()
+        service.refresh()
+        refreshed = threading.Event()
+        service.subscribe(lambda temp: refreshed.set())
+        self.make_stale(service)
+        self.api.temp = 25.0
+        self.api.gate.clear()
+        started = time.perf_counter()
+        self.assertEqual(service.get_temp(), 20.0)
+        self.assertEqual(service.get_temp(), 20.0)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.api.gate.set()
+        self.assertTrue(refreshed.wait(5))
+        self.wait_for_refresh(service)
+        self.assertEqual(service.get_temp(), 25.0)
+        self.assertEqual(self.api.requests, 2)  # One background refresh, however often it was asked for
+
+    def test_second_instance_reads_shared_disk_cache(self):
+        self.service().refresh()
+        other = self.service()
+        self.assertEqual(other.get_temp(), 20.0)
+        self.assertEqual(self.api.requests, 1)
+
+    def test_fetch_error_keeps_stale_value(self):
+        service = self.service()
+        service.refresh()
+        self.make_stale(service)
+        self.api.status = 500
+        self.assertEqual(service.get_temp(), 20.0)
+        self.wait_for_refresh(service)
+        self.assertEqual(self.api.requests, 2)
+        self.assertEqual(service.get_temp(), 20.0)
+        self.assertEqual(self.api.requests, 2)  # No retry before RETRY_AFTER_SECONDS
+        self.assertEqual(service.refresh(), 20.0)
+
+    def test_unconfigured_service_does_not_fetch(self):
+        service = WeatherService(api_key="YOUR_API_KEY", city="Testville", base_url=self.api.url,
+                                 cache_file=self.cache_file)
+        self.assertIsNone(service.get_temp())
+        self.assertEqual(self.api.requests, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,19 @@
 import time
 import os
 import sys
-from datetime import datetime
 
 # Ensure the parent directory is in the path to find the log_writer module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from tracker.log_writer import write_log
+from tracker.process_info import ProcessCache
+from tracker.coalescer import WindowCoalescer
+from tracker.timecodec import now_ms, format_ms
+from tracker.instrumentation import metrics, STAGE_PROBE, STAGE_COALESCE
 
 # pywin32 is required for this module
 try:
     import win32gui
+    import win32process
 except ImportError:
     print("❌ 'pywin32' is not installed. Please run 'pip install pywin32' and add it to requirements.txt")
     sys.exit(1)
@@ -17,24 +21,56 @@ except ImportError:
 LOG_FILE = os.path.join("logs", "structured_log.json")
 
 def get_active_window():
+    return get_active_window_info()[0]
+
+def get_active_window_info():
+    """Returns (title, pid) of the foreground window, or ("", None) if unavailable."""
     try:
         window = win32gui.GetForegroundWindow()
-        return win32gui.GetWindowText(window).strip()
+        title = win32gui.GetWindowText(window).strip()
+        _, pid = win32process.GetWindowThreadProcessId(window)
+        return title, pid
     except Exception:
-        return ""
-
-def track_active_window(interval=2):
-    previous_window = get_active_window()
-    start_time = datetime.now()
-
-    while True:
-        time.sleep(interval)
-        current_window = get_active_window()
-
-        if current_window and current_window != previous_window:
-            if previous_window:
-                end_time = datetime.now()
-                write_log(LOG_FILE, "active_app", previous_window, start_time.strftime("%Y-%m-%d %H:%M:%S"), end_time.strftime("%Y-%m-%d %H:%M:%S"))
-            print(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')} - Active Window: {current_window}")
-            previous_window = current_window
-            start_time = datetime.now()
+        return "", None
+
+def track_active_window(interval=2, stop_event=None):
+    """Samples the foreground window every `interval` seconds until stop_event (if given) is set."""
+    process_cache = ProcessCache()
+
+    def write_interval(settled):
+        write_log(LOG_FILE, "active_app", settled.title, settled.start_ms, settled.end_ms, **settled.log_fields())
+
+    # Window-switch bursts are folded in memory; only settled intervals are written.
+    # The total is exact; a flicker's seconds count for the window before it.
+    coalescer = WindowCoalescer(write_interval)
+    previous_window, previous_pid = get_active_window_info()
+    if previous_window:
+        process_name, exe = process_cache.lookup(previous_pid)
+        coalescer.open(previous_window, now_ms(), process_name=process_name, exe=exe)
+
+    try:
+        while True:
+            metrics.scheduled("sampler", interval * 1000)
+            if stop_event is None:
+                time.sleep(interval)
+            elif stop_event.wait(interval):
+                break
+            metrics.tick("sampler")
+            metrics.wakeup("sampler")
+            with metrics.stage(STAGE_PROBE):
+                current_window, current_pid = get_active_window_info()
+
+            if current_window and (current_window, current_pid) != (previous_window, previous_pid):
+                start_ms = now_ms()
+                with metrics.stage(STAGE_PROBE):
+                    # Only resolved on a window switch, and served from the cache for known PIDs
+                    process_name, exe = process_cache.lookup(current_pid)
+                with metrics.stage(STAGE_COALESCE):
+                    coalescer.open(current_window, start_ms, process_name=process_name, exe=exe)
+                print(f"{format_ms(start_ms)} - Active Window: {current_window}")
+                previous_window, previous_pid = current_window, current_pid
+            else:
+                with metrics.stage(STAGE_COALESCE):
+                    coalescer.tick(now_ms())
+    finally:
+        coalescer.flush(now_ms())
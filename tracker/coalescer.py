@@ -0,0 +1,122 @@
+# tracker/coalescer.py
+"""
+Coalesces bursts of window switches before they are written to the log.
+
+The sampler reports every foreground change, so an Alt-Tab burst produces a
+run of 2-3 second intervals that each cost a full log write. WindowCoalescer
+keeps the latest closed interval in memory and folds short "flicker"
+intervals into it, so only settled intervals reach the sink. Folding only
+moves the boundary between adjacent intervals: the emitted intervals are
+still contiguous, so the total tracked time is unchanged.
+
+Per-window totals are approximate: a flicker's time is counted for the
+window before it, so per-app, per-process and per-title totals (reports,
+group_key rollups, the collector's per-app rollups) can shift by up to
+flicker_threshold_ms per folded switch. Each entry records what it absorbed
+in `folded_ms` and `folded_switches`, which bounds that error.
+"""
+
+FLICKER_THRESHOLD_MS = 5000  # Intervals shorter than this are treated as flickers
+
+class Interval:
+    """A span of time spent in one window."""
+    def __init__(self, title, start_ms, fields=None):
+        self.title = title
+        self.start_ms = start_ms
+        self.end_ms = start_ms
+        self.fields = fields or {}
+        self.folded_ms = 0
+        self.folded_switches = 0
+
+    @property
+    def key(self):
+        return (self.title, self.fields.get("process_name"))
+
+    @property
+    def duration_ms(self):
+        return self.end_ms - self.start_ms
+
+    def absorb(self, other, as_flicker):
+        """
+        Extends this interval to cover a following, adjacent interval. A flicker's
+        time becomes this interval's (and is counted in folded_ms).
+        """
+        self.end_ms = other.end_ms
+        self.folded_ms += other.folded_ms
+        self.folded_switches += other.folded_switches
+        if as_flicker:
+            self.folded_ms += other.duration_ms
+            self.folded_switches += 1
+
+    def log_fields(self):
+        """Returns the extra fields to store on the log entry, including how much flicker time it absorbed."""
+        fields = dict(self.fields)
+        if self.folded_switches:
+            fields["folded_switches"] = self.folded_switches
+            fields["folded_ms"] = self.folded_ms
+        return fields
+
+class WindowCoalescer:
+    """
+    Sits between the window sampler and the log writer.
+
+    Rules (all configurable):
+    - flicker_threshold_ms: a closed interval shorter than this is folded into
+      the interval before it instead of being written on its own; its time
+      then counts for that interval's window.
+    - merge_same_title: consecutive intervals for the same window (e.g. A after
+      an A-B-A flicker) are merged into one.
+    - fold_flickers: set to False to only merge identical neighbours.
+
+    An interval is handed to `sink` once it can no longer change, i.e. when the
+    window after it has lasted at least flicker_threshold_ms, or on flush().
+    """
+    def __init__(self, sink, flicker_threshold_ms=FLICKER_THRESHOLD_MS, merge_same_title=True, fold_flickers=True):
+        self.sink = sink
+        self.flicker_threshold_ms = flicker_threshold_ms
+        self.merge_same_title = merge_same_title
+        self.fold_flickers = fold_flickers
+        self.current = None  # The open interval for the foreground window
+        self.held = None     # The last closed interval, not yet settled
+        self.received = 0    # Closed intervals seen from the sampler
+        self.emitted = 0     # Intervals handed to the sink
+
+    def open(self, title, at_ms, **fields):
+        """Records a switch to a new foreground window at at_ms."""
+        self._close_current(at_ms)
+        self.current = Interval(title, at_ms, fields)
+
+    def tick(self, at_ms):
+        """Settles the held interval once the current window is clearly not a flicker."""
+        if self.held and self.current and at_ms - self.current.start_ms >= self.flicker_threshold_ms:
+            self._emit_held()
+
+    def flush(self, at_ms):
+        """Closes the current interval and emits everything still in memory."""
+        self._close_current(at_ms)
+        self._emit_held()
+
+    def _close_current(self, at_ms):
+        if self.current is None:
+            return
+        closed, self.current = self.current, None
+        closed.end_ms = at_ms
+        self.received += 1
+
+        held = self.held
+        if held is None:
+            self.held = closed
+        elif self.merge_same_title and closed.key == held.key:
+            held.absorb(closed, as_flicker=False)
+        elif self.fold_flickers and closed.duration_ms < self.flicker_threshold_ms:
+            held.absorb(closed, as_flicker=True)
+        else:
+            self._emit_held()
+            self.held = closed
+
+    def _emit_held(self):
+        if self.held is None:
+            return
+        held, self.held = self.held, None
+        self.emitted += 1
+        self.sink(held)
@@ -0,0 +1,218 @@
+# tracker/daemon.py
+"""
+Headless tracker daemon.
+
+Owns the activity samplers (window, idle, lock), the event log, today's
+aggregated stats, the report scheduler, the email outbox sender and the
+collector uploader, and serves them to any number of UI clients over the
+local IPC channel. UIs (the Tk corner widget, the PyQt floating bar, the
+tray) are thin clients: closing or crashing one never stops tracking, and N
+UIs share one data pipeline.
+
+Commands:
+    ping, stats, metrics, log-event, reload, report, outbox, jobs, upload, stop   (request/reply)
+    subscribe                                                                     (stream of stats snapshots)
+
+Run with:
+    python -m tracker.daemon            # start (exits if already running)
+    python -m tracker.daemon --status   # print today's stats from the running daemon
+    python -m tracker.daemon --stop     # stop the running daemon
+"""
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+
+# Allow running as a script as well as with -m from the project root
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tracker.daemon_protocol import DAEMON_NAME, encode_snapshot
+from tracker.data_service import StatsService, STRUCTURED_LOG_FILE
+from tracker.file_watcher import FileWatcher
+from tracker.instrumentation import metrics
+from tracker.ipc import IPCServer, send_command
+from tracker.log_writer import write_log
+from tracker import reports
+from tracker.outbox import OutboxSender
+from tracker.scheduler import Scheduler, add_report_jobs
+from tracker.singleton import SingleInstance
+from tracker.uploader import COLLECTOR_URL, Uploader
+from tracker.timecodec import day_bounds_ms
+
+LOGS_DIR = Path("logs")
+DAEMON_LOG_FILE = LOGS_DIR / "daemon.log"
+RESOURCE_SAMPLE_SECONDS = 10  # Also how often the day rollover is checked
+HEARTBEAT_SECONDS = 60  # Lets a subscription notice a vanished client even when nothing changes
+
+class TrackerDaemon:
+    def __init__(self, name=DAEMON_NAME, run_samplers=True):
+        self.name = name
+        self.run_samplers = run_samplers
+        self.stop_event = threading.Event()
+        self.stats = StatsService()
+        self.sampler_threads = []
+        self.outbox_sender = OutboxSender()
+        self.scheduler = add_report_jobs(Scheduler())
+        self.uploader = Uploader() if COLLECTOR_URL else None
+        self.ipc = IPCServer(name, {
+            "ping": lambda args: "pong",
+            "stats": lambda args: encode_snapshot(self.stats.snapshot()),
+            "metrics": lambda args: metrics.summary(),
+            "log-event": self._log_event,
+            "reload": self._reload,
+            "report": self._report,
+            "outbox": self._outbox,
+            "jobs": lambda args: self.scheduler.ledger.recent(args.get("limit", 20)),
+            "upload": self._upload,
+            "stop": self._stop,
+        }, stream_handlers={
+            "subscribe": self._subscribe,
+        })
+
+    def start_samplers(self):
+        """Starts the window, idle and lock samplers. They depend on Win32 APIs."""
+        if sys.platform != 'win32':
+            logging.warning("Activity samplers need Windows; the daemon will only serve existing logs.")
+            return
+        from tracker.app_tracker import track_active_window
+        from tracker.idle_tracker import monitor_idle
+        from tracker.lock_tracker import monitor_lock
+        for target in (track_active_window, monitor_idle, monitor_lock):
+            thread = threading.Thread(target=target, kwargs={"stop_event": self.stop_event},
+                                      name=target.__name__, daemon=True)
+            thread.start()
+            self.sampler_threads.append(thread)
+        logging.info("🛰️ Activity samplers started.")
+
+    def run(self):
+        """Runs until a 'stop' command is received."""
+        self.stats.poll()
+        self.ipc.start()
+        # Log and login files are re-read only when they change, once per burst of writes
+        watcher = FileWatcher(
+            [self.stats.log_file, self.stats.login_file, self.stats.legacy_login_file],
+            lambda changed: self.stats.poll(),
+        ).start()
+        # Delivers report emails queued by any process, retrying failed ones with backoff
+        self.outbox_sender.start()
+        # Daily and weekly reports; runs missed while the machine slept are caught up on resume
+        self.scheduler.start()
+        # Ships new events to the team collector; events queue locally while it is unreachable
+        if self.uploader:
+            self.uploader.start()
+        if self.run_samplers:
+            self.start_samplers()
+        logging.info(f"🚀 {self.name} running.")
+
+        try:
+            while not self.stop_event.wait(RESOURCE_SAMPLE_SECONDS):
+                metrics.wakeup("daemon")
+                metrics.sample_resources()
+                if day_bounds_ms()[0] != self.stats.day_start:
+                    self.stats.poll()  # New day: reset the totals
+        finally:
+            self.stop_event.set()
+            # Give the window sampler a moment to flush its coalesced interval
+            for thread in self.sampler_threads:
+                thread.join(timeout=2)
+            watcher.stop()
+            self.scheduler.stop()
+            self.outbox_sender.stop()
+            if self.uploader:
+                self.uploader.stop()
+            self.ipc.stop()
+            logging.info(f"🛑 {self.name} stopped.")
+
+    def _stop(self, args):
+        self.stop_event.set()
+        return "stopping"
+
+    def _outbox(self, args):
+        """Recent outbox messages and their delivery status; {"send": true} retries due ones now."""
+        if args.get("send"):
+            self.outbox_sender.notify()
+        return self.outbox_sender.outbox.recent(args.get("limit", 20))
+
+    def _upload(self, args):
+        """Collector upload queue status, or None if COLLECTOR_URL is not set."""
+        return self.uploader.queue.status() if self.uploader else None
+
+    def _report(self, args):
+        """Totals for {"day": "YYYY-MM-DD"} (default today) or, with {"week": true}, the last work week."""
+        group_by = args.get("group_by", "title")
+        if args.get("week"):
+            return reports.to_json(reports.weekly_report(group_by=group_by))
+        day = datetime.strptime(args["day"], "%Y-%m-%d").date() if args.get("day") else None
+        return reports.to_json(reports.daily_report(day, group_by=group_by))
+
+    def _reload(self, args):
+        self.stats.reload()
+        return encode_snapshot(self.stats.snapshot())
+
+    def _log_event(self, args):
+        """Writes an event on behalf of a UI client (e.g. an early logout)."""
+        write_log(STRUCTURED_LOG_FILE, args["event"], args["title"], args["start_ms"], args["end_ms"],
+                  **args.get("extra", {}))
+        self.stats.poll()
+        return "logged"
+
+    def _subscribe(self, args, send):
+        """Streams a snapshot now and after every change, until the client disconnects."""
+        latest = {}
+        changed = threading.Event()
+
+        def on_change(snapshot):
+            # Slow clients only ever get the newest snapshot, never a backlog
+            latest["snapshot"] = snapshot
+            changed.set()
+
+        unsubscribe = self.stats.subscribe(on_change)
+        try:
+            send({"ok": True, "result": encode_snapshot(self.stats.snapshot())})
+            while not self.stop_event.is_set():
+                if changed.wait(HEARTBEAT_SECONDS):
+                    changed.clear()
+                    send({"ok": True, "result": encode_snapshot(latest["snapshot"])})
+                else:
+                    send({"ok": True, "heartbeat": True})
+        except OSError:
+            pass  # Client went away
+        finally:
+            unsubscribe()
+
+def setup_daemon_logging():
+    LOGS_DIR.mkdir(exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - [DAEMON] - %(levelname)s - %(message)s",
+        handlers=[
+            logging.FileHandler(DAEMON_LOG_FILE, encoding='utf-8'),
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+def main():
+    if "--status" in sys.argv or "--stop" in sys.argv:
+        cmd = "stop" if "--stop" in sys.argv else "stats"
+        try:
+            print(json.dumps(send_command(DAEMON_NAME, cmd), indent=2))
+        except (OSError, ValueError) as e:
+            print(f"❌ {DAEMON_NAME} is not reachable: {e}")
+            sys.exit(1)
+        return
+
+    setup_daemon_logging()
+    instance = SingleInstance(DAEMON_NAME)
+    if instance.is_running():
+        logging.info(f"{DAEMON_NAME} is already running. Exiting.")
+        return
+    try:
+        TrackerDaemon().run()
+    except Exception:
+        logging.critical("❌ The tracker daemon crashed.", exc_info=True)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
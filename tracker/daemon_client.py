@@ -0,0 +1,222 @@
+# tracker/daemon_client.py
+"""
+Thin-client side of the tracker daemon.
+
+A DaemonClient keeps one subscription open to the daemon on a background
+thread and hands the newest stats snapshot to the UI thread via poll(). It
+mirrors the StatsService interface (poll, subscribe, snapshot, login_time,
+idle_seconds, ...) so UI surfaces can use either. If the daemon is not
+running it is started, and a dropped connection is retried with backoff.
+"""
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import timedelta
+
+from tracker.daemon_protocol import DAEMON_NAME, decode_snapshot
+from tracker.data_service import STRUCTURED_LOG_FILE, WORK_DURATION_HOURS, TOP_APPS_COUNT
+from tracker.ipc import send_command, stream
+
+PROJECT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DAEMON_START_TIMEOUT = 5.0
+RECONNECT_MIN_SECONDS = 1
+RECONNECT_MAX_SECONDS = 30
+
+EMPTY_SNAPSHOT = {
+    "login_time": None,
+    "logout_time": None,
+    "login_method": None,
+    "idle_seconds": 0,
+    "lock_seconds": 0,
+    "active_seconds": 0,
+    "top_apps": [],
+    "version": 0,
+}
+
+def is_daemon_running(name=DAEMON_NAME):
+    try:
+        return send_command(name, "ping", timeout=0.5).get("ok", False)
+    except (OSError, ValueError):
+        return False
+
+def start_daemon():
+    """Launches the daemon as a detached background process."""
+    kwargs = {
+        "cwd": PROJECT_DIR,
+        "stdin": subprocess.DEVNULL,
+        "stdout": subprocess.DEVNULL,
+        "stderr": subprocess.DEVNULL,
+    }
+    if sys.platform == 'win32':
+        kwargs["creationflags"] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    subprocess.Popen([sys.executable, "-m", "tracker.daemon"], **kwargs)
+    logging.info("🛰️ Started the tracker daemon.")
+
+def ensure_daemon(name=DAEMON_NAME, timeout=DAEMON_START_TIMEOUT):
+    """Starts the daemon if it is not answering and waits for it. Returns True once it answers."""
+    if is_daemon_running(name):
+        return True
+    start_daemon()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.1)
+        if is_daemon_running(name):
+            return True
+    logging.warning(f"⚠️ {name} did not start within {timeout:.0f}s.")
+    return False
+
+class DaemonClient:
+    def __init__(self, name=DAEMON_NAME, autostart=True):
+        self.name = name
+        self.autostart = autostart
+        self._lock = threading.Lock()
+        self._snapshot = dict(EMPTY_SNAPSHOT)
+        self._pending = False
+        self._ready = threading.Event()
+        self._subscribers = []
+        self.connected = False
+        self.thread = None
+
+    def start(self):
+        """Starts the background subscription. Safe to call more than once."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name=f"{self.name}-client", daemon=True)
+            self.thread.start()
+        return self
+
+    def _run(self):
+        backoff = RECONNECT_MIN_SECONDS
+        while True:
+            if self.autostart:
+                ensure_daemon(self.name)
+            try:
+                for message in stream(self.name, "subscribe"):
+                    if not message.get("ok"):
+                        logging.warning(f"⚠️ Daemon subscription refused: {message.get('error')}")
+                        break
+                    self.connected = True
+                    backoff = RECONNECT_MIN_SECONDS
+                    if "result" in message:
+                        with self._lock:
+                            self._snapshot = decode_snapshot(message["result"])
+                            self._pending = True
+                        self._ready.set()
+            except (OSError, ValueError) as e:
+                logging.debug(f"Daemon connection lost: {e}")
+            self.connected = False
+            time.sleep(backoff)
+            backoff = min(backoff * 2, RECONNECT_MAX_SECONDS)
+
+    def wait_until_ready(self, timeout=2.0):
+        """Blocks until the first snapshot has arrived. Returns False on timeout."""
+        self.start()
+        return self._ready.wait(timeout)
+
+    # --- StatsService-compatible interface ---
+    def subscribe(self, callback):
+        """Registers callback(snapshot), called from poll(). Returns a function that unsubscribes it."""
+        self._subscribers.append(callback)
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+        return unsubscribe
+
+    def poll(self):
+        """Delivers the newest snapshot to subscribers on the calling (UI) thread. Returns True if it changed."""
+        with self._lock:
+            if not self._pending:
+                return False
+            self._pending = False
+            snapshot = dict(self._snapshot)
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logging.warning(f"⚠️ Stats subscriber failed: {e}", exc_info=True)
+        return True
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._snapshot)
+
+    def set_login_time(self, login_time, method="manual"):
+        """Applies a login change locally right away; the daemon picks it up from the login file."""
+        with self._lock:
+            self._snapshot["login_time"] = login_time
+            self._snapshot["logout_time"] = login_time + timedelta(hours=WORK_DURATION_HOURS) if login_time else None
+            self._snapshot["login_method"] = method
+            self._pending = True
+        self.poll()
+
+    def reload(self):
+        try:
+            reply = send_command(self.name, "reload")
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Could not reload the daemon: {e}")
+            return False
+        if reply.get("ok"):
+            with self._lock:
+                self._snapshot = decode_snapshot(reply["result"])
+                self._pending = True
+        return self.poll()
+
+    def top_apps(self, count=TOP_APPS_COUNT):
+        return self.snapshot()["top_apps"][:count]
+
+    @property
+    def login_time(self):
+        return self._snapshot["login_time"]
+
+    @property
+    def logout_time(self):
+        return self._snapshot["logout_time"]
+
+    @property
+    def login_method(self):
+        return self._snapshot["login_method"]
+
+    @property
+    def idle_seconds(self):
+        return self._snapshot["idle_seconds"]
+
+    @property
+    def lock_seconds(self):
+        return self._snapshot["lock_seconds"]
+
+    @property
+    def active_seconds(self):
+        return self._snapshot["active_seconds"]
+
+    # --- Commands ---
+    def log_event(self, event_type, title, start_ms, end_ms, **extra):
+        """
+        Asks the daemon to write an event; writes it here only if no daemon is listening.
+        Any other failure (no reply in time, an error reply) raises instead, since the
+        daemon may already have written the event and a second copy would double count it.
+        """
+        args = {"event": event_type, "title": title, "start_ms": start_ms, "end_ms": end_ms, "extra": extra}
+        try:
+            reply = send_command(self.name, "log-event", args)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            logging.warning(f"⚠️ Daemon not running, writing '{event_type}' locally: {e}")
+            from tracker.log_writer import write_log
+            write_log(STRUCTURED_LOG_FILE, event_type, title, start_ms, end_ms, **extra)
+            return
+        if not reply.get("ok"):
+            raise RuntimeError(f"Daemon could not log '{event_type}': {reply.get('error')}")
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_daemon_client():
+    """Returns the process-wide DaemonClient, started."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = DaemonClient().start()
+        return _client
@@ -0,0 +1,28 @@
+# tracker/daemon_protocol.py
+"""
+What the tracker daemon and its clients share: the daemon's name and the
+wire format of stats snapshots. Standard library only, so thin UI clients can
+import it without loading the daemon's services (outbox, scheduler, uploader).
+"""
+from datetime import datetime
+
+DAEMON_NAME = "AIWorkTrackerDaemon"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+def encode_snapshot(snapshot):
+    """Converts a StatsService snapshot into a JSON-friendly dict."""
+    data = dict(snapshot)
+    for key in ("login_time", "logout_time"):
+        if data.get(key) is not None:
+            data[key] = data[key].strftime(TIME_FORMAT)
+    data["top_apps"] = [list(item) for item in data.get("top_apps", [])]
+    return data
+
+def decode_snapshot(data):
+    """Inverse of encode_snapshot."""
+    snapshot = dict(data)
+    for key in ("login_time", "logout_time"):
+        if snapshot.get(key):
+            snapshot[key] = datetime.strptime(snapshot[key], TIME_FORMAT)
+    snapshot["top_apps"] = [tuple(item) for item in snapshot.get("top_apps", [])]
+    return snapshot
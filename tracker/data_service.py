@@ -0,0 +1,229 @@
+# tracker/data_service.py
+"""
+Central in-memory stats for today's workday.
+
+One StatsService per process ingests activity events incrementally and keeps
+running totals (login, expected logout, idle, lock, active time, top apps).
+UI surfaces subscribe to it instead of each re-reading and re-summing the
+log files. poll() only touches the disk when a file's size or mtime changed,
+and subscribers are called (on the polling thread) only when a value changed.
+The daemon calls poll() from a FileWatcher, so an unchanging day causes no reads.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+
+from tracker.timecodec import day_bounds_ms, entry_start_ms
+from tracker.process_info import group_key
+from tracker.instrumentation import metrics, STAGE_TAIL_READ
+
+STRUCTURED_LOG_FILE = os.path.join("logs", "structured_log.json")
+LOGIN_FILE = os.path.join("logs", "auto_captured_login.json")
+LEGACY_LOGIN_FILE = os.path.join("logs", "login_time.json")  # Written by tracker/main.py
+WORK_DURATION_HOURS = 9
+TOP_APPS_COUNT = 5
+
+def read_login_file(login_file=LOGIN_FILE, legacy_login_file=LEGACY_LOGIN_FILE):
+    """Returns (login_time, method) for today from the login file, or (None, None)."""
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    if os.path.exists(login_file):
+        try:
+            with open(login_file, "r") as f:
+                data = json.load(f)
+            if data.get("date") == today_str and data.get("login_time"):
+                return datetime.strptime(data["login_time"], "%Y-%m-%d %H:%M:%S"), data.get("method", "unknown")
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Error reading login file: {e}")
+    if legacy_login_file and os.path.exists(legacy_login_file):
+        try:
+            with open(legacy_login_file, "r") as f:
+                login_str = json.load(f).get("login_time")
+            if login_str and login_str.startswith(today_str):
+                return datetime.strptime(login_str, "%Y-%m-%d %H:%M:%S"), "tray_tracker"
+        except (OSError, ValueError) as e:
+            logging.warning(f"⚠️ Error reading legacy login file: {e}")
+    return None, None
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+class StatsService:
+    def __init__(self, log_file=STRUCTURED_LOG_FILE, login_file=LOGIN_FILE,
+                 legacy_login_file=LEGACY_LOGIN_FILE, group_by="title"):
+        self.log_file = log_file
+        self.login_file = login_file
+        self.legacy_login_file = legacy_login_file
+        self.group_by = group_by
+        self._lock = threading.RLock()
+        self._subscribers = []
+        self._log_signature = None
+        self._login_signature = None
+        self.version = 0  # Bumped on every change, so subscribers can cheaply detect updates
+        self._reset_day()
+        self.login_time = None
+        self.login_method = None
+
+    def _reset_day(self):
+        self.day_start, self.day_end = day_bounds_ms()
+        self.processed_entries = 0
+        self.idle_seconds = 0
+        self.lock_seconds = 0
+        self.active_seconds = 0
+        self.app_seconds = {}
+
+    # --- Subscriptions ---
+    def subscribe(self, callback):
+        """Registers callback(snapshot). Returns a function that unsubscribes it."""
+        with self._lock:
+            self._subscribers.append(callback)
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _notify(self):
+        snapshot = self.snapshot()
+        for callback in list(self._subscribers):
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logging.warning(f"⚠️ Stats subscriber failed: {e}", exc_info=True)
+
+    # --- Ingestion ---
+    def ingest(self, entry):
+        """Adds one event to today's totals. Returns True if it counted towards today."""
+        start = entry_start_ms(entry)
+        if not (self.day_start <= start < self.day_end):
+            return False
+        duration = entry.get("duration_seconds", 0)
+        event = entry.get("event")
+        with self._lock:
+            if event == "idle":
+                self.idle_seconds += duration
+            elif event == "lock":
+                self.lock_seconds += duration
+            elif event == "active_app":
+                self.active_seconds += duration
+                key = group_key(entry, self.group_by)
+                self.app_seconds[key] = self.app_seconds.get(key, 0) + duration
+            else:
+                return False
+            self.version += 1
+        return True
+
+    def set_login_time(self, login_time, method="manual"):
+        """Updates the login time (e.g. after the user changes it) and notifies subscribers."""
+        with self._lock:
+            self.login_time = login_time
+            self.login_method = method
+            self.version += 1
+        self._notify()
+
+    def reload(self):
+        """Discards all totals and rebuilds them from the files on the next poll()."""
+        with self._lock:
+            self._reset_day()
+            self._log_signature = None
+            self._login_signature = None
+            self.login_time = None
+            self.version += 1
+        return self.poll()
+
+    def poll(self):
+        """
+        Picks up changes to the log and login files since the last call.
+        Returns True (and notifies subscribers) if anything changed.
+        """
+        changed = False
+        with self._lock:
+            if day_bounds_ms()[0] != self.day_start:
+                # New day: start the totals over
+                self._reset_day()
+                self._log_signature = None
+                self._login_signature = None
+                self.version += 1
+                changed = True
+
+            login_signature = _file_signature(self.login_file), _file_signature(self.legacy_login_file)
+            if login_signature != self._login_signature:
+                self._login_signature = login_signature
+                login_time, method = read_login_file(self.login_file, self.legacy_login_file)
+                if login_time != self.login_time:
+                    self.login_time, self.login_method = login_time, method
+                    self.version += 1
+                    changed = True
+
+            log_signature = _file_signature(self.log_file)
+            if log_signature != self._log_signature:
+                self._log_signature = log_signature
+                with metrics.stage(STAGE_TAIL_READ):
+                    changed = self._read_new_entries() or changed
+
+        if changed:
+            self._notify()
+        return changed
+
+    def _read_new_entries(self):
+        try:
+            with open(self.log_file, "r") as f:
+                logs = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (json.JSONDecodeError, OSError) as e:
+            logging.warning(f"Could not process activity log: {e}")
+            self._log_signature = None  # Caught mid-write; read it again on the next poll
+            return False
+
+        changed = False
+        if len(logs) < self.processed_entries:
+            # The log was truncated or replaced; rebuild today's totals
+            self._reset_day()
+            self.version += 1
+            changed = True
+        for entry in logs[self.processed_entries:]:
+            changed = self.ingest(entry) or changed
+        self.processed_entries = len(logs)
+        return changed
+
+    # --- Queries ---
+    @property
+    def logout_time(self):
+        if self.login_time is None:
+            return None
+        return self.login_time + timedelta(hours=WORK_DURATION_HOURS)
+
+    def top_apps(self, count=TOP_APPS_COUNT):
+        with self._lock:
+            return sorted(self.app_seconds.items(), key=lambda x: x[1], reverse=True)[:count]
+
+    def snapshot(self):
+        """Returns a copy of the current stats."""
+        with self._lock:
+            return {
+                "login_time": self.login_time,
+                "logout_time": self.logout_time,
+                "login_method": self.login_method,
+                "idle_seconds": self.idle_seconds,
+                "lock_seconds": self.lock_seconds,
+                "active_seconds": self.active_seconds,
+                "top_apps": self.top_apps(),
+                "version": self.version,
+            }
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_stats_service():
+    """Returns the process-wide StatsService."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = StatsService()
+        return _service
@@ -0,0 +1,164 @@
+# tracker/dispatcher.py
+"""
+Main-thread dispatcher for the Tk UI.
+
+Two directions of hand-off, both measured in `metrics`:
+- run_io(): slow work (log writes, SMTP, file I/O) goes to a small bounded
+  worker pool, so a slow disk or mail server never stalls the Tk loop.
+  When the backlog is full new jobs are rejected instead of piling up.
+- call_soon(): work that must touch widgets (tray clicks, IPC commands, job
+  completions) is put on a thread-safe queue that the Tk loop drains.
+
+The Tk loop is woken with a virtual event only when the queue goes from
+empty to non-empty, so an idle dispatcher adds no timer wakeups.
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tracker.instrumentation import metrics, STAGE_IO_WAIT, STAGE_IO_RUN, STAGE_UI_QUEUE
+
+IO_WORKERS = 2
+MAX_PENDING_IO = 32
+DRAIN_BUDGET_MS = 20  # Longest a single drain may hold the Tk loop before yielding
+WAKE_EVENT = "<<DispatcherWake>>"
+
+class Dispatcher:
+    def __init__(self, io_workers=IO_WORKERS, max_pending_io=MAX_PENDING_IO):
+        self._executor = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+        self._max_pending_io = max_pending_io
+        self._pending_io = 0
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._ui_queue = queue.SimpleQueue()
+        self.root = None
+
+    # --- Background I/O ---
+    def run_io(self, fn, *args, name=None, on_done=None, on_error=None, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on the I/O pool. on_done(result) and
+        on_error(exc) are called on the UI thread. Returns the Future, or
+        None if the backlog is full or the dispatcher was shut down and the
+        job was rejected.
+        """
+        name = name or getattr(fn, "__name__", "job")
+        with self._io_lock:
+            if self._closed:
+                logging.warning(f"⚠️ Dispatcher is shut down; dropped '{name}'")
+                return None
+            if self._pending_io >= self._max_pending_io:
+                metrics.increment("io_rejected")
+                logging.warning(f"⚠️ I/O backlog full ({self._pending_io} jobs); dropped '{name}'")
+                return None
+            self._pending_io += 1
+            metrics.set_gauge("io_queue_depth", self._pending_io)
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            metrics.record_stage(STAGE_IO_WAIT, (started - submitted) * 1000)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                logging.error(f"❌ Background job '{name}' failed: {e}", exc_info=True)
+                if on_error:
+                    self.call_soon(on_error, e)
+                raise
+            finally:
+                metrics.record_stage(STAGE_IO_RUN, (time.perf_counter() - started) * 1000)
+                with self._io_lock:
+                    self._pending_io -= 1
+                    metrics.set_gauge("io_queue_depth", self._pending_io)
+            if on_done:
+                self.call_soon(on_done, result)
+            return result
+
+        try:
+            return self._executor.submit(job)
+        except RuntimeError as e:
+            # shutdown() ran between the check above and here
+            with self._io_lock:
+                self._pending_io -= 1
+                metrics.set_gauge("io_queue_depth", self._pending_io)
+            logging.warning(f"⚠️ Dropped '{name}': {e}")
+            return None
+
+    # --- UI thread ---
+    def attach_tk(self, root):
+        """Drains the queue on the Tk thread whenever work is queued."""
+        self.root = root
+        root.bind(WAKE_EVENT, lambda event: self.drain())
+        self.drain()
+
+    def call_soon(self, fn, *args):
+        """Queues fn(*args) to run on the UI thread. Safe to call from any thread."""
+        was_empty = self._ui_queue.empty()
+        self._ui_queue.put((time.perf_counter(), fn, args))
+        metrics.set_gauge("ui_queue_depth", self._ui_queue.qsize())
+        if was_empty and self.root is not None:
+            try:
+                # tkinter marshals this to the Tk thread; "tail" queues it behind pending events
+                self.root.event_generate(WAKE_EVENT, when="tail")
+            except Exception:
+                pass  # The loop is not running (yet or any more); the next drain() picks it up
+
+    def drain(self, budget_ms=DRAIN_BUDGET_MS):
+        """Runs queued callbacks on the calling (UI) thread. Returns the number run."""
+        deadline = time.perf_counter() + budget_ms / 1000
+        count = 0
+        while True:
+            try:
+                queued_at, fn, args = self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            metrics.record_stage(STAGE_UI_QUEUE, (time.perf_counter() - queued_at) * 1000)
+            try:
+                fn(*args)
+            except Exception as e:
+                logging.error(f"❌ UI callback '{getattr(fn, '__name__', fn)}' failed: {e}", exc_info=True)
+            count += 1
+            if time.perf_counter() >= deadline:
+                # Let Tk process input and redraws, then continue with the rest
+                if self.root is not None and not self._ui_queue.empty():
+                    self.root.after_idle(self.drain)
+                break
+        metrics.set_gauge("ui_queue_depth", self._ui_queue.qsize())
+        return count
+
+    def pending(self):
+        """Returns (queued I/O jobs, queued UI callbacks)."""
+        with self._io_lock:
+            return self._pending_io, self._ui_queue.qsize()
+
+    def shutdown(self, wait=True):
+        """
+        Called once the Tk loop has ended. Stops accepting I/O jobs; with wait=True,
+        lets queued ones (e.g. a report email) finish. UI callbacks still queued
+        are dropped, as their widgets are gone.
+        """
+        self.root = None
+        with self._io_lock:
+            self._closed = True
+        self._executor.shutdown(wait=wait)
+        dropped = 0
+        while True:
+            try:
+                self._ui_queue.get_nowait()
+            except queue.Empty:
+                break
+            dropped += 1
+        if dropped:
+            logging.info(f"Dropped {dropped} UI callbacks queued after the UI closed.")
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher():
+    """Returns the process-wide Dispatcher."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = Dispatcher()
+        return _dispatcher
@@ -0,0 +1,230 @@
+# tracker/event_store.py
+"""
+Queryable index of the activity log.
+
+logs/structured_log.json stays the source of truth; this keeps a SQLite copy
+of it (logs/events.db) indexed by start time, so views can ask for one page
+of events in a date range with filtering and sorting done by the database
+instead of loading the whole log. Every sortable column is indexed, and
+pages next to one already loaded are fetched by seeking from its edge row
+(keyset paging), so scrolling costs the same at the end of a year as at the
+start; OFFSET is only used for jumps. sync() only reads the JSON log when its
+size or mtime changed and only inserts the entries added since the last
+sync. If the log shrank (truncated or replaced), the index is rebuilt.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from tracker.data_service import STRUCTURED_LOG_FILE
+from tracker.instrumentation import metrics
+from tracker.timecodec import entry_start_ms, entry_end_ms
+
+EVENT_DB_FILE = os.path.join("logs", "events.db")
+ORDERED_SCAN_MIN_MS = 7 * 86400 * 1000  # Ranges longer than this are read in sort-index order
+BASE_FIELDS = ("event", "title", "process_name", "start_ms", "end_ms", "duration_seconds")
+
+# Sortable columns, by the name the views use
+SORT_COLUMNS = {
+    "start": "start_ms",
+    "end": "end_ms",
+    "duration": "duration_seconds",
+    "event": "event",
+    "title": "title",
+    "process": "process_name",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,  -- Position in the JSON log
+    event TEXT NOT NULL,
+    title TEXT NOT NULL,
+    process_name TEXT NOT NULL,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    duration_seconds INTEGER NOT NULL,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS events_start ON events (start_ms);
+CREATE INDEX IF NOT EXISTS events_end ON events (end_ms);
+CREATE INDEX IF NOT EXISTS events_duration ON events (duration_seconds);
+CREATE INDEX IF NOT EXISTS events_event ON events (event);
+CREATE INDEX IF NOT EXISTS events_title ON events (title);
+CREATE INDEX IF NOT EXISTS events_process ON events (process_name);
+CREATE INDEX IF NOT EXISTS events_event_start ON events (event, start_ms);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def _row_from_entry(seq, entry):
+    extra = {k: v for k, v in entry.items()
+             if k not in BASE_FIELDS and k not in ("start_time", "end_time")}
+    return (
+        seq,
+        entry.get("event", "unknown"),
+        entry.get("title") or "",
+        entry.get("process_name") or "",
+        entry_start_ms(entry),
+        entry_end_ms(entry),
+        entry.get("duration_seconds", 0),
+        json.dumps(extra) if extra else None,
+    )
+
+def _entry_from_row(row):
+    entry = dict(zip(("seq",) + BASE_FIELDS, row[:7]))
+    if row[7]:
+        entry.update(json.loads(row[7]))
+    return entry
+
+class EventStore:
+    def __init__(self, log_file=STRUCTURED_LOG_FILE, db_file=EVENT_DB_FILE):
+        self.log_file = log_file
+        self.db_file = db_file
+        self._local = threading.local()  # One connection per thread
+        self._sync_lock = threading.Lock()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            conn = self._local.conn = sqlite3.connect(self.db_file)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers are not blocked by a sync
+        return conn
+
+    def _meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    # --- Sync ---
+    def sync(self):
+        """Indexes entries appended to the JSON log since the last sync. Returns the number added."""
+        with self._sync_lock:
+            try:
+                st = os.stat(self.log_file)
+            except FileNotFoundError:
+                return 0
+            signature = f"{st.st_size}:{st.st_mtime_ns}"
+            conn = self._connection()
+            if self._meta(conn, "log_signature") == signature:
+                return 0
+            try:
+                with open(self.log_file, "r") as f:
+                    logs = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logging.warning(f"⚠️ Could not index activity log: {e}")
+                return 0
+
+            indexed = int(self._meta(conn, "indexed_count", 0))
+            with conn:
+                if len(logs) < indexed:
+                    logging.info("🔁 Activity log shrank; rebuilding the event index.")
+                    conn.execute("DELETE FROM events")
+                    indexed = 0
+                conn.executemany("INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 (_row_from_entry(seq, logs[seq]) for seq in range(indexed, len(logs))))
+                conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                 [("indexed_count", str(len(logs))), ("log_signature", signature)])
+            added = len(logs) - indexed
+            metrics.increment("events_indexed", added)
+            return added
+
+    # --- Queries ---
+    def _where(self, start_ms, end_ms, event=None, search=None, index_range=True):
+        # A unary + keeps SQLite from using the start_ms index for the range,
+        # so it can walk the sort column's index instead
+        column = "start_ms" if index_range else "+start_ms"
+        clauses = [f"{column} >= ?", f"{column} < ?"]
+        params = [start_ms, end_ms]
+        if event:
+            clauses.append("event = ?")
+            params.append(event)
+        if search:
+            clauses.append("(title LIKE ? OR process_name LIKE ?)")
+            params += [f"%{search}%"] * 2
+        return " AND ".join(clauses), params
+
+    def count(self, start_ms, end_ms, event=None, search=None):
+        """Returns how many events start in [start_ms, end_ms) and match the filters."""
+        where, params = self._where(start_ms, end_ms, event, search)
+        return self._connection().execute(f"SELECT COUNT(*) FROM events WHERE {where}", params).fetchone()[0]
+
+    def page(self, start_ms, end_ms, offset, limit, event=None, search=None, sort="start", descending=True,
+             after=None, before=None):
+        """
+        Returns `limit` events of the filtered, sorted range, as dicts.
+        By default they start at position `offset`. Pass `after` (the sort_key() of
+        the last row of the previous page) or `before` (that of the first row of the
+        next page) to seek from a neighbouring page instead, which does not slow
+        down deep into the range.
+        """
+        column = SORT_COLUMNS[sort]
+        forward = before is None
+        # Walking backwards from `before` is a forward walk in the opposite order
+        descending_query = descending if forward else not descending
+        direction = "DESC" if descending_query else "ASC"
+        edge = after if forward else before
+        if edge is not None and column == "start_ms":
+            # Narrow the range itself; SQLite will not combine it with the row-value bound
+            if descending_query:
+                end_ms = min(end_ms, edge[0] + 1)
+            else:
+                start_ms = max(start_ms, edge[0])
+        # Sorting a short range is cheap; over a long one, read in index order and stop at `limit`
+        index_range = column == "start_ms" or end_ms - start_ms <= ORDERED_SCAN_MIN_MS
+        where, params = self._where(start_ms, end_ms, event, search, index_range)
+        if edge is not None:
+            comparison = "<" if descending_query else ">"
+            where += f" AND {column} {comparison}= ? AND ({column}, seq) {comparison} (?, ?)"
+            params += [edge[0], *edge]
+            offset = 0
+        rows = self._connection().execute(
+            f"SELECT seq, {', '.join(BASE_FIELDS)}, extra FROM events WHERE {where} "
+            f"ORDER BY {column} {direction}, seq {direction} LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        if not forward:
+            rows.reverse()
+        return [_entry_from_row(row) for row in rows]
+
+    def iterate(self, start_ms, end_ms, event=None, search=None, batch_size=1000):
+        """Yields the matching events in start order, reading batch_size rows at a time."""
+        where, params = self._where(start_ms, end_ms, event, search)
+        cursor = self._connection().execute(
+            f"SELECT seq, {', '.join(BASE_FIELDS)}, extra FROM events WHERE {where} ORDER BY start_ms, seq", params)
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _entry_from_row(row)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def sort_key(entry, sort="start"):
+        """The position of an entry in a sort order, for page(after=...) and page(before=...)."""
+        return entry[SORT_COLUMNS[sort]], entry["seq"]
+
+    def event_types(self):
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT event FROM events ORDER BY event")]
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_event_store():
+    """Returns the process-wide EventStore."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore()
+        return _store
@@ -0,0 +1,192 @@
+# tracker/export.py
+"""
+Streaming export of activity history.
+
+Exports the events, or per-day totals, of any date range as CSV, JSONL or a
+standalone HTML page. Rows are read from the event store in batches and
+written as they arrive, so memory stays flat however long the range is (a
+year of history exports the same way as a day).
+
+    python -m tracker.export 2025-01-01 2025-12-31 --format csv -o year.csv
+    python -m tracker.export 2025-07-01 2025-07-31 --days --format html -o july.html
+    python -m tracker.export 2025-07-28 2025-07-28 --event idle --format jsonl
+
+Options: --format csv|jsonl|html (default csv), --days (per-day totals),
+--event TYPE, --search TEXT, -o FILE (default: standard output).
+"""
+import csv
+import html
+import json
+import operator
+import os
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tracker.event_store import get_event_store
+from tracker.timecodec import day_bounds_ms, format_ms, to_datetime
+
+FORMATS = ("csv", "jsonl", "html")
+DATE_FORMAT = "%Y-%m-%d"
+
+EVENT_COLUMNS = ("start", "end", "duration_seconds", "event", "title", "process_name")
+DAY_COLUMNS = ("day", "first_start", "last_end", "events", "active_seconds", "idle_seconds", "lock_seconds", "top_app")
+
+class TimestampFormatter:
+    """
+    format_ms() for a stream of nearby timestamps. Local-time offsets only change
+    on whole minutes, so the date/hour/minute text is formatted once per minute
+    and the seconds appended; rows come in start order, so consecutive calls
+    mostly hit the same minute.
+    """
+    def __init__(self):
+        self._minute = None
+        self._prefix = ""
+
+    def __call__(self, ms):
+        minute, seconds = divmod(ms // 1000, 60)
+        if minute != self._minute:
+            self._minute = minute
+            self._prefix = format_ms(minute * 60000, "%Y-%m-%d %H:%M")
+        return f"{self._prefix}:{seconds:02d}"
+
+def event_rows(store, start_ms, end_ms, event=None, search=None):
+    """Yields one dict per event in the range, in start order."""
+    format_start, format_end = TimestampFormatter(), TimestampFormatter()
+    for entry in store.iterate(start_ms, end_ms, event=event, search=search):
+        entry.pop("seq")
+        entry["start"] = format_start(entry["start_ms"])
+        entry["end"] = format_end(entry["end_ms"])
+        yield entry
+
+def day_rows(store, start_ms, end_ms, event=None, search=None):
+    """Yields one dict of totals per day that has events. Only one day is held at a time."""
+    day = None
+    for entry in store.iterate(start_ms, end_ms, event=event, search=search):
+        start = to_datetime(entry["start_ms"]).date()
+        if start != day:
+            if day is not None:
+                yield _finish_day(totals, apps)
+            day = start
+            totals = {"day": day.strftime(DATE_FORMAT), "first_start": format_ms(entry["start_ms"]),
+                      "last_end_ms": entry["end_ms"], "events": 0,
+                      "active_seconds": 0, "idle_seconds": 0, "lock_seconds": 0}
+            apps = {}
+        totals["events"] += 1
+        totals["last_end_ms"] = max(totals["last_end_ms"], entry["end_ms"])
+        kind = entry["event"]
+        if kind == "active_app":
+            totals["active_seconds"] += entry["duration_seconds"]
+            app = entry["process_name"] or entry["title"]
+            apps[app] = apps.get(app, 0) + entry["duration_seconds"]
+        elif kind in ("idle", "lock"):
+            totals[f"{kind}_seconds"] += entry["duration_seconds"]
+    if day is not None:
+        yield _finish_day(totals, apps)
+
+def _finish_day(totals, apps):
+    totals["last_end"] = format_ms(totals.pop("last_end_ms"))
+    totals["top_app"] = max(apps, key=apps.get) if apps else ""
+    return totals
+
+# --- Writers: each takes an iterable of row dicts and returns the number written ---
+def write_csv(rows, out, columns):
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(columns)
+    values = operator.itemgetter(*columns)
+    count = 0
+    for row in rows:
+        writer.writerow(values(row))
+        count += 1
+    return count
+
+def write_jsonl(rows, out, columns=None):
+    count = 0
+    for row in rows:
+        out.write(json.dumps(row, ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Arial, sans-serif; background: #23272e; color: #fff; margin: 24px; }}
+table {{ border-collapse: collapse; font-size: 13px; }}
+th {{ position: sticky; top: 0; background: #4fc3f7; color: #23272e; text-align: left; }}
+th, td {{ padding: 4px 10px; border-bottom: 1px solid #3a3f4b; }}
+</style></head><body>
+<h2>{title}</h2>
+<table>
+<tr>{header}</tr>
+"""
+
+def write_html(rows, out, columns, title="Activity Export"):
+    header = "".join(f"<th>{html.escape(column)}</th>" for column in columns)
+    out.write(HTML_HEAD.format(title=html.escape(title), header=header))
+    values = operator.itemgetter(*columns)
+    count = 0
+    for row in rows:
+        out.write("<tr><td>" + "</td><td>".join(html.escape(str(value)) for value in values(row)) + "</td></tr>\n")
+        count += 1
+    out.write(f"</table>\n<p>{count:,} rows</p>\n</body></html>\n")
+    return count
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "html": write_html}
+
+def export(out, start_ms, end_ms, fmt="csv", days=False, event=None, search=None, store=None):
+    """
+    Writes the events (or, with days=True, per-day totals) that start in
+    [start_ms, end_ms) to the text stream `out`. Returns the number of rows.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown export format '{fmt}' (use one of {', '.join(FORMATS)})")
+    if store is None:
+        store = get_event_store()
+        store.sync()
+    rows = (day_rows if days else event_rows)(store, start_ms, end_ms, event=event, search=search)
+    columns = DAY_COLUMNS if days else EVENT_COLUMNS
+    if fmt == "html":
+        title = f"{'Daily Totals' if days else 'Activity'} {format_ms(start_ms, DATE_FORMAT)} to " \
+                f"{format_ms(end_ms - 1, DATE_FORMAT)}"
+        return write_html(rows, out, columns, title=title)
+    return WRITERS[fmt](rows, out, columns)
+
+def export_file(path, start_ms, end_ms, fmt=None, **kwargs):
+    """Exports to a file; the format defaults to the file extension."""
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    # Write next to the target and rename, so a failed export never leaves half a file
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8", newline="") as out:
+            count = export(out, start_ms, end_ms, fmt=fmt, **kwargs)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return count
+
+def _option(name, default=None):
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+def main():
+    dates = [arg for arg in sys.argv[1:3] if not arg.startswith("-")]
+    if len(dates) != 2:
+        print(__doc__)
+        sys.exit(2)
+    options = {"days": "--days" in sys.argv, "event": _option("--event"), "search": _option("--search")}
+    path = _option("-o")
+    try:
+        start_ms = day_bounds_ms(datetime.strptime(dates[0], DATE_FORMAT))[0]
+        end_ms = day_bounds_ms(datetime.strptime(dates[1], DATE_FORMAT))[1]
+        if path:
+            count = export_file(path, start_ms, end_ms, fmt=_option("--format"), **options)
+            print(f"📤 Exported {count:,} rows to {path}", file=sys.stderr)
+        else:
+            export(sys.stdout, start_ms, end_ms, fmt=_option("--format", "csv"), **options)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# tracker/file_watcher.py
+"""
+Change notifications for the activity log and login files.
+
+On Linux the watcher uses inotify (through ctypes, no extra dependency) on the
+files' parent directories, so files that are replaced or created later are
+still seen. Elsewhere it falls back to polling each file's size and mtime.
+Bursts of writes are debounced into a single callback, so a quiet workday
+causes no reads at all and a burst of writes causes one.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+from tracker.instrumentation import metrics
+
+DEBOUNCE_SECONDS = 0.25     # Quiet period that ends a burst of writes
+MAX_DELAY_SECONDS = 1.0     # A continuous burst still triggers at least this often
+POLL_INTERVAL_SECONDS = 1.0  # Stat-polling fallback
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_DELETE
+_EVENT_HEADER = struct.Struct("iIII")
+
+def _load_inotify():
+    """Returns libc if it provides inotify, else None."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+class FileWatcher:
+    """
+    Calls callback(changed_paths) on a background thread after any of `paths`
+    changes, once per debounced burst.
+    """
+    def __init__(self, paths, callback, debounce=DEBOUNCE_SECONDS, max_delay=MAX_DELAY_SECONDS,
+                 poll_interval=POLL_INTERVAL_SECONDS, use_inotify=True):
+        self.paths = [os.path.abspath(p) for p in paths]
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.libc = _load_inotify() if use_inotify else None
+        self.backend = "inotify" if self.libc else "stat-poll"
+        self.thread = None
+        self._stop_event = threading.Event()
+        self._wake_r, self._wake_w = os.pipe()
+
+    def start(self):
+        target = self._run_inotify if self.libc else self._run_polling
+        self.thread = threading.Thread(target=target, name="file-watcher", daemon=True)
+        self.thread.start()
+        logging.info(f"👀 Watching {len(self.paths)} files ({self.backend})")
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        os.write(self._wake_w, b"x")
+        if self.thread:
+            self.thread.join(timeout=2)
+        for fd in (self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _fire(self, changed):
+        metrics.wakeup("watcher")
+        try:
+            self.callback(sorted(changed))
+        except Exception as e:
+            logging.warning(f"⚠️ File watcher callback failed: {e}", exc_info=True)
+
+    # --- inotify backend ---
+    def _run_inotify(self):
+        fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logging.warning(f"⚠️ inotify unavailable ({os.strerror(ctypes.get_errno())}); falling back to polling")
+            self.backend = "stat-poll"
+            return self._run_polling()
+
+        watched = {}  # wd -> directory
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            os.makedirs(directory, exist_ok=True)
+            wd = self.libc.inotify_add_watch(fd, directory.encode(), WATCH_MASK)
+            if wd >= 0:
+                watched[wd] = directory
+        try:
+            pending = set()
+            burst_started = None
+            while not self._stop_event.is_set():
+                if pending:
+                    # Wait out the burst, but never longer than max_delay overall
+                    timeout = min(self.debounce, max(0, burst_started + self.max_delay - time.monotonic()))
+                else:
+                    timeout = None
+                readable, _, _ = select.select([fd, self._wake_r], [], [], timeout)
+                if self._wake_r in readable:
+                    break
+                if fd in readable:
+                    for path in self._read_events(fd, watched):
+                        if not pending:
+                            burst_started = time.monotonic()
+                        pending.add(path)
+                    if pending and time.monotonic() - burst_started < self.max_delay:
+                        continue
+                if pending:
+                    changed, pending = pending, set()
+                    self._fire(changed)
+        finally:
+            os.close(fd)
+
+    def _read_events(self, fd, watched):
+        """Drains the inotify fd and returns the watched paths that changed."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+                offset += length
+                path = os.path.join(watched.get(wd, ""), name)
+                if path in self.paths:
+                    changed.add(path)
+        return changed
+
+    # --- Stat-polling fallback ---
+    def _run_polling(self):
+        signatures = {p: _signature(p) for p in self.paths}
+        pending = set()
+        burst_started = None
+        while not self._stop_event.wait(self.debounce if pending else self.poll_interval):
+            changed = set()
+            for path in self.paths:
+                signature = _signature(path)
+                if signature != signatures[path]:
+                    signatures[path] = signature
+                    changed.add(path)
+            if changed:
+                if not pending:
+                    burst_started = time.monotonic()
+                pending |= changed
+                if time.monotonic() - burst_started < self.max_delay:
+                    continue
+            if pending:
+                fired, pending = pending, set()
+                self._fire(fired)
@@ -1,12 +1,12 @@
 import ctypes
 import time
-from datetime import datetime
 import os
 import sys
 
 # Ensure the parent directory is in the path to find the log_writer module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from tracker.log_writer import write_log
+from tracker.timecodec import now_ms, format_ms
 
 LOG_FILE = os.path.join("logs", "structured_log.json")
 IDLE_THRESHOLD_SECONDS = 60 * 5 # 5 minutes
@@ -21,22 +21,25 @@ def get_idle_time_seconds():
     millis = ctypes.windll.kernel32.GetTickCount() - lii.dwTime
     return millis / 1000.0
 
-def monitor_idle():
+def monitor_idle(stop_event=None):
     is_idle = False
-    idle_start_time = None
+    idle_start_ms = None
 
-    while True:
+    while stop_event is None or not stop_event.is_set():
         idle_time = get_idle_time_seconds()
 
         if idle_time >= IDLE_THRESHOLD_SECONDS and not is_idle:
-            idle_start_time = datetime.now()
+            idle_start_ms = now_ms()
             is_idle = True
-            print(f"{idle_start_time.strftime('%Y-%m-%d %H:%M:%S')} - Idle started")
+            print(f"{format_ms(idle_start_ms)} - Idle started")
 
         elif idle_time < IDLE_THRESHOLD_SECONDS and is_idle:
-            idle_end_time = datetime.now()
-            write_log(LOG_FILE, "idle", "User Idle", idle_start_time.strftime("%Y-%m-%d %H:%M:%S"), idle_end_time.strftime("%Y-%m-%d %H:%M:%S"))
-            print(f"{idle_end_time.strftime('%Y-%m-%d %H:%M:%S')} - Idle ended")
+            idle_end_ms = now_ms()
+            write_log(LOG_FILE, "idle", "User Idle", idle_start_ms, idle_end_ms)
+            print(f"{format_ms(idle_end_ms)} - Idle ended")
             is_idle = False
 
-        time.sleep(10)
+        if stop_event is None:
+            time.sleep(10)
+        else:
+            stop_event.wait(10)
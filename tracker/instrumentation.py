@@ -0,0 +1,213 @@
+# tracker/instrumentation.py
+"""
+Self-instrumentation for the long-running tracker.
+
+A single process-wide `metrics` object collects:
+- per-stage timings (probe, coalesce, write, tail-read, render),
+- main-loop tick latency and jitter (how late each Tk tick fires),
+- CPU time and RSS of the tracker process,
+- timer wakeups per minute, per source,
+- dispatcher queue depths and waits (io-wait, io-run, ui-queue).
+
+Everything is kept in fixed-size rolling windows so memory stays flat.
+summary_lines() feeds the tray menu and dump() writes a JSON snapshot.
+"""
+import json
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+ROLLING_WINDOW = 300  # Samples kept per series
+WAKEUP_WINDOW_SECONDS = 60
+PERF_DUMP_FILE = os.path.join("logs", "perf_stats.json")
+
+STAGE_PROBE = "probe"
+STAGE_COALESCE = "coalesce"
+STAGE_WRITE = "write"
+STAGE_TAIL_READ = "tail-read"
+STAGE_RENDER = "render"
+STAGE_IO_WAIT = "io-wait"    # Time an I/O job waited for a worker
+STAGE_IO_RUN = "io-run"      # Time an I/O job ran
+STAGE_UI_QUEUE = "ui-queue"  # Time a callback waited for the UI thread
+STAGE_SMTP_SEND = "smtp-send"  # Time to hand one email to the SMTP server
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def _series_stats(values):
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(_percentile(ordered, 50), 3),
+        "p95": round(_percentile(ordered, 95), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+class Instrumentation:
+    """Collects rolling performance samples. Safe to use from any thread."""
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}         # stage name -> deque of durations (ms)
+        self._tick_latency = {}   # loop name -> deque of lateness (ms)
+        self._last_tick = {}      # loop name -> (perf_counter when armed, requested delay ms)
+        self._resources = deque(maxlen=window)  # (wall time, cpu seconds, rss bytes)
+        self._counters = {}
+        self._gauges = {}
+        self._wakeups = {}        # source -> deque of monotonic wakeup times
+        self._process = None
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block and records it under the given stage name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, (time.perf_counter() - start) * 1000)
+
+    def record_stage(self, name, duration_ms):
+        with self._lock:
+            series = self._stages.get(name)
+            if series is None:
+                series = self._stages[name] = deque(maxlen=self.window)
+            series.append(duration_ms)
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def set_gauge(self, name, value):
+        """Records the current value of a level (e.g. a queue depth) and its high-water mark."""
+        with self._lock:
+            _, peak = self._gauges.get(name, (0, 0))
+            self._gauges[name] = (value, max(peak, value))
+
+    def wakeup(self, source):
+        """Records one timer wakeup for the given source."""
+        now = time.monotonic()
+        with self._lock:
+            series = self._wakeups.get(source)
+            if series is None:
+                series = self._wakeups[source] = deque()
+            series.append(now)
+            while series and now - series[0] > WAKEUP_WINDOW_SECONDS:
+                series.popleft()
+
+    def wakeups_per_minute(self):
+        """Returns {source: wakeups in the last minute}."""
+        now = time.monotonic()
+        with self._lock:
+            return {source: sum(1 for t in series if now - t <= WAKEUP_WINDOW_SECONDS)
+                    for source, series in self._wakeups.items()}
+
+    def scheduled(self, loop, delay_ms):
+        """Call when a timer loop arms its next tick with the given delay."""
+        with self._lock:
+            self._last_tick[loop] = (time.perf_counter(), delay_ms)
+
+    def tick(self, loop):
+        """
+        Call at the start of every tick of a timer loop.
+        Records how late the tick fired relative to the delay passed to scheduled().
+        """
+        now = time.perf_counter()
+        with self._lock:
+            previous = self._last_tick.pop(loop, None)
+            if previous is None:
+                return
+            scheduled_at, delay_ms = previous
+            lateness = (now - scheduled_at) * 1000 - delay_ms
+            series = self._tick_latency.get(loop)
+            if series is None:
+                series = self._tick_latency[loop] = deque(maxlen=self.window)
+            series.append(lateness)
+
+    def sample_resources(self):
+        """Samples the process CPU time and resident memory."""
+        rss = None
+        try:
+            if self._process is None:
+                import psutil
+                self._process = psutil.Process()
+            rss = self._process.memory_info().rss
+        except Exception:
+            pass
+        with self._lock:
+            self._resources.append((time.time(), time.process_time(), rss))
+
+    def summary(self):
+        """Returns a JSON-serializable snapshot of all series."""
+        with self._lock:
+            stages = {name: _series_stats(values) for name, values in self._stages.items()}
+            loops = {}
+            for name, values in self._tick_latency.items():
+                stats = _series_stats(values)
+                if len(values) > 1:
+                    stats["jitter"] = round(statistics.pstdev(values), 3)
+                loops[name] = stats
+            resources = list(self._resources)
+            counters = dict(self._counters)
+            gauges = {name: {"current": value, "peak": peak} for name, (value, peak) in self._gauges.items()}
+
+        process = {}
+        if resources:
+            wall, cpu, rss = resources[-1]
+            process["cpu_seconds"] = round(cpu, 3)
+            process["rss_mb"] = round(rss / (1024 * 1024), 1) if rss else None
+            if len(resources) > 1:
+                first_wall, first_cpu, _ = resources[0]
+                if wall > first_wall:
+                    process["cpu_percent"] = round((cpu - first_cpu) / (wall - first_wall) * 100, 2)
+        return {
+            "generated_at": time.time(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "process": process,
+            "loops": loops,
+            "stages": stages,
+            "counters": counters,
+            "gauges": gauges,
+            "wakeups_per_minute": self.wakeups_per_minute(),
+        }
+
+    def summary_lines(self):
+        """Returns a short human-readable summary, one line per metric."""
+        data = self.summary()
+        process = data["process"]
+        lines = []
+        if process:
+            rss = f"{process['rss_mb']} MB" if process.get("rss_mb") is not None else "n/a"
+            cpu = f"{process['cpu_percent']}%" if "cpu_percent" in process else "n/a"
+            lines.append(f"CPU: {cpu} | RSS: {rss}")
+        wakeups = data["wakeups_per_minute"]
+        if wakeups:
+            lines.append("Wakeups/min: " + ", ".join(f"{source} {count}" for source, count in wakeups.items()))
+        for name, stats in data["loops"].items():
+            if stats["count"]:
+                lines.append(f"{name} tick late: p50 {stats['p50']:.1f} ms, p95 {stats['p95']:.1f} ms, jitter {stats.get('jitter', 0):.1f} ms")
+        for name, gauge in data["gauges"].items():
+            lines.append(f"{name}: {gauge['current']} (peak {gauge['peak']})")
+        for name, stats in data["stages"].items():
+            if stats["count"]:
+                lines.append(f"{name}: p50 {stats['p50']:.2f} ms, p95 {stats['p95']:.2f} ms (n={stats['count']})")
+        return lines or ["No samples yet"]
+
+    def dump(self, path=PERF_DUMP_FILE):
+        """Writes the current summary as JSON and returns the path."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+# Process-wide instance shared by the samplers, the writer and the UI
+metrics = Instrumentation()
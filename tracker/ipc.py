@@ -0,0 +1,184 @@
+# tracker/ipc.py
+"""
+Local IPC channel owned by the running tracker instance.
+
+The running instance listens on a Unix domain socket named after the app
+(in the temp directory). Platforms without AF_UNIX support (Windows builds of
+Python) fall back to a loopback TCP socket whose port is published in a file
+keyed by the same app name.
+
+Protocol: the client sends one JSON line {"cmd": "...", "args": {...}} and
+receives one JSON line {"ok": true, "result": ...} or {"ok": false, "error": "..."}.
+Stream commands (e.g. a subscription) keep the connection open after the
+first reply and push further JSON lines until either side disconnects.
+"""
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+
+DEFAULT_TIMEOUT = 2.0
+MAX_MESSAGE_BYTES = 64 * 1024
+HAS_AF_UNIX = hasattr(socket, "AF_UNIX")
+
+def socket_path(app_name):
+    return os.path.join(tempfile.gettempdir(), f"{app_name}.sock")
+
+def port_file_path(app_name):
+    return os.path.join(tempfile.gettempdir(), f"{app_name}.port")
+
+def _read_line(conn):
+    """Reads one newline-terminated message from a socket."""
+    chunks = []
+    size = 0
+    while True:
+        chunk = conn.recv(4096)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size += len(chunk)
+        if b"\n" in chunk or size > MAX_MESSAGE_BYTES:
+            break
+    return b"".join(chunks).split(b"\n", 1)[0]
+
+def connect(app_name, timeout=DEFAULT_TIMEOUT):
+    """Opens a client connection to the running instance. Raises OSError if none is listening."""
+    if HAS_AF_UNIX:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        address = socket_path(app_name)
+    else:
+        with open(port_file_path(app_name)) as f:
+            port = int(f.read().strip())
+        conn = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        address = ("127.0.0.1", port)
+    conn.settimeout(timeout)
+    try:
+        conn.connect(address)
+    except OSError:
+        conn.close()
+        raise
+    return conn
+
+def stream(app_name, cmd, args=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Opens a stream command and yields every message the server pushes.
+    The first message is the server's reply; the generator ends when the server closes the connection.
+    """
+    conn = connect(app_name, timeout=timeout)
+    try:
+        conn.sendall(json.dumps({"cmd": cmd, "args": args or {}}).encode("utf-8") + b"\n")
+        conn.settimeout(None)  # Pushes can be minutes apart
+        with conn.makefile("rb") as reader:
+            for line in reader:
+                yield json.loads(line)
+    finally:
+        conn.close()
+
+def send_command(app_name, cmd, args=None, timeout=DEFAULT_TIMEOUT):
+    """
+    Sends a command to the running instance and returns its reply dict.
+    Raises OSError if no instance is listening or it does not answer in time.
+    """
+    with connect(app_name, timeout=timeout) as conn:
+        conn.sendall(json.dumps({"cmd": cmd, "args": args or {}}).encode("utf-8") + b"\n")
+        line = _read_line(conn)
+    if not line:
+        raise ConnectionError(f"No reply from {app_name} for '{cmd}'")
+    return json.loads(line)
+
+class IPCServer:
+    """
+    Accepts commands from other processes and dispatches them to handlers.
+    `handlers` maps a command name to a callable taking the args dict; its
+    return value is sent back as the result. `stream_handlers` map a command to
+    a callable taking (args, send); it may call send(message) repeatedly and
+    the connection stays open until it returns. Each connection is served on
+    its own thread, so anything touching the UI must be marshalled to the UI thread.
+    """
+    def __init__(self, app_name, handlers, stream_handlers=None):
+        self.app_name = app_name
+        self.handlers = dict(handlers)
+        self.stream_handlers = dict(stream_handlers or {})
+        self.sock = None
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        if HAS_AF_UNIX:
+            path = socket_path(self.app_name)
+            # Only the instance holding the SingleInstance lock gets here, so any existing socket is stale
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.bind(path)
+            os.chmod(path, 0o600)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.bind(("127.0.0.1", 0))
+            with open(port_file_path(self.app_name), "w") as f:
+                f.write(str(self.sock.getsockname()[1]))
+        self.sock.listen(8)
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, name=f"{self.app_name}-ipc", daemon=True)
+        self.thread.start()
+        logging.info(f"📡 IPC server listening for {self.app_name}")
+
+    def stop(self):
+        self.running = False
+        if self.sock:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+        try:
+            os.remove(socket_path(self.app_name) if HAS_AF_UNIX else port_file_path(self.app_name))
+        except OSError:
+            pass
+
+    def _serve(self):
+        while self.running:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                break  # Socket closed by stop()
+            threading.Thread(target=self._serve_connection, args=(conn,), daemon=True).start()
+
+    def _serve_connection(self, conn):
+        with conn:
+            conn.settimeout(DEFAULT_TIMEOUT)
+            try:
+                self._handle(conn)
+            except OSError as e:
+                logging.warning(f"⚠️ IPC connection error: {e}")
+
+    def _handle(self, conn):
+        line = _read_line(conn)
+
+        def send(message):
+            conn.sendall(json.dumps(message, default=str).encode("utf-8") + b"\n")
+
+        try:
+            request = json.loads(line)
+            cmd = request.get("cmd")
+            args = request.get("args") or {}
+            if cmd in self.stream_handlers:
+                conn.settimeout(None)
+                self.stream_handlers[cmd](args, send)
+                return
+            handler = self.handlers.get(cmd)
+            if handler is None:
+                available = sorted(list(self.handlers) + list(self.stream_handlers))
+                reply = {"ok": False, "error": f"Unknown command '{cmd}'. Available: {', '.join(available)}"}
+            else:
+                reply = {"ok": True, "result": handler(args)}
+        except OSError:
+            raise
+        except Exception as e:
+            logging.warning(f"⚠️ IPC command failed: {e}", exc_info=True)
+            reply = {"ok": False, "error": str(e)}
+        send(reply)
@@ -1,11 +1,37 @@
 import json
+import logging
 import os
-from datetime import datetime
+import threading
 
-def write_log(log_file, event_type, title, start_time, end_time):
+from tracker.timecodec import to_ms
+from tracker.instrumentation import metrics, STAGE_WRITE
+
+# The samplers and IPC handler threads all write the same log; the read-modify-write must not interleave
+_write_lock = threading.Lock()
+
+def write_log(log_file, event_type, title, start_time, end_time, **extra):
     """
-    Write structured log entry to JSON file
+    Write structured log entry to JSON file.
+    start_time and end_time are epoch milliseconds (legacy "%Y-%m-%d %H:%M:%S"
+    strings and datetimes are still accepted and converted).
+    Any extra keyword fields (e.g. process_name, exe) are stored on the entry.
     """
+    with metrics.stage(STAGE_WRITE), _write_lock:
+        log_entry = _write_log(log_file, event_type, title, start_time, end_time, extra)
+    _queue_upload(log_entry)
+
+def _queue_upload(log_entry):
+    """Hands the entry to the collector upload queue, if configured. Local only; never touches the network."""
+    from tracker.uploader import get_upload_queue
+    queue = get_upload_queue()
+    if queue is None:
+        return
+    try:
+        queue.append([log_entry])
+    except Exception as e:
+        logging.warning(f"⚠️ Could not queue event for upload: {e}")
+
+def _write_log(log_file, event_type, title, start_time, end_time, extra):
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
     
     # Load existing logs or create new
@@ -20,23 +46,27 @@ def write_log(log_file, event_type, title, start_time, end_time):
     
     # Calculate duration
     try:
-        start_dt = datetime.strptime(start_time, "%Y-%m-%d %H:%M:%S")
-        end_dt = datetime.strptime(end_time, "%Y-%m-%d %H:%M:%S")
-        duration_seconds = int((end_dt - start_dt).total_seconds())
-    except ValueError:
-        duration_seconds = 0
+        start_ms = to_ms(start_time)
+        end_ms = to_ms(end_time)
+    except (ValueError, TypeError):
+        start_ms = end_ms = None
+    duration_seconds = (end_ms - start_ms) // 1000 if start_ms is not None else 0
     
     # Create log entry
     log_entry = {
         "event": event_type,
         "title": title,
-        "start_time": start_time,
-        "end_time": end_time,
+        "start_ms": start_ms,
+        "end_ms": end_ms,
         "duration_seconds": duration_seconds
     }
+    log_entry.update(extra)
     
     logs.append(log_entry)
     
-    # Save back to file
-    with open(log_file, 'w') as f:
+    # Save back to file; readers see either the old or the new log, never a partial one
+    temp_file = f"{log_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w') as f:
         json.dump(logs, f, indent=2)
+    os.replace(temp_file, log_file)
+    return log_entry
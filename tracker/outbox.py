@@ -0,0 +1,352 @@
+# tracker/outbox.py
+"""
+Durable outbox for report emails.
+
+Reports are not sent inline any more: they are queued in logs/outbox.db and
+delivered by an OutboxSender, which reuses one authenticated SMTP connection
+for every message it sends and retries failures with exponential backoff.
+Each message keeps its status (queued, sending, sent, failed), attempt count
+and last error, so a failed send is retried later instead of being lost.
+If the server refuses the login, no message is at fault: they all stay
+queued and the sender pauses for AUTH_RETRY_SECONDS.
+
+The tracker daemon runs a sender in the background; one-shot scripts such
+as run_report.py call drain() to try delivery right away, and whatever is
+still undelivered is picked up by the daemon.
+
+    python -m tracker.outbox            # list recent messages and their status
+    python -m tracker.outbox --drain    # send everything that is due now
+    python -m tracker.outbox --retry ID # requeue a failed message
+"""
+import json
+import logging
+import os
+import random
+import smtplib
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from tracker.instrumentation import metrics, STAGE_SMTP_SEND
+
+# Anchored to the project, so report scripts started from any directory share the daemon's outbox
+OUTBOX_DB_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "outbox.db")
+
+# SMTP settings; override them in config.py (e.g. to point at a local test server)
+SMTP_HOST = getattr(config, "SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = getattr(config, "SMTP_PORT", 465)
+SMTP_SSL = getattr(config, "SMTP_SSL", True)
+SMTP_TIMEOUT = 30
+CONNECTION_IDLE_SECONDS = 240  # Servers drop idle sessions; reconnect rather than reuse an old one
+
+MAX_ATTEMPTS = 8
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 6 * 3600
+SENDING_TIMEOUT_SECONDS = 600  # A claim older than this belongs to a sender that died
+AUTH_RETRY_SECONDS = 15 * 60   # Pause after the server refuses the login
+
+STATUS_QUEUED = "queued"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    subject TEXT,
+    sender TEXT NOT NULL,
+    recipients TEXT NOT NULL,
+    body BLOB NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    claimed_at REAL,
+    sent_at REAL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_due ON messages (status, next_attempt_at);
+"""
+
+def backoff_seconds(attempts):
+    """Delay before retry number `attempts`: exponential with +/-20% jitter, capped."""
+    delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)
+
+def is_permanent(error):
+    """True for SMTP errors that retrying cannot fix (5xx replies)."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    code = getattr(error, "smtp_code", None)
+    return isinstance(code, int) and code >= 500 and not isinstance(error, smtplib.SMTPServerDisconnected)
+
+def is_auth_error(error):
+    """True if the server refused the login (e.g. 535): the credentials are at fault, not the message."""
+    return isinstance(error, smtplib.SMTPAuthenticationError) or getattr(error, "smtp_code", None) == 530
+
+class Outbox:
+    def __init__(self, db_file=OUTBOX_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            conn = self._local.conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def enqueue(self, message, kind="report"):
+        """Queues an email.message.Message (From/To/Subject set) and returns its id."""
+        recipients = [addr.strip() for addr in message["To"].split(",")]
+        now = time.time()
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO messages (kind, subject, sender, recipients, body, status, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, message["Subject"], message["From"], json.dumps(recipients),
+                 message.as_bytes(), STATUS_QUEUED, now, now),
+            )
+        metrics.increment("emails_queued")
+        logging.info(f"📮 Queued {kind} email #{cursor.lastrowid}: {message['Subject']}")
+        return cursor.lastrowid
+
+    def claim_due(self, now=None):
+        """Atomically claims the next message that is due, or returns None."""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        with conn:
+            row = conn.execute(
+                "SELECT * FROM messages WHERE (status = ? AND next_attempt_at <= ?) "
+                "OR (status = ? AND claimed_at < ?) ORDER BY next_attempt_at, id LIMIT 1",
+                (STATUS_QUEUED, now, STATUS_SENDING, now - SENDING_TIMEOUT_SECONDS),
+            ).fetchone()
+            if row is None:
+                return None
+            claimed = conn.execute(
+                "UPDATE messages SET status = ?, claimed_at = ? WHERE id = ? AND status = ? AND "
+                "(claimed_at IS NULL OR claimed_at = ?)",
+                (STATUS_SENDING, now, row["id"], row["status"], row["claimed_at"]),
+            ).rowcount
+        # Another process may have claimed it between the SELECT and the UPDATE
+        return row if claimed else self.claim_due(now)
+
+    def mark_sent(self, message_id):
+        with self._connection() as conn:
+            conn.execute("UPDATE messages SET status = ?, sent_at = ?, attempts = attempts + 1, last_error = NULL "
+                         "WHERE id = ?", (STATUS_SENT, time.time(), message_id))
+        metrics.increment("emails_sent")
+
+    def mark_failed(self, message_id, error, permanent=False):
+        """Records a failed attempt; schedules a retry unless it was permanent or the last attempt."""
+        with self._connection() as conn:
+            attempts = conn.execute("SELECT attempts FROM messages WHERE id = ?", (message_id,)).fetchone()[0] + 1
+            give_up = permanent or attempts >= MAX_ATTEMPTS
+            conn.execute(
+                "UPDATE messages SET status = ?, attempts = ?, next_attempt_at = ?, claimed_at = NULL, last_error = ? "
+                "WHERE id = ?",
+                (STATUS_FAILED if give_up else STATUS_QUEUED, attempts,
+                 time.time() + (0 if give_up else backoff_seconds(attempts)), str(error)[:500], message_id),
+            )
+        metrics.increment("emails_failed" if give_up else "emails_retried")
+        return give_up
+
+    def defer(self, message_id, error, delay_seconds):
+        """Puts a claimed message back in the queue for later without counting an attempt."""
+        with self._connection() as conn:
+            conn.execute("UPDATE messages SET status = ?, next_attempt_at = ?, claimed_at = NULL, last_error = ? "
+                         "WHERE id = ?", (STATUS_QUEUED, time.time() + delay_seconds, str(error)[:500], message_id))
+
+    def retry(self, message_id):
+        """Requeues a message for immediate delivery (e.g. after fixing the credentials)."""
+        with self._connection() as conn:
+            return conn.execute("UPDATE messages SET status = ?, next_attempt_at = ?, claimed_at = NULL "
+                                "WHERE id = ? AND status != ?",
+                                (STATUS_QUEUED, time.time(), message_id, STATUS_SENT)).rowcount > 0
+
+    def status(self, message_id):
+        row = self._connection().execute(
+            "SELECT id, kind, subject, status, attempts, created_at, next_attempt_at, sent_at, last_error "
+            "FROM messages WHERE id = ?", (message_id,)).fetchone()
+        return dict(row) if row else None
+
+    def recent(self, limit=20):
+        rows = self._connection().execute(
+            "SELECT id, kind, subject, status, attempts, created_at, next_attempt_at, sent_at, last_error "
+            "FROM messages ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def next_due_at(self):
+        """When the next queued message becomes due, or None if nothing is queued."""
+        row = self._connection().execute("SELECT MIN(next_attempt_at) FROM messages WHERE status = ?",
+                                         (STATUS_QUEUED,)).fetchone()
+        return row[0]
+
+class SMTPConnectionPool:
+    """Holds one authenticated SMTP connection and reuses it across messages."""
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, use_ssl=SMTP_SSL, user=None, password=None,
+                 timeout=SMTP_TIMEOUT):
+        self.host, self.port, self.use_ssl, self.timeout = host, port, use_ssl, timeout
+        self.user = user if user is not None else getattr(config, "GMAIL_USER", None)
+        self.password = password if password is not None else getattr(config, "GMAIL_PASS", None)
+        self._server = None
+        self._last_used = 0
+        self.connects = 0
+
+    @property
+    def connected(self):
+        return self._server is not None
+
+    def get(self):
+        """Returns a live, logged-in connection, reconnecting if the old one is stale or dead."""
+        if self._server is not None and time.monotonic() - self._last_used > CONNECTION_IDLE_SECONDS:
+            self.close()
+        if self._server is not None:
+            try:
+                self._server.noop()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._server is None:
+            cls = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+            server = cls(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.user and self.password:
+                    server.login(self.user, self.password)
+            except Exception:
+                server.close()
+                raise
+            self._server = server
+            self.connects += 1
+        self._last_used = time.monotonic()
+        return self._server
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                self._server.close()
+            self._server = None
+
+class OutboxSender:
+    """Delivers due messages from an Outbox, on demand (drain) or in a background thread (start)."""
+    def __init__(self, outbox=None, pool=None):
+        self.outbox = outbox or Outbox()
+        self.pool = pool or SMTPConnectionPool()
+        self._lock = threading.Lock()  # One delivery at a time per sender
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.paused_until = 0.0  # time.monotonic() before which nothing is sent, after a refused login
+        self.thread = None
+
+    @property
+    def paused(self):
+        return time.monotonic() < self.paused_until
+
+    def drain(self, deadline_seconds=None):
+        """Sends every message that is due now. Returns (sent, failed_attempts)."""
+        deadline = None if deadline_seconds is None else time.monotonic() + deadline_seconds
+        sent = failed = 0
+        if self.paused:
+            return sent, failed
+        with self._lock:
+            try:
+                while deadline is None or time.monotonic() < deadline:
+                    row = self.outbox.claim_due()
+                    if row is None:
+                        break
+                    if self._deliver(row):
+                        sent += 1
+                    else:
+                        failed += 1
+                        # A connection-level failure will likely hit the next message too
+                        if not self.pool.connected:
+                            break
+            finally:
+                self.pool.close()
+        return sent, failed
+
+    def _deliver(self, row):
+        started = time.perf_counter()
+        try:
+            server = self.pool.get()
+            server.sendmail(row["sender"], json.loads(row["recipients"]), row["body"])
+        except (smtplib.SMTPException, OSError) as e:
+            # A refused message leaves the session usable; a dropped connection does not
+            if isinstance(e, smtplib.SMTPServerDisconnected) or not isinstance(e, smtplib.SMTPException):
+                self.pool.close()
+            if is_auth_error(e):
+                # Every message would fail the same way; keep them all queued until the login works
+                self.pool.close()
+                self.paused_until = time.monotonic() + AUTH_RETRY_SECONDS
+                self.outbox.defer(row["id"], e, AUTH_RETRY_SECONDS)
+                logging.error(f"❌ SMTP login refused; not sending for {AUTH_RETRY_SECONDS // 60} min: {e}")
+                return False
+            gave_up = self.outbox.mark_failed(row["id"], e, permanent=is_permanent(e))
+            logging.warning(f"⚠️ Email #{row['id']} attempt {row['attempts'] + 1} failed: {e}"
+                            + (" (giving up)" if gave_up else " (will retry)"))
+            return False
+        self.outbox.mark_sent(row["id"])
+        metrics.record_stage(STAGE_SMTP_SEND, (time.perf_counter() - started) * 1000)
+        logging.info(f"✅ Email #{row['id']} sent: {row['subject']}")
+        return True
+
+    # --- Background delivery ---
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="outbox-sender", daemon=True)
+        self.thread.start()
+        return self
+
+    def notify(self):
+        """Wakes the background sender (e.g. after a message was queued)."""
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.drain()
+            next_due = self.outbox.next_due_at()
+            timeout = None if next_due is None else max(1.0, next_due - time.time())
+            if self.paused:
+                timeout = max(timeout or 0, self.paused_until - time.monotonic())
+            # Also re-check periodically, since other processes can queue messages too
+            self._wake.wait(min(timeout or 60, 60))
+            self._wake.clear()
+
+def send_now(message, kind="report", deadline_seconds=60):
+    """Queues a message and tries to deliver the queue right away. Returns the message id."""
+    outbox = Outbox()
+    message_id = outbox.enqueue(message, kind=kind)
+    OutboxSender(outbox).drain(deadline_seconds=deadline_seconds)
+    status = outbox.status(message_id)
+    if status["status"] != STATUS_SENT:
+        print(f"📮 Email #{message_id} is {status['status']} ({status['last_error']}); it will be retried.")
+    return message_id
+
+def main():
+    outbox = Outbox()
+    if "--retry" in sys.argv:
+        message_id = int(sys.argv[sys.argv.index("--retry") + 1])
+        print("requeued" if outbox.retry(message_id) else "not found or already sent")
+        return
+    if "--drain" in sys.argv:
+        sent, failed = OutboxSender(outbox).drain()
+        print(f"sent {sent}, failed attempts {failed}")
+    for message in outbox.recent():
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(message["created_at"]))
+        error = f"  ({message['last_error']})" if message["last_error"] else ""
+        print(f"#{message['id']:<4} {when}  {message['status']:8s} attempts {message['attempts']}  "
+              f"{message['subject']}{error}")
+
+if __name__ == "__main__":
+    main()
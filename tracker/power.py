@@ -0,0 +1,34 @@
+# tracker/power.py
+"""
+Power-aware helpers for the UI timers.
+
+Timers are aligned to shared wall-clock boundaries (whole seconds, whole
+minutes) so that everything due in the same period fires in one wakeup
+instead of drifting apart, and the refresh rate drops while on battery.
+"""
+import time
+
+BATTERY_CHECK_SECONDS = 60  # How long a battery-state reading is reused
+
+_battery_state = {"checked_at": None, "on_battery": False}
+
+def on_battery():
+    """Returns True if the machine is running on battery. Cached for BATTERY_CHECK_SECONDS."""
+    now = time.monotonic()
+    checked_at = _battery_state["checked_at"]
+    if checked_at is None or now - checked_at >= BATTERY_CHECK_SECONDS:
+        try:
+            import psutil  # Deferred so importing this module stays cheap at start-up
+            battery = psutil.sensors_battery()
+            _battery_state["on_battery"] = battery is not None and not battery.power_plugged
+        except Exception:
+            _battery_state["on_battery"] = False
+        _battery_state["checked_at"] = now
+    return _battery_state["on_battery"]
+
+def aligned_delay_ms(period_ms, now=None):
+    """Returns the delay until the next wall-clock multiple of period_ms (at least 1 ms)."""
+    if now is None:
+        now = time.time()
+    now_ms = int(now * 1000)
+    return max(1, period_ms - now_ms % period_ms)
@@ -0,0 +1,74 @@
+# tracker/process_info.py
+import time
+
+# How long a cached PID entry is trusted before it is re-checked for PID reuse
+REVALIDATE_SECONDS = 30
+MAX_CACHED_PROCESSES = 256
+
+# Fields that reports can group 'active_app' events by
+GROUP_BY_FIELDS = {
+    "title": "title",
+    "process": "process_name",
+}
+
+class ProcessCache:
+    """
+    Resolves a PID to its process name and executable path.
+    Lookups are cached per PID so the window sampler does not pay a psutil
+    round-trip on every tick. A cached entry is re-validated at most every
+    REVALIDATE_SECONDS; if the PID has been reused by a new process, the
+    entry is dropped and resolved again.
+    """
+    def __init__(self, revalidate_seconds=REVALIDATE_SECONDS, max_entries=MAX_CACHED_PROCESSES):
+        self.revalidate_seconds = revalidate_seconds
+        self.max_entries = max_entries
+        self._cache = {}  # pid -> [psutil.Process, name, exe, last_checked]
+
+    def lookup(self, pid):
+        """Returns (process_name, exe) for a PID, or (None, None) if it cannot be resolved."""
+        if not pid:
+            return None, None
+
+        import psutil  # Deferred: report code imports group_key without needing psutil
+        now = time.monotonic()
+        cached = self._cache.get(pid)
+        if cached:
+            proc, name, exe, last_checked = cached
+            if now - last_checked < self.revalidate_seconds:
+                return name, exe
+            # is_running() compares the creation time, so it detects PID reuse
+            if proc.is_running():
+                cached[3] = now
+                return name, exe
+            del self._cache[pid]
+
+        try:
+            proc = psutil.Process(pid)
+            name = proc.name()
+            try:
+                exe = proc.exe()
+            except (psutil.AccessDenied, psutil.ZombieProcess):
+                exe = None
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return None, None
+
+        if len(self._cache) >= self.max_entries:
+            # Evict the entry that was checked longest ago
+            oldest = min(self._cache, key=lambda p: self._cache[p][3])
+            del self._cache[oldest]
+        self._cache[pid] = [proc, name, exe, now]
+        return name, exe
+
+    def clear(self):
+        self._cache.clear()
+
+def group_key(entry, group_by="title"):
+    """Returns the value an 'active_app' entry should be grouped under in reports."""
+    field = GROUP_BY_FIELDS.get(group_by)
+    if field is None:
+        raise ValueError(f"Unknown group_by '{group_by}'. Use one of: {', '.join(GROUP_BY_FIELDS)}")
+    value = entry.get(field)
+    if value:
+        return value
+    # Entries logged before process attribution existed have no process fields
+    return "Unknown App" if group_by == "title" else "Unknown Process"
@@ -0,0 +1,152 @@
+# tracker/report_mail.py
+"""
+Builds report emails.
+
+Charts are attached as multipart/related image parts and referenced from the
+HTML with cid: links, instead of being inlined as base64 data: URIs (which
+many mail clients clip or block). A chart wider than CHART_MAX_WIDTH is
+downsampled once and the result cached in logs/chart_cache/, keyed by the
+chart file's size and mtime, so rebuilding a report whose data has not changed
+costs a file read.
+
+The message size is capped: charts that would push it over MAX_MESSAGE_BYTES
+are left out, and a report whose HTML alone exceeds MAX_HTML_BYTES (where
+Gmail starts clipping) is sent as a plain-text summary instead.
+
+    message:  multipart/alternative
+                text/plain                 the report text
+                multipart/related
+                  text/html                <img src="cid:chart-...">
+                  image/png                Content-ID: <chart-...>
+"""
+import hashlib
+import logging
+import os
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.utils import make_msgid
+
+import config
+
+CHART_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "chart_cache")
+CHART_MAX_WIDTH = 800              # px; mail clients show about 600, so wider charts only add bytes
+MAX_MESSAGE_BYTES = 1024 * 1024    # Encoded size cap; charts that do not fit are left out
+MAX_HTML_BYTES = 100 * 1024        # Gmail clips HTML bodies past ~102 KB
+TEXT_SUMMARY_LINES = 80
+CHART_STYLE = "max-width:600px; border:2px solid #4fc3f7; border-radius:8px;"
+BASE64_OVERHEAD = 4 / 3 * 77 / 76  # base64 plus a line break every 76 characters
+
+def chart_version(path):
+    """Changes whenever the chart file is rewritten."""
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+def prepare_chart(path, max_width=CHART_MAX_WIDTH, cache_dir=None):
+    """
+    Returns the PNG bytes of a chart, downsampled to at most max_width pixels
+    wide, or None if the file is missing. Downsampled copies are cached per
+    chart version; without Pillow the chart is used as is.
+    """
+    cache_dir = cache_dir or CHART_CACHE_DIR
+    try:
+        version = chart_version(path)
+    except FileNotFoundError:
+        return None
+    stem = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(f"{os.path.abspath(path)}|{version}|{max_width}".encode()).hexdigest()[:16]
+    cached = os.path.join(cache_dir, f"{stem}-{digest}.png")
+    try:
+        with open(cached, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        from PIL import Image  # Optional: only needed to shrink oversized charts
+    except ImportError:
+        return data
+    import io
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= max_width:
+            return data
+        height = max(1, round(image.height * max_width / image.width))
+        out = io.BytesIO()
+        image.resize((max_width, height), Image.LANCZOS).save(out, format="PNG", optimize=True)
+    data = out.getvalue()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    for name in os.listdir(cache_dir):
+        if name.startswith(f"{stem}-"):  # Copies of older versions of this chart
+            os.remove(os.path.join(cache_dir, name))
+    tmp = f"{cached}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, cached)
+    return data
+
+def text_summary(text, max_lines=TEXT_SUMMARY_LINES):
+    """The first max_lines lines of a report, with a note on how many were left out."""
+    lines = text.splitlines()
+    if len(lines) <= max_lines:
+        return text
+    return "\n".join(lines[:max_lines] + ["", f"... {len(lines) - max_lines} more lines not shown."])
+
+def build_report_message(subject, text, html, charts=(), sender=None, recipient=None,
+                         max_bytes=MAX_MESSAGE_BYTES, max_html_bytes=MAX_HTML_BYTES):
+    """
+    Builds a report email. `html` is a complete document; `charts` is a list of
+    (path, alt text) whose images are added before </body>. Missing charts are
+    skipped, and the size caps described above are applied.
+    """
+    sender = sender or config.GMAIL_USER
+    recipient = recipient or config.RECIPIENT
+
+    if len(html.encode("utf-8")) > max_html_bytes:
+        logging.info(f"📧 '{subject}' is too large for HTML; sending a text summary.")
+        msg = MIMEText(text_summary(text), "plain", "utf-8")
+        return _address(msg, subject, sender, recipient)
+
+    budget = max_bytes - (len(text.encode("utf-8")) + len(html.encode("utf-8"))) * BASE64_OVERHEAD - 4096
+    images, tags = [], []
+    for path, alt in charts:
+        data = prepare_chart(path)
+        if data is None:
+            continue
+        size = len(data) * BASE64_OVERHEAD
+        if size > budget:
+            logging.info(f"📧 Left chart {os.path.basename(path)} out of '{subject}' to stay under {max_bytes} bytes.")
+            tags.append(f"<p style='font-size: 12px; color: #777;'>({alt} left out: message size limit)</p>")
+            continue
+        budget -= size
+        cid = make_msgid(domain="report.local")[1:-1]
+        image = MIMEImage(data, "png")
+        image.add_header("Content-ID", f"<{cid}>")
+        image.add_header("Content-Disposition", "inline", filename=os.path.basename(path))
+        images.append(image)
+        tags.append(f'<br><img src="cid:{cid}" alt="{alt}" style="{CHART_STYLE}">')
+    if tags:
+        if "</body>" in html:
+            html = html.replace("</body>", "\n".join(tags) + "\n</body>", 1)
+        else:
+            html += "\n".join(tags)
+
+    msg = MIMEMultipart("alternative")
+    msg.attach(MIMEText(text, "plain", "utf-8"))
+    if images:
+        related = MIMEMultipart("related")
+        related.attach(MIMEText(html, "html", "utf-8"))
+        for image in images:
+            related.attach(image)
+        msg.attach(related)
+    else:
+        msg.attach(MIMEText(html, "html", "utf-8"))
+    return _address(msg, subject, sender, recipient)
+
+def _address(msg, subject, sender, recipient):
+    msg["From"] = sender
+    msg["To"] = recipient
+    msg["Subject"] = subject
+    return msg
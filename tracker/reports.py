@@ -0,0 +1,116 @@
+# tracker/reports.py
+"""
+Report generators and renderers.
+
+A generator takes an explicit period (a day, a week, or any start/end) and a
+clock, reads the events in that period and returns a plain dict of totals.
+Renderers turn such a dict into the report text. Nothing is computed at
+import time and no state is kept between calls, so the resident daemon can
+generate reports for any period, repeatedly and from several threads, without
+re-importing anything.
+
+    report = daily_report(date(2025, 7, 30))
+    report = weekly_report(now=datetime(2025, 8, 1, 20, 0))
+    print(render_weekly_text(report))
+"""
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from tracker.process_info import group_key
+from tracker.timecodec import day_bounds_ms, entry_start_ms, to_ms
+
+REPORT_LOG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs",
+                               "structured_log.json")
+WEEK_END_HOUR = 20  # The work week ends on Friday at 8pm
+
+def load_entries(start_ms, end_ms, log_file=REPORT_LOG_FILE):
+    """Returns the log entries that start in [start_ms, end_ms)."""
+    try:
+        with open(log_file, "r") as f:
+            logs = json.load(f)
+    except FileNotFoundError:
+        return []
+    except json.JSONDecodeError:
+        logging.warning(f"⚠️ Could not decode {log_file}. It might be empty or corrupt.")
+        return []
+    return [entry for entry in logs if start_ms <= entry_start_ms(entry) < end_ms]
+
+def summarize(entries, start, end, group_by="title"):
+    """Totals for a list of entries: active/idle/lock seconds and usage per app (or process), largest first."""
+    usage = {}
+    idle_seconds = lock_seconds = 0
+    for entry in entries:
+        duration = entry.get("duration_seconds", 0)
+        if entry["event"] == "active_app":
+            key = group_key(entry, group_by)
+            usage[key] = usage.get(key, 0) + duration
+        elif entry["event"] == "idle":
+            idle_seconds += duration
+        elif entry["event"] == "lock":
+            lock_seconds += duration
+    return {
+        "start": start,
+        "end": end,
+        "group_by": group_by,
+        "events": len(entries),
+        "active_seconds": sum(usage.values()),
+        "idle_seconds": idle_seconds,
+        "lock_seconds": lock_seconds,
+        "usage": sorted(usage.items(), key=lambda item: item[1], reverse=True),
+    }
+
+def range_report(start, end, group_by="title", log_file=REPORT_LOG_FILE):
+    """Totals for the events that start in [start, end) (datetimes)."""
+    return summarize(load_entries(to_ms(start), to_ms(end), log_file), start, end, group_by)
+
+def daily_report(day=None, group_by="title", clock=datetime.now, log_file=REPORT_LOG_FILE):
+    """Totals for one calendar day (default: today, per `clock`)."""
+    day = day or clock().date()
+    start_ms, end_ms = day_bounds_ms(day)
+    start = datetime.combine(day, datetime.min.time())
+    report = summarize(load_entries(start_ms, end_ms, log_file), start, start + timedelta(days=1), group_by)
+    report["day"] = day
+    return report
+
+def week_bounds(now):
+    """Monday 00:00 to Friday 8pm of the work week ending on the most recent Friday (today if Friday)."""
+    friday = (now - timedelta(days=(now.weekday() - 4) % 7)).date()
+    monday = datetime.combine(friday - timedelta(days=4), datetime.min.time())
+    return monday, datetime.combine(friday, datetime.min.time()).replace(hour=WEEK_END_HOUR)
+
+def weekly_report(now=None, group_by="title", clock=datetime.now, log_file=REPORT_LOG_FILE):
+    """Totals for the work week ending on the most recent Friday, as of `now` (default: per `clock`)."""
+    start, end = week_bounds(now or clock())
+    return range_report(start, end, group_by, log_file)
+
+def to_json(report):
+    """A report with its dates as ISO strings, e.g. for the daemon's 'report' command."""
+    return {key: value.isoformat() if hasattr(value, "isoformat") else value for key, value in report.items()}
+
+# --- Renderers ---
+def render_daily_text(report):
+    lines = [f"DAILY WORK SUMMARY - {report['day'].strftime('%Y-%m-%d')}\n=======================================\n"]
+    lines.append("--- Activity Summary ---")
+    lines.append(f"Total Productive Time: {report['active_seconds'] // 60} minutes")
+    lines.append(f"Total Idle Time: {report['idle_seconds'] // 60} minutes")
+    lines.append(f"Total Lock Time: {report['lock_seconds'] // 60} minutes\n")
+    lines.append("--- Application Usage ---" if report["group_by"] == "title" else "--- Process Usage ---")
+    if not report["usage"]:
+        lines.append("No application usage tracked.")
+    for app, seconds in report["usage"]:
+        if seconds >= 60:
+            lines.append(f"- {app}: {seconds // 60} min")
+    return "\n".join(lines)
+
+def render_weekly_text(report):
+    lines = ["WEEKLY PRODUCTIVITY REPORT\n========================\n"]
+    lines.append(f"Week: {report['start'].strftime('%Y-%m-%d')} to {report['end'].strftime('%Y-%m-%d %H:%M')}\n")
+    lines.append("\nApp Usage:" if report["group_by"] == "title" else "\nProcess Usage:")
+    for app, seconds in report["usage"]:
+        lines.append(f"- {app}: {seconds // 60} min")
+    lines.append(f"\nIdle Time: {report['idle_seconds'] // 60} min")
+    lines.append(f"Lock Time: {report['lock_seconds'] // 60} min")
+    lines.append(f"\nTotal Productive Time: {report['active_seconds'] // 60} min")
+    return "\n".join(lines)
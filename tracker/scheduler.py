@@ -0,0 +1,349 @@
+# tracker/scheduler.py
+"""
+In-process job scheduler with a persistent run ledger.
+
+Jobs have cron-like rules ("minute hour day-of-month month day-of-week",
+e.g. "0 23 * * *") and run inside the long-running tracker daemon instead of
+being cold-started by the OS scheduler. Every run is recorded in one ledger
+table (logs/scheduler.db, indexed by job and period), which also replaces the
+old logs/report_sent_<day>.flag files.
+
+Missed runs are caught up: the scheduler checks at least every CHECK_SECONDS,
+recomputing from the wall clock, so after sleep or hibernation a job whose
+time passed runs once on resume. Several missed firings of the same job are
+coalesced into one run (for the latest), and firings older than the job's
+catch-up window are dropped. A period that already has a successful run is
+never run again, whichever process (daemon, UI or a script) ran it.
+
+    python -m tracker.scheduler          # recent runs from the ledger
+"""
+import glob
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from tracker.instrumentation import metrics
+
+LOGS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
+SCHEDULER_DB_FILE = os.path.join(LOGS_DIR, "scheduler.db")
+CHECK_SECONDS = 60           # Longest wait between checks, so a resume from sleep is noticed quickly
+MAX_ATTEMPTS = 3             # Runs of one period before a failing job is left alone
+RETRY_SECONDS = 300          # Wait before retrying a failed run
+STALE_RUN_SECONDS = 3600     # A run still 'running' after this belongs to a process that died
+
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+DAILY_REPORT_JOB = "daily-report"
+WEEKLY_REPORT_JOB = "weekly-report"
+DAILY_REPORT_CRON = getattr(config, "DAILY_REPORT_CRON", "0 23 * * *")    # 11 PM, as the old scheduled task
+WEEKLY_REPORT_CRON = getattr(config, "WEEKLY_REPORT_CRON", "0 20 * * 5")  # Friday 8 PM
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    job TEXT NOT NULL,
+    period TEXT NOT NULL,
+    scheduled_for REAL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 1,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    error TEXT,
+    PRIMARY KEY (job, period)
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (job, started_at);
+"""
+
+class CronRule:
+    """A five-field cron expression, matched against naive local datetimes at minute resolution."""
+    BOUNDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 6))  # Day of week: 0 (or 7) is Sunday
+    MAX_STEPS = 100000
+
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron rule '{expression}' needs 5 fields: minute hour day month weekday")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            self._parse(field, lo, hi, weekday=(i == 4)) for i, (field, (lo, hi)) in enumerate(zip(fields, self.BOUNDS)))
+        # As in cron: if both day fields are restricted, either one matching is enough
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse(field, lo, hi, weekday=False):
+        values = set()
+        for part in field.split(","):
+            spec, _, step = part.partition("/")
+            if spec == "*":
+                start, end = lo, hi
+            elif "-" in spec:
+                start, end = (int(v) for v in spec.split("-", 1))
+            else:
+                start = end = int(spec)
+            step = int(step) if step else 1
+            if not (lo <= start <= end <= hi + weekday) or step < 1:  # Weekday also accepts 7
+                raise ValueError(f"Cron field '{field}' is outside {lo}-{hi}")
+            values.update(range(start, end + 1, step))
+        return frozenset(v % 7 for v in values) if weekday else frozenset(values)
+
+    def _day_matches(self, dt):
+        day_ok = dt.day in self.days
+        weekday_ok = (dt.weekday() + 1) % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def matches(self, dt):
+        return (dt.month in self.months and self._day_matches(dt)
+                and dt.hour in self.hours and dt.minute in self.minutes)
+
+    def next_after(self, dt):
+        """The first firing strictly after dt."""
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(self.MAX_STEPS):
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron rule '{self.expression}' never fires")
+
+    def last_before(self, dt):
+        """The latest firing at or before dt."""
+        t = dt.replace(second=0, microsecond=0)
+        for _ in range(self.MAX_STEPS):
+            if t.month not in self.months:
+                t = t.replace(day=1, hour=0, minute=0) - timedelta(minutes=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) - timedelta(minutes=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) - timedelta(minutes=1)
+            elif t.minute not in self.minutes:
+                t -= timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron rule '{self.expression}' never fires")
+
+class JobLedger:
+    """Records one row per (job, period); a period with a 'done' row is never run again."""
+    def __init__(self, db_file=SCHEDULER_DB_FILE):
+        self.db_file = db_file
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+        self._import_flag_files()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            conn = self._local.conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _import_flag_files(self):
+        """Moves the old report_sent_<day>.flag files into the ledger."""
+        for path in glob.glob(os.path.join(os.path.dirname(self.db_file), "report_sent_*.flag")):
+            day = os.path.basename(path)[len("report_sent_"):-len(".flag")]
+            sent_at = os.path.getmtime(path)
+            with self._connection() as conn:
+                conn.execute("INSERT OR IGNORE INTO runs (job, period, status, started_at, finished_at) "
+                             "VALUES (?, ?, ?, ?, ?)", (DAILY_REPORT_JOB, day, STATUS_DONE, sent_at, sent_at))
+            os.remove(path)
+            logging.info(f"🗂️ Moved {os.path.basename(path)} into the job ledger.")
+
+    def claim(self, job, period, scheduled_for=None, now=None):
+        """
+        Marks (job, period) as running. Returns False if it already ran, is running,
+        or failed too often or too recently to retry yet.
+        """
+        now = time.time() if now is None else now
+        with self._connection() as conn:
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO runs (job, period, scheduled_for, status, started_at) VALUES (?, ?, ?, ?, ?)",
+                (job, period, scheduled_for, STATUS_RUNNING, now)).rowcount
+            if inserted:
+                return True
+            # Retry a failed run, or take over one whose process died
+            return conn.execute(
+                "UPDATE runs SET status = ?, attempts = attempts + 1, started_at = ?, finished_at = NULL "
+                "WHERE job = ? AND period = ? AND ((status = ? AND attempts < ? AND finished_at < ?) "
+                "OR (status = ? AND started_at < ?))",
+                (STATUS_RUNNING, now, job, period, STATUS_FAILED, MAX_ATTEMPTS, now - RETRY_SECONDS,
+                 STATUS_RUNNING, now - STALE_RUN_SECONDS)).rowcount > 0
+
+    def finish(self, job, period, error=None):
+        with self._connection() as conn:
+            conn.execute("UPDATE runs SET status = ?, finished_at = ?, error = ? WHERE job = ? AND period = ?",
+                         (STATUS_FAILED if error else STATUS_DONE, time.time(),
+                          str(error)[:500] if error else None, job, period))
+
+    def run(self, job, period, fn, *args, scheduled_for=None):
+        """Runs fn(*args) once for (job, period). Returns (ran, result)."""
+        if not self.claim(job, period, scheduled_for):
+            return False, None
+        started = time.perf_counter()
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.finish(job, period, error=e)
+            metrics.increment("jobs_failed")
+            raise
+        self.finish(job, period)
+        metrics.increment("jobs_run")
+        metrics.record_stage(f"job:{job}", (time.perf_counter() - started) * 1000)
+        return True, result
+
+    def has_run(self, job, period):
+        row = self._connection().execute("SELECT status FROM runs WHERE job = ? AND period = ?",
+                                         (job, period)).fetchone()
+        return row is not None and row["status"] == STATUS_DONE
+
+    def release(self, job, period):
+        """Forgets a period's run so it can run again (e.g. after resetting the day)."""
+        with self._connection() as conn:
+            return conn.execute("DELETE FROM runs WHERE job = ? AND period = ?", (job, period)).rowcount > 0
+
+    def recent(self, limit=20, job=None):
+        where, params = ("WHERE job = ?", [job]) if job else ("", [])
+        rows = self._connection().execute(
+            f"SELECT * FROM runs {where} ORDER BY started_at DESC LIMIT ?", params + [limit]).fetchall()
+        return [dict(row) for row in rows]
+
+class Job:
+    def __init__(self, name, rule, fn, period=None, catch_up=timedelta(days=1)):
+        """
+        fn(fire_time) does the work. period(fire_time) names what a firing is for;
+        firings with the same period share one ledger row (by default each firing
+        is its own period). Missed firings older than `catch_up` are dropped.
+        """
+        self.name = name
+        self.rule = rule if isinstance(rule, CronRule) else CronRule(rule)
+        self.fn = fn
+        self.period = period or (lambda fire: fire.strftime("%Y-%m-%d %H:%M"))
+        self.catch_up = catch_up
+
+class Scheduler:
+    def __init__(self, ledger=None, clock=datetime.now):
+        self.ledger = ledger or get_job_ledger()
+        self.clock = clock
+        self.jobs = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self.thread = None
+
+    def add(self, name, rule, fn, period=None, catch_up=timedelta(days=1)):
+        self.jobs[name] = Job(name, rule, fn, period, catch_up)
+        self._wake.set()
+        return self.jobs[name]
+
+    def due(self, now=None):
+        """The jobs whose latest firing has not run yet, as (job, fire_time, period)."""
+        now = now or self.clock()
+        due = []
+        for job in self.jobs.values():
+            # Only the latest firing counts: missed ones before it are coalesced into it
+            fire = job.rule.last_before(now)
+            if now - fire > job.catch_up:
+                continue
+            period = job.period(fire)
+            if not self.ledger.has_run(job.name, period):
+                due.append((job, fire, period))
+        return due
+
+    def run_pending(self, now=None):
+        """Runs every due job once, in this thread. Returns the number run."""
+        count = 0
+        for job, fire, period in self.due(now):
+            late = ((now or self.clock()) - fire).total_seconds()
+            if late > CHECK_SECONDS * 2:
+                logging.info(f"⏰ Catching up '{job.name}' for {period} ({late / 60:.0f} min late).")
+            try:
+                ran, _ = self.ledger.run(job.name, period, job.fn, fire, scheduled_for=fire.timestamp())
+            except Exception as e:
+                logging.error(f"❌ Job '{job.name}' for {period} failed: {e}", exc_info=True)
+                continue
+            count += ran
+        return count
+
+    def next_fire(self, now=None):
+        now = now or self.clock()
+        return min((job.rule.next_after(now) for job in self.jobs.values()), default=None)
+
+    # --- Background thread ---
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            next_fire = self.next_fire()
+            wait = CHECK_SECONDS
+            if next_fire is not None:
+                wait = min(wait, max(1.0, (next_fire - self.clock()).total_seconds()))
+            # Short waits with a wall-clock recheck: a monotonic wait does not
+            # advance while the machine sleeps
+            self._wake.wait(wait)
+            self._wake.clear()
+            metrics.wakeup("scheduler")
+
+# --- Report jobs ---
+def add_report_jobs(scheduler, daily=True, weekly=True, group_by="title"):
+    """Registers the daily and weekly report emails, one ledger period per day / week."""
+    def daily_report(fire):
+        from daily_report import build_and_send_daily_report
+        build_and_send_daily_report(fire.date(), group_by=group_by)
+
+    def weekly_report(fire):
+        from weekly_report import send_weekly_report
+        send_weekly_report(group_by=group_by, now=fire)
+
+    if daily:
+        scheduler.add(DAILY_REPORT_JOB, DAILY_REPORT_CRON, daily_report,
+                      period=lambda fire: fire.date().isoformat(), catch_up=timedelta(days=1))
+    if weekly:
+        # A Friday report is still wanted if the machine was off over the weekend
+        scheduler.add(WEEKLY_REPORT_JOB, WEEKLY_REPORT_CRON, weekly_report,
+                      period=lambda fire: fire.date().isoformat(), catch_up=timedelta(days=3))
+    return scheduler
+
+_ledger = None
+_ledger_lock = threading.Lock()
+
+def get_job_ledger():
+    """Returns the process-wide JobLedger."""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = JobLedger()
+        return _ledger
+
+def main():
+    for run in get_job_ledger().recent():
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["started_at"]))
+        error = f"  ({run['error']})" if run["error"] else ""
+        print(f"{run['job']:14s} {run['period']:16s} {run['status']:8s} attempts {run['attempts']}  "
+              f"started {started}{error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# tracker/timecodec.py
+"""
+Timestamp helpers for the event pipeline.
+
+Events carry integer epoch milliseconds ('start_ms' / 'end_ms') from the
+samplers through to the reports. Strings are only produced for display with
+format_ms(). Records written before this change stored "%Y-%m-%d %H:%M:%S"
+strings in 'start_time' / 'end_time'; those are read back with a fixed-format
+parser that is much cheaper than datetime.strptime.
+"""
+import time
+from datetime import datetime, date, timedelta
+from functools import lru_cache
+
+LEGACY_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# If the monotonic-derived clock and the wall clock disagree by more than this,
+# the anchor is reset (e.g. after sleep/hibernate or a manual clock change).
+RESYNC_THRESHOLD_MS = 2000
+
+_wall_anchor_ns = time.time_ns()
+_mono_anchor_ns = time.monotonic_ns()
+
+def now_ms():
+    """
+    Returns the current time as integer epoch milliseconds.
+    Derived from the monotonic clock so small wall-clock adjustments never make
+    an interval run backwards; re-anchored when the two clocks drift apart.
+    """
+    global _wall_anchor_ns, _mono_anchor_ns
+    mono_ns = time.monotonic_ns()
+    derived_ns = _wall_anchor_ns + (mono_ns - _mono_anchor_ns)
+    wall_ns = time.time_ns()
+    if abs(wall_ns - derived_ns) > RESYNC_THRESHOLD_MS * 1_000_000:
+        _wall_anchor_ns, _mono_anchor_ns = wall_ns, mono_ns
+        derived_ns = wall_ns
+    return derived_ns // 1_000_000
+
+@lru_cache(maxsize=4096)
+def _hour_start_ms(year, month, day, hour):
+    # mktime resolves the local UTC offset (including DST) once per hour bucket
+    return int(time.mktime((year, month, day, hour, 0, 0, 0, 0, -1))) * 1000
+
+def parse_legacy_ms(value):
+    """Parses a legacy "%Y-%m-%d %H:%M:%S" local-time string into epoch milliseconds."""
+    if (len(value) != 19 or value[4] != "-" or value[7] != "-" or value[10] != " "
+            or value[13] != ":" or value[16] != ":"):
+        raise ValueError(f"time data '{value}' does not match format '{LEGACY_FORMAT}'")
+    try:
+        year, month, day = int(value[0:4]), int(value[5:7]), int(value[8:10])
+        hour, minute, second = int(value[11:13]), int(value[14:16]), int(value[17:19])
+    except ValueError:
+        raise ValueError(f"time data '{value}' does not match format '{LEGACY_FORMAT}'")
+    if not (1 <= month <= 12 and 1 <= day <= 31 and hour < 24 and minute < 60 and second < 60):
+        raise ValueError(f"time data '{value}' is out of range")
+    return _hour_start_ms(year, month, day, hour) + (minute * 60 + second) * 1000
+
+def to_ms(value):
+    """Converts epoch milliseconds, a datetime or a legacy time string into epoch milliseconds."""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, str):
+        return parse_legacy_ms(value)
+    raise TypeError(f"Cannot convert {type(value).__name__} to a timestamp")
+
+def format_ms(ms, fmt=LEGACY_FORMAT):
+    """Formats epoch milliseconds as a local-time string for display."""
+    return datetime.fromtimestamp(ms / 1000).strftime(fmt)
+
+def to_datetime(ms):
+    return datetime.fromtimestamp(ms / 1000)
+
+def day_bounds_ms(day=None):
+    """Returns (start_ms, end_ms) of a local calendar day; defaults to today."""
+    if day is None:
+        day = date.today()
+    elif isinstance(day, datetime):
+        day = day.date()
+    start = datetime.combine(day, datetime.min.time())
+    return to_ms(start), to_ms(start + timedelta(days=1))
+
+def entry_start_ms(entry):
+    """Returns an entry's start in epoch milliseconds, or 0 if it has none."""
+    start = entry.get("start_ms")
+    if start is not None:
+        return start
+    try:
+        return parse_legacy_ms(entry.get("start_time", ""))
+    except ValueError:
+        return 0
+
+def entry_end_ms(entry):
+    """Returns an entry's end in epoch milliseconds, or 0 if it has none."""
+    end = entry.get("end_ms")
+    if end is not None:
+        return end
+    try:
+        return parse_legacy_ms(entry.get("end_time", ""))
+    except ValueError:
+        return 0
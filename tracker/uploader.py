@@ -0,0 +1,348 @@
+# tracker/uploader.py
+"""
+Ships this workstation's events to the team collector (collector/server.py).
+
+write_log() appends every new event to a durable local queue
+(logs/upload_queue.db). That is a local SQLite insert, so logging, sampling
+and the UI never wait on the network. An Uploader thread in the daemon drains
+the queue:
+- events go out in gzip-compressed batches, sent when MAX_BATCH_EVENTS or
+  MAX_BATCH_BYTES is reached or the oldest queued event is
+  MAX_BATCH_DELAY_SECONDS old;
+- every event has a stable id (a hash of its content and this agent), so a
+  batch that is resent after a lost reply is deduplicated by the collector;
+- events leave the queue only when the collector acknowledged them, so after
+  a restart, sleep or network loss uploading resumes from the last
+  acknowledged event, with exponential backoff while the collector is
+  unreachable;
+- the queue is capped at MAX_QUEUE_BYTES (the oldest events are dropped
+  first) and uploads at MAX_UPLOAD_BYTES_PER_SECOND.
+
+Uploading is off unless COLLECTOR_URL is set in config.py.
+
+    python -m tracker.uploader              # queue status
+    python -m tracker.uploader --flush      # send everything queued now
+    python -m tracker.uploader --backfill   # queue the whole existing activity log
+"""
+import getpass
+import gzip
+import hashlib
+import http.client
+import json
+import logging
+import os
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import config
+from tracker.instrumentation import metrics
+
+UPLOAD_QUEUE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs",
+                                 "upload_queue.db")
+COLLECTOR_URL = getattr(config, "COLLECTOR_URL", None)      # e.g. "http://collector.local:8787"
+COLLECTOR_TOKEN = getattr(config, "COLLECTOR_TOKEN", None)
+COLLECTOR_USER = getattr(config, "COLLECTOR_USER", None) or getpass.getuser()
+AGENT_ID = getattr(config, "AGENT_ID", None) or socket.gethostname()
+
+MAX_BATCH_EVENTS = 500
+MAX_BATCH_BYTES = 256 * 1024            # Uncompressed JSON per batch
+MAX_BATCH_DELAY_SECONDS = 60            # Send a partial batch once its oldest event has waited this long
+MAX_QUEUE_BYTES = 50 * 1024 * 1024      # Disk cap; the oldest events are dropped beyond it
+MAX_UPLOAD_BYTES_PER_SECOND = 64 * 1024  # Compressed bytes on the wire
+CHECK_SECONDS = 5
+REQUEST_TIMEOUT = 30
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 15 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    queued_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+def stable_event_id(entry, agent=AGENT_ID):
+    """The same event always gets the same id, however often it is queued or sent."""
+    key = "|".join(str(entry.get(field, "")) for field in ("event", "start_ms", "end_ms", "title", "process_name"))
+    return hashlib.sha1(f"{agent}|{key}".encode("utf-8")).hexdigest()[:24]
+
+def tz_offset_minutes():
+    return (time.localtime().tm_gmtoff or 0) // 60
+
+class UploadQueue:
+    """Durable FIFO of events waiting for the collector's acknowledgement."""
+    def __init__(self, db_file=UPLOAD_QUEUE_FILE, max_bytes=MAX_QUEUE_BYTES, agent=AGENT_ID):
+        self.db_file = db_file
+        self.max_bytes = max_bytes
+        self.agent = agent
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(SCHEMA)
+            # Sequence numbers restart if this file is recreated; the id keeps batch ids from repeating
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('queue_id', ?)", (uuid.uuid4().hex[:12],))
+            self.queue_id = self._meta(conn, "queue_id")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_file) or ".", exist_ok=True)
+            conn = self._local.conn = sqlite3.connect(self.db_file, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _meta(self, conn, key, default=None):
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def append(self, entries):
+        """Queues log entries (dicts as written to the activity log). Returns how many were queued."""
+        rows = []
+        for entry in entries:
+            if entry.get("start_ms") is None:
+                continue  # The collector needs a start time
+            event = dict(entry, id=stable_event_id(entry, self.agent))
+            payload = json.dumps(event, separators=(",", ":"))
+            rows.append((event["id"], payload, len(payload), time.time()))
+        if not rows:
+            return 0
+        with self._connection() as conn:
+            conn.executemany("INSERT INTO queue (event_id, payload, size, queued_at) VALUES (?, ?, ?, ?)", rows)
+        metrics.increment("upload_queued", len(rows))
+        self._enforce_cap()
+        return len(rows)
+
+    def _enforce_cap(self):
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM queue").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop the oldest events, down to 90% of the cap so this does not run on every append
+        excess = total - int(self.max_bytes * 0.9)
+        with conn:
+            cutoff = conn.execute(
+                "SELECT seq FROM (SELECT seq, SUM(size) OVER (ORDER BY seq) AS running FROM queue) "
+                "WHERE running >= ? LIMIT 1", (excess,)).fetchone()[0]
+            dropped = conn.execute("DELETE FROM queue WHERE seq <= ?", (cutoff,)).rowcount
+        metrics.increment("upload_dropped", dropped)
+        logging.warning(f"⚠️ Upload queue over {self.max_bytes} bytes; dropped the {dropped} oldest events.")
+
+    def peek(self, max_events=MAX_BATCH_EVENTS, max_bytes=MAX_BATCH_BYTES):
+        """The oldest queued events, up to a batch's limits, as (first_seq, last_seq, [payload...])."""
+        rows = self._connection().execute(
+            "SELECT seq, payload, size FROM queue ORDER BY seq LIMIT ?", (max_events,)).fetchall()
+        payloads, size, last = [], 0, None
+        for seq, payload, row_size in rows:
+            if payloads and size + row_size > max_bytes:
+                break
+            payloads.append(payload)
+            size += row_size
+            last = seq
+        return (rows[0][0], last, payloads) if payloads else (None, None, [])
+
+    def ack(self, last_seq):
+        """Removes everything up to last_seq: the collector has stored it."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM queue WHERE seq <= ?", (last_seq,))
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('acked_seq', ?)", (str(last_seq),))
+
+    def status(self):
+        conn = self._connection()
+        count, size, oldest = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), MIN(queued_at) FROM queue").fetchone()
+        return {"queued": count, "bytes": size, "oldest_queued_at": oldest,
+                "acked_seq": int(self._meta(conn, "acked_seq", 0))}
+
+class RateLimiter:
+    """Token bucket: take(n) sleeps until n bytes may be sent."""
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def take(self, amount, stop_event=None):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # A batch larger than the burst may go once the bucket is full
+            if self.tokens >= min(amount, self.capacity):
+                self.tokens -= amount
+                return True
+            wait = (min(amount, self.capacity) - self.tokens) / self.rate
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+class UploadError(Exception):
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+class Uploader:
+    """Sends the queue to the collector in a background thread."""
+    def __init__(self, queue=None, url=COLLECTOR_URL, user=COLLECTOR_USER, token=COLLECTOR_TOKEN,
+                 bytes_per_second=MAX_UPLOAD_BYTES_PER_SECOND):
+        self.queue = queue or get_upload_queue()
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.netloc = parts.netloc
+        self.path = (parts.path.rstrip("/") or "") + "/v1/events"
+        self.user = user
+        self.token = token
+        self.limiter = RateLimiter(bytes_per_second)
+        self.failures = 0
+        self._conn = None
+        self._stop = threading.Event()
+        self.thread = None
+
+    def _post(self, body):
+        """POSTs one compressed batch over a kept-alive connection and returns the decoded reply."""
+        headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in (1, 2):
+            if self._conn is None:
+                cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+                self._conn = cls(self.netloc, timeout=REQUEST_TIMEOUT)
+            try:
+                self._conn.request("POST", self.path, body, headers)
+                response = self._conn.getresponse()
+                reply = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                if attempt == 2 or not isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError,
+                                                      ConnectionResetError)):
+                    raise UploadError(f"Collector unreachable: {e}")
+                continue  # The server closed an idle kept-alive connection; retry once on a new one
+            if response.status == 200:
+                return json.loads(reply)
+            if response.will_close:
+                self.close()
+            permanent = 400 <= response.status < 500 and response.status not in (401, 408, 429)
+            raise UploadError(f"Collector answered {response.status}: {reply[:200]!r}", permanent)
+
+    def send_batch(self):
+        """
+        Sends the next batch. Returns (events sent, events rejected); both are 0 if
+        the queue is empty. Rejected events were dropped from the queue.
+        """
+        first, last, payloads = self.queue.peek()
+        if not payloads:
+            return 0, 0
+        batch = ('{"user":%s,"agent":%s,"batch_id":%s,"tz_offset_minutes":%d,"events":[%s]}' % (
+            json.dumps(self.user), json.dumps(self.queue.agent),
+            json.dumps(f"{self.queue.agent}:{self.queue.queue_id}:{first}-{last}"), tz_offset_minutes(), ",".join(payloads)))
+        body = gzip.compress(batch.encode("utf-8"), compresslevel=6)
+        if not self.limiter.take(len(body), self._stop):
+            return 0, 0
+        started = time.perf_counter()
+        try:
+            reply = self._post(body)
+        except UploadError as e:
+            if not e.permanent:
+                raise
+            # The collector will never take this batch; skip it rather than block the queue behind it
+            logging.error(f"❌ Collector rejected events {first}-{last}; dropping them: {e}")
+            metrics.increment("upload_rejected", len(payloads))
+            self.queue.ack(last)
+            return 0, len(payloads)
+        self.queue.ack(last)
+        metrics.record_stage("upload", (time.perf_counter() - started) * 1000)
+        metrics.increment("upload_sent", len(payloads))
+        metrics.increment("upload_bytes", len(body))
+        logging.debug(f"📤 Uploaded {len(payloads)} events ({len(body)} bytes, {reply.get('accepted')} new).")
+        return len(payloads), 0
+
+    def batch_due(self):
+        status = self.queue.status()
+        if not status["queued"]:
+            return False
+        return (status["queued"] >= MAX_BATCH_EVENTS or status["bytes"] >= MAX_BATCH_BYTES
+                or time.time() - status["oldest_queued_at"] >= MAX_BATCH_DELAY_SECONDS)
+
+    def flush(self):
+        """Sends everything queued now. Returns (events sent, events rejected)."""
+        sent = rejected = 0
+        while not self._stop.is_set():
+            batch_sent, batch_rejected = self.send_batch()
+            if not batch_sent and not batch_rejected:
+                break  # The queue is empty
+            sent += batch_sent
+            rejected += batch_rejected
+        return sent, rejected
+
+    # --- Background thread ---
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="uploader", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            wait = CHECK_SECONDS
+            try:
+                while self.batch_due() and not self._stop.is_set():
+                    self.send_batch()
+                self.failures = 0
+            except UploadError as e:
+                self.failures += 1
+                wait = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** (self.failures - 1))
+                wait *= random.uniform(0.8, 1.2)
+                logging.warning(f"⚠️ Upload failed ({e}); retrying in {wait:.0f} s.")
+            except Exception as e:
+                logging.error(f"❌ Uploader error: {e}", exc_info=True)
+            self._stop.wait(wait)
+        self.close()
+
+_queue = None
+_queue_lock = threading.Lock()
+
+def get_upload_queue():
+    """Returns the process-wide UploadQueue, or None if uploading is not configured."""
+    global _queue
+    if not COLLECTOR_URL:
+        return None
+    with _queue_lock:
+        if _queue is None:
+            _queue = UploadQueue()
+        return _queue
+
+def main():
+    queue = UploadQueue()
+    if "--backfill" in sys.argv:
+        from tracker.data_service import STRUCTURED_LOG_FILE
+        with open(STRUCTURED_LOG_FILE, "r") as f:
+            print(f"queued {queue.append(json.load(f))} events")
+    if "--flush" in sys.argv:
+        if not COLLECTOR_URL:
+            print("Set COLLECTOR_URL in config.py to upload.")
+            sys.exit(1)
+        sent, rejected = Uploader(queue).flush()
+        print(f"sent {sent} events" + (f", {rejected} rejected by the collector" if rejected else ""))
+    print(queue.status())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# tracker/weather.py
+"""
+Shared weather service for all UI surfaces.
+
+get_temp() never blocks: it serves the last known temperature (from memory,
+or from an on-disk cache shared by every tracker process) and, once that
+value is older than the TTL, starts a single background refresh
+(stale-while-revalidate). Requests go through one pooled requests.Session.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+import config
+
+API_URL = "https://api.openweathermap.org/data/2.5/weather"
+WEATHER_CACHE_FILE = os.path.join("logs", "weather_cache.json")
+WEATHER_TTL_SECONDS = 5 * 60
+RETRY_AFTER_SECONDS = 60  # Minimum gap between attempts after a failed fetch
+REQUEST_TIMEOUT = 5
+
+class WeatherService:
+    def __init__(self, api_key=None, city=None, base_url=API_URL, cache_file=WEATHER_CACHE_FILE,
+                 ttl_seconds=WEATHER_TTL_SECONDS, timeout=REQUEST_TIMEOUT):
+        self.api_key = api_key if api_key is not None else config.OPENWEATHER_API_KEY
+        self.city = city if city is not None else config.WEATHER_CITY
+        self.base_url = base_url
+        self.cache_file = cache_file
+        self.ttl_seconds = ttl_seconds
+        self.timeout = timeout
+        self.session = requests.Session()
+
+        self._lock = threading.Lock()
+        self._temp = None
+        self._fetched_at = 0.0        # Epoch seconds of the value in memory
+        self._cache_mtime = None      # mtime of the cache file last loaded
+        self._last_failure = 0.0
+        self._refreshing = False
+        self._listeners = []
+
+    @property
+    def configured(self):
+        return bool(self.api_key) and "YOUR_API_KEY" not in self.api_key
+
+    def subscribe(self, callback):
+        """Registers callback(temp), called from the fetch thread after each successful refresh."""
+        self._listeners.append(callback)
+
+    def get_temp(self):
+        """Returns the latest known temperature (possibly stale) or None. Never blocks on the network."""
+        if not self.configured:
+            return None
+        now = time.time()
+        if now - self._fetched_at >= self.ttl_seconds:
+            # Another process may already have refreshed the shared cache
+            self._load_disk_cache()
+            if now - self._fetched_at >= self.ttl_seconds:
+                self._start_refresh(now)
+        return self._temp
+
+    def get_text(self):
+        temp = self.get_temp()
+        return f"{temp}°C" if temp is not None else "--°C"
+
+    def refresh(self):
+        """Fetches the weather synchronously, updates both caches and returns the temperature."""
+        url = f"{self.base_url}?q={self.city}&appid={self.api_key}&units=metric"
+        try:
+            resp = self.session.get(url, timeout=self.timeout)
+            resp.raise_for_status()  # Raises an HTTPError for bad responses (4xx or 5xx)
+            temp = resp.json().get('main', {}).get('temp')
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logging.warning(f"⚠️ Error fetching weather: {e}")
+            temp = None
+        if temp is None:
+            # Keep serving the stale value; retry after RETRY_AFTER_SECONDS
+            self._last_failure = time.time()
+            return self._temp
+
+        with self._lock:
+            self._temp = temp
+            self._fetched_at = time.time()
+        self._save_disk_cache()
+        for callback in list(self._listeners):
+            try:
+                callback(temp)
+            except Exception as e:
+                logging.warning(f"⚠️ Weather listener failed: {e}")
+        return temp
+
+    def _start_refresh(self, now):
+        with self._lock:
+            if self._refreshing or now - self._last_failure < RETRY_AFTER_SECONDS:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh_in_background, name="weather-fetch", daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _load_disk_cache(self):
+        try:
+            mtime = os.stat(self.cache_file).st_mtime
+        except OSError:
+            return
+        if mtime == self._cache_mtime:
+            return
+        try:
+            with open(self.cache_file, "r") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        self._cache_mtime = mtime
+        if data.get("city") != self.city:
+            return
+        with self._lock:
+            if data.get("fetched_at", 0) > self._fetched_at:
+                self._temp = data.get("temp")
+                self._fetched_at = data["fetched_at"]
+
+    def _save_disk_cache(self):
+        data = {"city": self.city, "temp": self._temp, "fetched_at": self._fetched_at}
+        tmp_file = f"{self.cache_file}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+            with open(tmp_file, "w") as f:
+                json.dump(data, f)
+            # Atomic replace so other processes never read a half-written cache
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            logging.warning(f"⚠️ Could not write weather cache: {e}")
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_weather_service():
+    """Returns the process-wide WeatherService."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = WeatherService()
+        return _service
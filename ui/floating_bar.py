@@ -1,16 +1,18 @@
 import sys
+import time
 import getpass
-import requests
 from datetime import datetime, timedelta
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import QApplication, QLabel, QHBoxLayout, QVBoxLayout, QWidget
 
-# Use system_login_fetcher to get correct login time
+# Make the project root importable for the tracker package
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-import config
-from tracker.system_login_fetcher import get_latest_login_time
+from tracker.weather import get_weather_service
+from tracker.daemon_client import get_daemon_client
+from tracker.power import aligned_delay_ms
+from ui.view_model import ViewModel, workday_view
 
 class WorkTrackerBar(QWidget):
     def __init__(self):
@@ -20,26 +22,13 @@ class WorkTrackerBar(QWidget):
         self.setStyleSheet("background-color: #1e1e1e; border-radius: 14px; padding: 10px;")
         self.resize(950, 75)
 
-        # Read login time from logs/login_time.json
-        login_json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs", "login_time.json")
-        login_time = None
-        if os.path.exists(login_json_path):
-            try:
-                import json
-                with open(login_json_path, "r") as f:
-                    data = json.load(f)
-                    login_time_str = data.get("login_time")
-                    if login_time_str:
-                        login_time = datetime.strptime(login_time_str, "%Y-%m-%d %H:%M:%S")
-            except Exception as e:
-                print(f"Error reading login_time.json: {e}")
-        if login_time is None:
-            self.login_time = datetime.now().replace(microsecond=0)
-        else:
-            self.login_time = login_time.replace(microsecond=0)
-        self.logout_time = self.login_time + timedelta(hours=9)
+        # Login time and totals are pushed by the tracker daemon
+        self.stats = get_daemon_client()
+        self.stats.wait_until_ready()
+        self.apply_login_time(self.stats.login_time)
 
         self.init_ui()
+        self.stats.subscribe(self.on_stats_changed)
         self.start_timer()
 
     def init_ui(self):
@@ -86,45 +75,46 @@ class WorkTrackerBar(QWidget):
 
         self.move(300, 20)
 
+    def apply_login_time(self, login_time):
+        if login_time is None:
+            self.login_time = datetime.now().replace(microsecond=0)
+        else:
+            self.login_time = login_time.replace(microsecond=0)
+        self.logout_time = self.login_time + timedelta(hours=9)
+
+    def on_stats_changed(self, stats):
+        """Called by the stats service when the login file or totals change."""
+        if stats["login_time"] is not None and stats["login_time"].replace(microsecond=0) != self.login_time:
+            self.apply_login_time(stats["login_time"])
+            self.login_label.setText(f"🔓 Login: {self.login_time.strftime('%I:%M %p')}")
+            self.logout_label.setText(f"🔒 Logout: {self.logout_time.strftime('%I:%M %p')}")
+
     def start_timer(self):
+        # Widgets are only touched when their displayed value changes
+        self.view = ViewModel()
+        self.view.bind("weather", self.weather_label.setText)
+        self.view.bind("clock", self.clock_label.setText)
+        self.view.bind("remaining", lambda remaining: self.countdown_label.setText(
+            f"⏳ {remaining}" if remaining else "✅ 9 Hours Completed"))
         self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setTimerType(Qt.PreciseTimer)
         self.timer.timeout.connect(self.update_info)
-        self.timer.start(1000)
         self.update_info()
 
-    def get_weather(self):
-        """Get weather for the configured city."""
-        if not config.OPENWEATHER_API_KEY or "YOUR_API_KEY" in config.OPENWEATHER_API_KEY:
-            print("⚠️ Weather API key not set in config.py. Skipping weather fetch.")
-            return "🌤️ --°C"
-        
-        url = f"https://api.openweathermap.org/data/2.5/weather?q={config.WEATHER_CITY}&appid={config.OPENWEATHER_API_KEY}&units=metric"
-        
-        try:
-            resp = requests.get(url, timeout=5)
-            resp.raise_for_status()
-            data = resp.json()
-            temp = data.get('main', {}).get('temp')
-            if temp is not None:
-                return f"🌤️ {temp}°C"
-        except requests.exceptions.RequestException as e:
-            print(f"⚠️ Error fetching weather: {e}")
-        return "🌤️ --°C"
-
     def update_info(self):
-        now = datetime.now()
-        remaining = self.logout_time - now
-
-        # Update weather every 5 minutes
-        if not hasattr(self, 'last_weather_update') or (now - self.last_weather_update).total_seconds() > 300:
-            self.weather_label.setText(self.get_weather())
-            self.last_weather_update = now
-
-        self.clock_label.setText(f"🕒 {now.strftime('%I:%M:%S %p')}")
-        if remaining.total_seconds() > 0:
-            self.countdown_label.setText(f"⏳ {str(remaining).split('.')[0]}")
-        else:
-            self.countdown_label.setText("✅ 9 Hours Completed")
+        # Delivers the daemon's latest push, if any, to on_stats_changed
+        self.stats.poll()
+        now = time.time()
+        view = workday_view(self.login_time, self.logout_time, now)
+        self.view.update(
+            # Served from the shared cache; a stale value triggers a background refresh
+            weather=f"🌤️ {get_weather_service().get_text()}",
+            clock=f"🕒 {datetime.fromtimestamp(round(now)).strftime('%I:%M:%S %p')}",
+            remaining=view["remaining"],
+        )
+        # Armed on the next second boundary so the clock and countdown do not drift
+        self.timer.start(aligned_delay_ms(1000))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,247 @@
+# ui/history_browser.py
+"""
+History browser for past activity.
+
+A virtualized Tk Treeview: it owns only as many rows as fit on screen and
+refills them as the user scrolls. Rows come from an EventPager, which asks
+the event store for one page of the filtered, sorted date range at a time and
+keeps a few pages around the visible window (the prefetch margin) in a small
+LRU cache. Memory stays flat no matter how many events the range holds, and
+filtering and sorting are done by the store.
+
+Opened from the tray menu ('History'), or standalone with:
+    python -m ui.history_browser
+"""
+import sys
+import os
+import tkinter as tk
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from tkinter import ttk
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from tracker.event_store import get_event_store
+from tracker.timecodec import day_bounds_ms, format_ms
+
+PAGE_SIZE = 100
+PREFETCH_PAGES = 1     # Pages kept ready on each side of the visible window
+MAX_CACHED_PAGES = 8
+VISIBLE_ROWS = 20
+DEFAULT_RANGE_DAYS = 30
+DATE_FORMAT = "%Y-%m-%d"
+
+# (sort key in the store, heading, width)
+COLUMNS = (
+    ("start", "Start", 150),
+    ("duration", "Duration", 80),
+    ("event", "Event", 100),
+    ("title", "Title", 340),
+    ("process", "Process", 130),
+)
+
+def format_duration(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+class EventPager:
+    """Serves rows of one store query from an LRU cache of pages."""
+    def __init__(self, store, start_ms, end_ms, event=None, search=None, sort="start", descending=True,
+                 page_size=PAGE_SIZE, prefetch_pages=PREFETCH_PAGES, max_pages=MAX_CACHED_PAGES):
+        self.store = store
+        self.query = {"event": event, "search": search}
+        self.range = (start_ms, end_ms)
+        self.sort = {"sort": sort, "descending": descending}
+        self.page_size = page_size
+        self.prefetch_pages = prefetch_pages
+        self.max_pages = max(max_pages, 2 * prefetch_pages + 2)
+        self.total = store.count(start_ms, end_ms, **self.query)
+        self.fetches = 0
+        self._pages = OrderedDict()
+
+    def _page(self, index):
+        page = self._pages.get(index)
+        if page is None:
+            # Seek from a cached neighbour when there is one; OFFSET only for jumps
+            seek = {}
+            previous, following = self._pages.get(index - 1), self._pages.get(index + 1)
+            if previous:
+                seek["after"] = self.store.sort_key(previous[-1], self.sort["sort"])
+            elif following:
+                seek["before"] = self.store.sort_key(following[0], self.sort["sort"])
+            page = self.store.page(*self.range, index * self.page_size, self.page_size,
+                                   **self.query, **self.sort, **seek)
+            self.fetches += 1
+            self._pages[index] = page
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.move_to_end(index)
+        return page
+
+    def rows(self, offset, count):
+        """Returns the rows [offset, offset + count), loading neighbouring pages ahead of time."""
+        if self.total == 0 or count <= 0:
+            return []
+        end = min(offset + count, self.total)
+        first, last = offset // self.page_size, (end - 1) // self.page_size
+        last_page = (self.total - 1) // self.page_size
+        for index in range(max(0, first - self.prefetch_pages), min(last_page, last + self.prefetch_pages) + 1):
+            self._page(index)
+        rows = []
+        for index in range(first, last + 1):
+            page = self._page(index)
+            lo = max(offset - index * self.page_size, 0)
+            hi = end - index * self.page_size
+            rows.extend(page[lo:hi])
+        return rows
+
+class HistoryBrowser:
+    def __init__(self, master, store=None, dispatcher=None):
+        self.store = store or get_event_store()
+        self.dispatcher = dispatcher
+        self.window = tk.Toplevel(master)
+        self.window.title("Activity History")
+        self.window.configure(bg="#23272e")
+        self.pager = None
+        self.offset = 0
+        self.sort = "start"
+        self.descending = True
+
+        self._build_filters()
+        self._build_table()
+        self.status_label = tk.Label(self.window, text="Loading...", anchor="w", fg="#fff", bg="#23272e")
+        self.status_label.pack(fill="x", padx=8, pady=(0, 6))
+
+        if self.dispatcher is not None:
+            # Indexing new log entries reads the JSON log; keep it off the Tk thread
+            self.dispatcher.run_io(self.store.sync, name="index-events", on_done=lambda added: self.apply_filters())
+        else:
+            self.store.sync()
+            self.apply_filters()
+
+    def _build_filters(self):
+        bar = tk.Frame(self.window, bg="#23272e")
+        bar.pack(fill="x", padx=8, pady=6)
+        today = date.today()
+        self.from_var = tk.StringVar(value=(today - timedelta(days=DEFAULT_RANGE_DAYS)).strftime(DATE_FORMAT))
+        self.to_var = tk.StringVar(value=today.strftime(DATE_FORMAT))
+        self.event_var = tk.StringVar(value="All")
+        self.search_var = tk.StringVar()
+
+        for label, var, width in (("From", self.from_var, 11), ("To", self.to_var, 11)):
+            tk.Label(bar, text=label, fg="#fff", bg="#23272e").pack(side=tk.LEFT)
+            entry = tk.Entry(bar, textvariable=var, width=width)
+            entry.pack(side=tk.LEFT, padx=(2, 8))
+            entry.bind("<Return>", lambda e: self.apply_filters())
+        tk.Label(bar, text="Event", fg="#fff", bg="#23272e").pack(side=tk.LEFT)
+        self.event_combo = ttk.Combobox(bar, textvariable=self.event_var, values=["All"], state="readonly", width=12)
+        self.event_combo.pack(side=tk.LEFT, padx=(2, 8))
+        self.event_combo.bind("<<ComboboxSelected>>", lambda e: self.apply_filters())
+        tk.Label(bar, text="Search", fg="#fff", bg="#23272e").pack(side=tk.LEFT)
+        search = tk.Entry(bar, textvariable=self.search_var, width=20)
+        search.pack(side=tk.LEFT, padx=(2, 8))
+        search.bind("<Return>", lambda e: self.apply_filters())
+        tk.Button(bar, text="Apply", command=self.apply_filters).pack(side=tk.LEFT)
+
+    def _build_table(self):
+        frame = tk.Frame(self.window, bg="#23272e")
+        frame.pack(fill="both", expand=True, padx=8)
+        self.tree = ttk.Treeview(frame, columns=[c[0] for c in COLUMNS], show="headings",
+                                 height=VISIBLE_ROWS, selectmode="browse")
+        for key, heading, width in COLUMNS:
+            self.tree.heading(key, text=heading, command=lambda k=key: self.sort_by(k))
+            self.tree.column(key, width=width, anchor="w", stretch=(key == "title"))
+        # A fixed set of row items; scrolling rewrites their values instead of adding rows
+        self.items = [self.tree.insert("", "end", values=()) for _ in range(VISIBLE_ROWS)]
+        self.scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self.on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+
+        for widget in (self.tree, self.scrollbar):
+            widget.bind("<MouseWheel>", lambda e: self.scroll_by(-int(e.delta / 120) * 3))
+            widget.bind("<Button-4>", lambda e: self.scroll_by(-3))
+            widget.bind("<Button-5>", lambda e: self.scroll_by(3))
+        self.tree.bind("<Prior>", lambda e: self.scroll_by(-VISIBLE_ROWS) or "break")
+        self.tree.bind("<Next>", lambda e: self.scroll_by(VISIBLE_ROWS) or "break")
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0) or "break")
+        self.tree.bind("<End>", lambda e: self.scroll_to(self._max_offset()) or "break")
+
+    # --- Querying ---
+    def _date_range_ms(self):
+        start_day = datetime.strptime(self.from_var.get().strip(), DATE_FORMAT)
+        end_day = datetime.strptime(self.to_var.get().strip(), DATE_FORMAT)
+        return day_bounds_ms(start_day)[0], day_bounds_ms(end_day)[1]
+
+    def apply_filters(self):
+        """Re-runs the query with the current filters and sort, from the top."""
+        try:
+            start_ms, end_ms = self._date_range_ms()
+        except ValueError:
+            self.status_label.config(text=f"Dates must look like {date.today().strftime(DATE_FORMAT)}")
+            return
+        event = self.event_var.get()
+        self.event_combo["values"] = ["All"] + self.store.event_types()
+        self.pager = EventPager(self.store, start_ms, end_ms,
+                                event=None if event == "All" else event,
+                                search=self.search_var.get().strip() or None,
+                                sort=self.sort, descending=self.descending)
+        self.scroll_to(0)
+
+    def sort_by(self, key):
+        if self.sort == key:
+            self.descending = not self.descending
+        else:
+            self.sort, self.descending = key, key in ("start", "duration")
+        for column, heading, _ in COLUMNS:
+            arrow = (" ▼" if self.descending else " ▲") if column == self.sort else ""
+            self.tree.heading(column, text=heading + arrow)
+        self.apply_filters()
+
+    # --- Scrolling ---
+    def _max_offset(self):
+        return max(0, self.pager.total - VISIBLE_ROWS) if self.pager else 0
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * (self.pager.total if self.pager else 0)))
+        elif action == "scroll":
+            step = VISIBLE_ROWS if unit == "pages" else 1
+            self.scroll_by(int(amount) * step)
+
+    def scroll_by(self, rows):
+        self.scroll_to(self.offset + rows)
+
+    def scroll_to(self, offset):
+        self.offset = min(max(0, offset), self._max_offset())
+        self.render()
+
+    def render(self):
+        if self.pager is None:
+            return
+        rows = self.pager.rows(self.offset, VISIBLE_ROWS)
+        for item, row in zip(self.items, rows + [None] * (VISIBLE_ROWS - len(rows))):
+            if row is None:
+                self.tree.item(item, values=())
+            else:
+                self.tree.item(item, values=(
+                    format_ms(row["start_ms"]),
+                    format_duration(row["duration_seconds"]),
+                    row["event"],
+                    row["title"] or "",
+                    row["process_name"] or "",
+                ))
+        total = self.pager.total
+        if total:
+            self.scrollbar.set(self.offset / total, min(1.0, (self.offset + VISIBLE_ROWS) / total))
+            self.status_label.config(text=f"{total:,} events | showing {self.offset + 1:,}–{self.offset + len(rows):,}")
+        else:
+            self.scrollbar.set(0, 1)
+            self.status_label.config(text="No events in this range")
+
+if __name__ == "__main__":
+    root = tk.Tk()
+    root.withdraw()
+    browser = HistoryBrowser(root)
+    browser.window.protocol("WM_DELETE_WINDOW", root.destroy)
+    root.mainloop()
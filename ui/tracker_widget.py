@@ -6,8 +6,7 @@ import sys
 import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from tracker.log_writer import get_or_create_daily_login_time
-from tracker.system_login_fetcher import get_latest_login_time
+from tracker.daemon_client import get_daemon_client
 
 class WorkTrackerWidget:
     def __init__(self):
@@ -18,9 +17,10 @@ class WorkTrackerWidget:
         self.root.resizable(False, False)
         self.root.configure(bg="#f9f9f9")
 
-        # Get consistent login time from file
-        #self.login_time = get_or_create_daily_login_time()
-        self.login_time = get_latest_login_time()
+        # Login time comes from the tracker daemon; fall back to now if none was captured yet
+        self.stats = get_daemon_client()
+        self.stats.wait_until_ready()
+        self.login_time = self.stats.login_time or datetime.now()
         self.logout_time = self.login_time + timedelta(hours=9)
 
         self.login_label = tk.Label(self.root, text=f"Login Time: {self.login_time.strftime('%I:%M:%S %p')}", font=("Arial", 12), bg="#f9f9f9")
@@ -31,11 +31,20 @@ class WorkTrackerWidget:
         self.logout_label.pack(pady=5)
         self.timer_label.pack(pady=5)
 
+        self.stats.subscribe(self.on_stats_changed)
         self.update_countdown()
         self.root.protocol("WM_DELETE_WINDOW", self.hide_window)
         self.root.mainloop()
 
+    def on_stats_changed(self, stats):
+        if stats["login_time"] is not None and stats["login_time"] != self.login_time:
+            self.login_time = stats["login_time"]
+            self.logout_time = self.login_time + timedelta(hours=9)
+            self.login_label.config(text=f"Login Time: {self.login_time.strftime('%I:%M:%S %p')}")
+            self.logout_label.config(text=f"Logout Time: {self.logout_time.strftime('%I:%M:%S %p')}")
+
     def update_countdown(self):
+        self.stats.poll()
         now = datetime.now()
         remaining = self.logout_time - now
         if remaining.total_seconds() > 0:
@@ -0,0 +1,75 @@
+# ui/view_model.py
+"""
+Change-aware rendering for the countdown and progress widgets.
+
+The UIs compute their display values once per tick (workday_view), and a
+ViewModel compares them with what is already on screen and calls a widget's
+setter only when its value changed. A countdown tick therefore costs one
+label update, and the progress bar is touched only when the rounded
+percentage moves. Ticks are meant to be armed on the wall-clock second
+boundary (tracker.power.aligned_delay_ms); the view rounds "now" to the
+nearest second so a timer that fires a few ms early or late still shows the
+right second and never skips or repeats one.
+"""
+import time
+
+PROGRESS_STEP = 0.1  # Percent; finer changes are not visible on the bar
+
+_UNSET = object()
+
+def format_remaining(seconds):
+    """Formats a positive number of seconds as H:MM:SS (the same text str(timedelta) gives)."""
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}"
+
+def workday_view(login_time, logout_time, now=None):
+    """
+    Returns the display values for a workday:
+    progress (percent, rounded to PROGRESS_STEP) and remaining ("H:MM:SS", or None once complete).
+    """
+    now_s = round(time.time() if now is None else now)
+    login_s = login_time.timestamp()
+    logout_s = logout_time.timestamp()
+    total = logout_s - login_s
+    if total > 0:
+        percent = min(100.0, max(0.0, (now_s - login_s) / total * 100))
+        progress = round(round(percent / PROGRESS_STEP) * PROGRESS_STEP, 1)
+    else:
+        progress = 0.0
+    remaining = int(logout_s - now_s)
+    return {
+        "progress": progress,
+        "remaining": format_remaining(remaining) if remaining > 0 else None,
+    }
+
+class ViewModel:
+    """Remembers the last value pushed to each bound widget and pushes only changes."""
+    def __init__(self):
+        self._setters = {}
+        self._shown = {}
+        self.pushes = 0
+        self.skips = 0
+
+    def bind(self, name, setter):
+        """Binds a value name to setter(value), e.g. lambda text: label.config(text=text)."""
+        self._setters[name] = setter
+        self._shown[name] = _UNSET
+
+    def update(self, **values):
+        """Pushes the values that differ from what is on screen. Returns the number pushed."""
+        pushed = 0
+        for name, value in values.items():
+            if self._shown.get(name, _UNSET) == value:
+                self.skips += 1
+                continue
+            self._setters[name](value)
+            self._shown[name] = value
+            pushed += 1
+        self.pushes += pushed
+        return pushed
+
+    def invalidate(self, name=None):
+        """Forces the next update to push `name` (or every value) again."""
+        for key in ([name] if name else list(self._shown)):
+            self._shown[key] = _UNSET
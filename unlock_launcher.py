@@ -0,0 +1,82 @@
+"""
+Minimal launcher for the 'Show on Unlock' trigger.
+
+Runs on every workstation unlock, so it only imports os and socket: it asks
+the running tracker to show its window over the local IPC channel and exits.
+It speaks the same protocol as tracker/ipc.py but does not import it (or
+json, tempfile, logging, ...). Only if no tracker answers does it hand over
+to main.py to start one.
+
+Run with site imports disabled for the fastest start:
+    pythonw -S unlock_launcher.py          (Windows, Task Scheduler)
+    python3 -S unlock_launcher.py          (Linux, e.g. from a screensaver hook)
+"""
+import os
+import socket
+import sys  # Built into the interpreter, so importing it costs nothing
+
+APP_NAME = "AIWorkTracker"
+TIMEOUT = 1.0
+SHOW_REQUEST = b'{"cmd": "show", "args": {}}\n'
+
+def _temp_dirs():
+    """The directories tempfile.gettempdir() would consider, in the same order."""
+    for var in ("TMPDIR", "TEMP", "TMP"):
+        if os.environ.get(var):
+            yield os.environ[var]
+    if os.name == "nt":
+        yield os.path.expanduser(r"~\AppData\Local\Temp")
+        yield os.path.expandvars(r"%SYSTEMROOT%\Temp")
+        yield r"c:\temp"
+        yield r"c:\tmp"
+        yield r"\temp"
+        yield r"\tmp"
+    else:
+        yield "/tmp"
+        yield "/var/tmp"
+        yield "/usr/tmp"
+    yield os.getcwd()
+
+def _address():
+    """Returns (family, address) of the running instance's IPC endpoint, or None."""
+    for directory in _temp_dirs():
+        if hasattr(socket, "AF_UNIX"):
+            path = os.path.join(directory, f"{APP_NAME}.sock")
+            if os.path.exists(path):
+                return socket.AF_UNIX, path
+        else:
+            try:
+                with open(os.path.join(directory, f"{APP_NAME}.port")) as f:
+                    return socket.AF_INET, ("127.0.0.1", int(f.read().strip()))
+            except (OSError, ValueError):
+                continue
+    return None
+
+def show_running_instance():
+    """Returns True if a running tracker acknowledged the 'show' command."""
+    endpoint = _address()
+    if endpoint is None:
+        return False
+    family, address = endpoint
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as conn:
+            conn.settimeout(TIMEOUT)
+            conn.connect(address)
+            conn.sendall(SHOW_REQUEST)
+            reply = conn.recv(4096)
+    except OSError:
+        return False
+    return b'"ok": true' in reply
+
+def main():
+    if show_running_instance():
+        return
+    # Nothing is running (e.g. it was quit before locking): start the full tracker
+    # (without -S, since the tracker needs site-packages)
+    main_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    if os.name == "nt":
+        main_script = f'"{main_script}"'  # execv does not quote arguments on Windows
+    os.execv(sys.executable, [sys.executable, main_script])
+
+if __name__ == "__main__":
+    main()
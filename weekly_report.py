@@ -1,104 +1,49 @@
 import os
-import json
-from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
+import sys
 
-import config
+from tracker.outbox import send_now
+from tracker.report_mail import build_report_message
+from tracker.reports import render_weekly_text, weekly_report
 
 # CONFIGURATION
 LOG_FILE = os.path.join(os.path.dirname(__file__), "logs", "structured_log.json")
 WEEKLY_REPORT_FILE = os.path.join(os.path.dirname(__file__), "weekly_report.txt")
 
-# Get start and end of current week (Monday to Friday)
-today = datetime.now()
-last_friday = today - timedelta(days=(today.weekday() - 4) % 7)
-week_start = last_friday - timedelta(days=4)
-week_end = last_friday.replace(hour=20, minute=0, second=0, microsecond=0)  # Friday 8pm
-
-# Load logs and filter for this week
-def load_weekly_logs():
-    if not os.path.exists(LOG_FILE):
-        return []
-    with open(LOG_FILE, "r") as f:
-        logs = json.load(f)
-    week_logs = []
-    for entry in logs:
-        start = datetime.strptime(entry["start_time"], "%Y-%m-%d %H:%M:%S")
-        if week_start <= start <= week_end:
-            week_logs.append(entry)
-    return week_logs
-
-def generate_weekly_report():
-    logs = load_weekly_logs()
-    app_usage = {}
-    idle_time = 0
-    lock_time = 0
-    for entry in logs:
-        duration = entry["duration_seconds"]
-        if entry["event"] == "active_app":
-            app_usage[entry["title"]] = app_usage.get(entry["title"], 0) + duration
-        elif entry["event"] == "idle":
-            idle_time += duration
-        elif entry["event"] == "lock":
-            lock_time += duration
-    report = ["WEEKLY PRODUCTIVITY REPORT\n========================\n"]
-    report.append(f"Week: {week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d %H:%M')}\n")
-    report.append("\nApp Usage:")
-    for app, seconds in sorted(app_usage.items(), key=lambda x: x[1], reverse=True):
-        mins = seconds // 60
-        report.append(f"- {app}: {mins} min")
-    report.append(f"\nIdle Time: {idle_time // 60} min")
-    report.append(f"Lock Time: {lock_time // 60} min")
-    report.append(f"\nTotal Productive Time: {sum(app_usage.values()) // 60} min")
-    return "\n".join(report)
+def generate_weekly_report(group_by="title", now=None):
+    """Returns the report text for the week ending on the most recent Friday, or None if nothing was logged."""
+    report = weekly_report(now, group_by=group_by, log_file=LOG_FILE)
+    return render_weekly_text(report) if report["events"] else None
 
 def send_email(report):
-    msg = MIMEMultipart('alternative')
-    msg["From"] = config.GMAIL_USER
-    msg["To"] = config.RECIPIENT
-    msg["Subject"] = "Weekly Productivity Report"
-
-    # Prepare HTML body with embedded chart
+    """Queues the report email (chart attached inline by CID) and tries to send it right away."""
     chart_path = os.path.join(os.path.dirname(LOG_FILE), 'weekly_productivity_chart.png')
-    img_html = ""
-    if os.path.exists(chart_path):
-        import base64
-        with open(chart_path, "rb") as img_file:
-            img_data = base64.b64encode(img_file.read()).decode('utf-8')
-        img_html = f'<br><img src="data:image/png;base64,{img_data}" alt="Weekly Productivity Chart" style="max-width:600px; border:2px solid #4fc3f7; border-radius:8px;">'
-
     html = f"""
     <html>
     <body style='font-family: Arial, sans-serif; background: #23272e; color: #fff;'>
     <h2>WEEKLY PRODUCTIVITY REPORT</h2>
     <pre style='font-size: 15px; color: #fff; background: #23272e; border-radius: 8px;'>{report}</pre>
-    {img_html}
     </body>
     </html>
     """
-    msg.attach(MIMEText(html, "html"))
-
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-            server.login(config.GMAIL_USER, config.GMAIL_PASS)
-            server.sendmail(config.GMAIL_USER, config.RECIPIENT, msg.as_string())
-        print("Report sent successfully!")
-    except Exception as e:
-        print(f"Failed to send email: {e}")
-
-def main():
-    now = datetime.now()
-    # Only run on Friday after 8pm
-    if now.weekday() != 4 or now.hour < 20:
-        return
-    report = generate_weekly_report()
+    msg = build_report_message("Weekly Productivity Report", report, html,
+                               charts=[(chart_path, "Weekly Productivity Chart")])
+    return send_now(msg, kind="weekly")
+
+def send_weekly_report(group_by="title", now=None):
+    """Generates the report for the week ending on the most recent Friday, saves it and queues its email."""
+    report = generate_weekly_report(group_by=group_by, now=now)
+    if report is None:
+        print("No logs for that week. Skipping report.")
+        return None
     with open(WEEKLY_REPORT_FILE, "w", encoding="utf-8") as f:
         f.write(report)
-    send_email(report)
+    return send_email(report)
+
+def main():
+    """Sends this week's report if it is due and has not been sent (e.g. when the tracker was not running)."""
+    from tracker.scheduler import Scheduler, add_report_jobs
+    group_by = "process" if "--by-process" in sys.argv else "title"
+    add_report_jobs(Scheduler(), daily=False, group_by=group_by).run_pending()
 
 if __name__ == "__main__":
     main()